@@ -0,0 +1,215 @@
+"""
+Inference backends for the EasyOCR detector and recognizer.
+
+On CPU, EasyOCR already applies PyTorch dynamic int8 quantization to the
+recognizer's LSTM and Linear layers. The detector is all convolutions and
+stays fp32. The backends are:
+
+- torch:       EasyOCR as shipped (int8 recognizer on CPU)
+- torch-fp32:  no quantization, the reference for accuracy checks
+- onnx:        both models exported to ONNX and run by ONNX Runtime, fp32
+- onnx-int8:   as onnx, with the recognizer's MatMul and LSTM weights
+               quantized to int8 by ONNX Runtime
+
+A backend's prepare() swaps a Reader's `detector` and `recognizer` for
+objects EasyOCR calls the same way, so detection, get_text() and the
+batcher work unchanged. ONNX exports are cached on disk, keyed by a hash of
+the weights, so each model is exported only once. The ONNX backends need
+`onnx` and `onnxruntime`.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-fp32", "onnx", "onnx-int8")
+
+# Shapes traced at export; batch, height and width stay dynamic
+DETECTOR_EXPORT_SHAPE = (1, 3, 640, 640)
+RECOGNIZER_EXPORT_SHAPE = (1, 1, 64, 256)
+ONNX_OPSET = 17
+# What PyTorch's dynamic quantization covers in EasyOCR (Linear, LSTM)
+INT8_OP_TYPES = ["MatMul", "LSTM"]
+
+
+class TorchBackend:
+    cpu_only = False
+
+    def __init__(self, name="torch", quantize=True):
+        self.name = name
+        self.quantize = quantize
+
+    def reader_options(self):
+        return {"quantize": self.quantize}
+
+    def prepare(self, reader):
+        return reader
+
+
+class OnnxBackend:
+    cpu_only = True
+
+    def __init__(self, name, cache_dir, int8=False, threads=0):
+        self.name = name
+        self.cache_dir = cache_dir
+        self.int8 = int8
+        # ONNX Runtime intra-op threads; 0 lets it use every core
+        self.threads = threads
+        self._export_lock = threading.Lock()
+
+    def reader_options(self):
+        # Export from the fp32 weights; dynamically quantized torch modules don't export
+        return {"quantize": False}
+
+    def prepare(self, reader):
+        if getattr(reader, "detector", None) is not None:
+            path = self._cached(reader.detector, "detector", _export_detector, quantize=False)
+            reader.detector = OnnxDetector(path, self)
+        if getattr(reader, "recognizer", None) is not None:
+            path = self._cached(reader.recognizer, "recognizer", _export_recognizer, quantize=self.int8)
+            reader.recognizer = OnnxRecognizer(path, self)
+        return reader
+
+    def _cached(self, module, kind, export, quantize):
+        """Path of the exported model, exporting (and quantizing) it on first use."""
+        fingerprint = _fingerprint(module)
+        fp32_path = os.path.join(self.cache_dir, f"{kind}-{fingerprint}.onnx")
+        path = fp32_path.replace(".onnx", "-int8.onnx") if quantize else fp32_path
+        with self._export_lock:
+            if os.path.exists(path):
+                return path
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if not os.path.exists(fp32_path):
+                logger.info("Exporting the EasyOCR %s to %s", kind, fp32_path)
+                _write_atomic(fp32_path, lambda tmp: export(module, tmp))
+            if quantize:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                logger.info("Quantizing %s to int8", fp32_path)
+                _write_atomic(path, lambda tmp: quantize_dynamic(
+                    fp32_path, tmp, op_types_to_quantize=INT8_OP_TYPES, weight_type=QuantType.QInt8
+                ))
+        return path
+
+
+def make_backend(name, cache_dir="onnx_models", threads=0):
+    if name == "torch":
+        return TorchBackend()
+    if name == "torch-fp32":
+        return TorchBackend(name, quantize=False)
+    if name in ("onnx", "onnx-int8"):
+        return OnnxBackend(name, cache_dir, int8=(name == "onnx-int8"), threads=threads)
+    raise ValueError(f"Unknown OCR backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+
+def _fingerprint(module):
+    import torch
+
+    digest = hashlib.sha256(type(module).__name__.encode())
+    for name, value in module.state_dict().items():
+        if torch.is_tensor(value):
+            digest.update(name.encode())
+            digest.update(value.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _write_atomic(path, write):
+    # Concurrent worker processes may export at once; the last rename wins
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _export_detector(detector, path):
+    import torch
+
+    with torch.no_grad():
+        torch.onnx.export(
+            detector.eval(), torch.zeros(DETECTOR_EXPORT_SHAPE), path,
+            input_names=["image"], output_names=["score", "feature"],
+            dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"},
+                          "score": {0: "batch", 1: "score_height", 2: "score_width"},
+                          "feature": {0: "batch", 2: "feature_height", 3: "feature_width"}},
+            opset_version=ONNX_OPSET, do_constant_folding=True, dynamo=False,
+        )
+
+
+def _export_recognizer(recognizer, path):
+    import torch
+
+    class RecognizerGraph(torch.nn.Module):
+        # EasyOCR's forward() takes an unused `text` argument, and its
+        # AdaptiveAvgPool2d((None, 1)) only averages the last axis, which
+        # exports as a plain mean with the width left dynamic
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, image):
+            model = self.model
+            feature = model.FeatureExtraction(image).permute(0, 3, 1, 2).mean(dim=3)
+            return model.Prediction(model.SequenceModeling(feature).contiguous())
+
+    with torch.no_grad():
+        torch.onnx.export(
+            RecognizerGraph(recognizer).eval(), torch.zeros(RECOGNIZER_EXPORT_SHAPE), path,
+            input_names=["image"], output_names=["prediction"],
+            dynamic_axes={"image": {0: "batch", 3: "width"}, "prediction": {0: "batch", 1: "steps"}},
+            opset_version=ONNX_OPSET, do_constant_folding=True, dynamo=False,
+        )
+
+
+class _OnnxModel:
+    """An ONNX Runtime session, created lazily in each process so forked workers get their own."""
+    def __init__(self, path, backend):
+        self.path = path
+        self.backend = backend
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def eval(self):
+        # EasyOCR calls model.eval() before predicting
+        return self
+
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    import onnxruntime
+
+                    options = onnxruntime.SessionOptions()
+                    if self.backend.threads > 0:
+                        options.intra_op_num_threads = self.backend.threads
+                    self._session = onnxruntime.InferenceSession(
+                        self.path, options, providers=["CPUExecutionProvider"]
+                    )
+                    self._pid = os.getpid()
+        return self._session
+
+    def run(self, image):
+        array = np.ascontiguousarray(image.detach().cpu().numpy(), dtype=np.float32)
+        return self.session().run(None, {"image": array})
+
+
+class OnnxDetector(_OnnxModel):
+    def __call__(self, image):
+        import torch
+
+        score, feature = self.run(image)
+        return torch.from_numpy(score), torch.from_numpy(feature)
+
+
+class OnnxRecognizer(_OnnxModel):
+    def __call__(self, image, text=None):
+        import torch
+
+        return torch.from_numpy(self.run(image)[0])
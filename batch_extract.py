@@ -0,0 +1,268 @@
+"""
+Offline batch extraction over a directory tree, without the HTTP server.
+
+Every image and PDF under the input directory is read with
+OCREngine.extract_text, fanned out over forked worker processes (see
+ocr_workers.py), and written to a JSONL file as one record per document:
+its path, SHA-256, and the extraction result (raw_text, fields,
+timings_ms, ...).
+
+The output file is the checkpoint. Each record is flushed as soon as the
+document is done, so an interrupted run continues where it stopped when
+started again with the same --out: paths already in the file are skipped
+without being read, and files whose content was already extracted (under
+another name, or earlier in this run) get a short record with
+`duplicate_of` instead of a second OCR pass. Documents in flight when a
+worker process dies are read again once the workers have restarted.
+
+    python batch_extract.py scans/ --out results.jsonl --processes 4
+    python batch_extract.py scans/ --out results.jsonl --retry-failed --summary summary.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+from jobs import document_kind
+from logging_config import configure_logging
+from uploads import hash_file
+
+# How often to check whether the worker processes are up again
+WORKER_POLL_SECONDS = 0.5
+
+
+def iter_documents(root):
+    """Paths of the images and PDFs under `root`, relative to it, in a stable order."""
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            accepted, is_pdf = document_kind(name)
+            if accepted and not name.startswith("."):
+                yield os.path.relpath(os.path.join(directory, name), root), is_pdf
+
+
+def _drop_failed(path):
+    # Written next to the output and renamed over it, so a crash here loses nothing
+    tmp_path = path + ".tmp"
+    with open(path, "rb") as f, open(tmp_path, "wb") as out:
+        for line in f:
+            if not json.loads(line).get("error"):
+                out.write(line)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, retry_failed=False):
+    """
+    ({path: sha256}, {sha256: path}) of the documents already in the output.
+    A record cut short by a crash is removed from the end of the file. With
+    `retry_failed`, failed records are removed from the file as well, so a
+    document read again ends up with a single record.
+    """
+    done, hashes = {}, {}
+    if not os.path.exists(path):
+        return done, hashes
+    failed = 0
+    with open(path, "rb+") as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            end += len(line)
+            record = json.loads(line)
+            if retry_failed and record.get("error"):
+                failed += 1
+                continue
+            done[record["path"]] = record["sha256"]
+            if "duplicate_of" not in record:
+                hashes.setdefault(record["sha256"], record["path"])
+        f.truncate(end)
+    if failed:
+        _drop_failed(path)
+    return done, hashes
+
+
+class Summary:
+    """Throughput and per-stage time of one run."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.documents = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.pages = 0
+        self.stage_ms = {}
+
+    def add(self, result):
+        self.documents += 1
+        if result.get("error"):
+            self.failed += 1
+        self.pages += len(result.get("pages") or [None])
+        for stage, ms in result.get("timings_ms", {}).items():
+            self.stage_ms[stage] = self.stage_ms.get(stage, 0.0) + ms
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        stage_total = sum(self.stage_ms.values())
+        return {
+            "documents": self.documents,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "pages": self.pages,
+            "seconds": round(elapsed, 3),
+            "docs_per_second": round(self.documents / elapsed, 3) if elapsed else 0.0,
+            "pages_per_second": round(self.pages / elapsed, 3) if elapsed else 0.0,
+            # Summed over all workers, so the total can exceed the wall-clock time
+            "stages": {
+                stage: {
+                    "total_s": round(ms / 1000, 3),
+                    "mean_ms": round(ms / self.documents, 2),
+                    "share": round(ms / stage_total, 4),
+                }
+                for stage, ms in sorted(self.stage_ms.items(), key=lambda item: -item[1])
+            } if self.documents else {},
+        }
+
+
+def print_summary(summary):
+    print(f"{summary['documents']} documents ({summary['failed']} failed, {summary['duplicates']} duplicates, "
+          f"{summary['skipped']} already done) in {summary['seconds']} s: "
+          f"{summary['docs_per_second']} docs/s, {summary['pages_per_second']} pages/s")
+    for stage, times in summary["stages"].items():
+        print(f"  {stage:12s} {times['mean_ms']:10.2f} ms/doc   {100 * times['share']:5.1f}%")
+
+
+def wait_for_workers(workers):
+    """Blocks until the worker processes are up; exits if they can't load the models."""
+    while not workers.ready:
+        if workers.load_error:
+            raise SystemExit(f"OCR worker processes failed to start: {workers.load_error}")
+        time.sleep(WORKER_POLL_SECONDS)
+
+
+def start_extractor(processes, threads):
+    """(extractor, concurrency): forked worker processes, or the engine in this process."""
+    from ocr_engine import ocr_engine
+
+    if processes > 0:
+        from ocr_workers import OCRWorkerProcesses
+
+        workers = OCRWorkerProcesses(ocr_engine, processes, threads)
+        workers.start(warmup=False)
+        wait_for_workers(workers)
+        return workers, processes
+    ocr_engine.load()
+    # Several threads let the recognition batcher combine their crops
+    return ocr_engine, config.OCR_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract every image and PDF under a directory to JSONL")
+    parser.add_argument("input", help="Directory to walk")
+    parser.add_argument("--out", required=True, help="JSONL output; also the checkpoint for resuming")
+    parser.add_argument("--doc-type", default="auto")
+    parser.add_argument("--template", help="Form template to read every document with")
+    parser.add_argument("--languages", help="Language set, e.g. en or en,hi (default: OCR_LANGUAGES)")
+    # Worker processes are forked, which Windows can't do
+    default_processes = max(1, (os.cpu_count() or 1) // 2) if hasattr(os, "fork") else 0
+    parser.add_argument("--processes", type=int, default=default_processes,
+                        help="Worker processes (needs fork, i.e. Linux); 0 reads in this process")
+    parser.add_argument("--threads", type=int, default=config.OCR_THREADS_PER_WORKER,
+                        help="torch threads per worker process; 0 divides the cores between them")
+    parser.add_argument("--retry-failed", action="store_true", help="Read documents that failed last time again")
+    parser.add_argument("--summary", help="Also write the throughput summary to this JSON file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level, "text")
+    if not os.path.isdir(args.input):
+        parser.error(f"{args.input} is not a directory")
+    from ocr_engine import ocr_engine
+    from ocr_workers import WorkersUnavailable
+    try:
+        ocr_engine.cache_signature(args.doc_type, args.template, args.languages)
+    except ValueError as e:
+        parser.error(str(e))
+
+    done, hashes = load_checkpoint(args.out, args.retry_failed)
+    if done:
+        print(f"Resuming: {len(done)} documents already in {args.out}")
+    extractor, concurrency = start_extractor(args.processes, args.threads)
+
+    summary = Summary()
+    in_flight = {}
+    # sha256 -> path of documents being read right now, so duplicates wait for the first copy
+    pending_hashes = {}
+    out = open(args.out, "a", encoding="utf-8")
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    def submit(path, sha256, full_path, is_pdf):
+        future = pool.submit(
+            extractor.extract_text, full_path, args.doc_type, is_pdf, args.template, args.languages
+        )
+        in_flight[future] = (path, sha256, full_path, is_pdf)
+        pending_hashes[sha256] = path
+
+    def collect(futures):
+        for future in futures:
+            path, sha256, full_path, is_pdf = in_flight.pop(future)
+            try:
+                result = future.result()
+            except WorkersUnavailable:
+                # A worker process died and the workers are restarting; not the document's fault
+                wait_for_workers(extractor)
+                submit(path, sha256, full_path, is_pdf)
+                continue
+            except Exception as e:
+                result = {"raw_text": "", "fields": {}, "error": str(e)}
+            pending_hashes.pop(sha256, None)
+            summary.add(result)
+            if not result.get("error"):
+                hashes.setdefault(sha256, path)
+            write({"path": path, "sha256": sha256, **result})
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for path, is_pdf in iter_documents(args.input):
+            if path in done:
+                summary.skipped += 1
+                continue
+            full_path = os.path.join(args.input, path)
+            sha256 = hash_file(full_path).hexdigest()
+            while sha256 in pending_hashes:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            if sha256 in hashes:
+                summary.duplicates += 1
+                write({"path": path, "sha256": sha256, "duplicate_of": hashes[sha256]})
+                continue
+
+            # Keep every worker busy without queueing the whole tree
+            while len(in_flight) >= 2 * concurrency:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            submit(path, sha256, full_path, is_pdf)
+        while in_flight:
+            collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+    except KeyboardInterrupt:
+        # Everything written so far is kept; the next run starts from there
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        out.close()
+        if extractor is not ocr_engine:
+            extractor.shutdown()
+
+    report = summary.to_dict()
+    print_summary(report)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
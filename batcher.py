@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+
+from easyocr.config import imgH
+from easyocr.recognition import get_text
+
+
+def ignore_chars(reader):
+    # Same character filtering Reader.recognize() applies without an allowlist
+    return "".join(set(reader.character) - set(reader.lang_char))
+
+
+def padded_width(crop):
+    """Width get_text() pads `crop` to: rounded up to a multiple of imgH, as get_image_list() does."""
+    return max(math.ceil(crop.shape[1] / imgH), 1) * imgH
+
+
+def recognize_crops(reader, image_list, ignore_char, batch_size=1):
+    """
+    EasyOCR get_text() over crops from easyocr.utils.get_image_list.
+    Returns [(box, text, confidence), ...] in the same order.
+
+    get_text() pads every crop to the width it is given by repeating the
+    crop's last column, and that padding changes what the recognizer reads.
+    Crops are grouped by their own padded width and each group runs as one
+    pass, so a crop reads the same whatever else is in the batch.
+    """
+    buckets = {}
+    for n, item in enumerate(image_list):
+        buckets.setdefault(padded_width(item[1]), []).append(n)
+
+    results = [None] * len(image_list)
+    for width, indices in buckets.items():
+        texts = get_text(
+            reader.character, imgH, int(width), reader.recognizer, reader.converter,
+            [image_list[n] for n in indices], ignore_char, "greedy", 5, batch_size,
+            0.1, 0.5, 0.003, 0, reader.device,
+        )
+        for n, result in zip(indices, texts):
+            results[n] = result
+    return results
+
+
+class _PendingCrops:
+    def __init__(self, image_list):
+        self.image_list = image_list
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RecognitionBatcher:
+    """
+    Collects detected text crops from concurrent requests and runs the EasyOCR
+    recognizer over them as one batch, then hands each caller its own results.
+
+    A batch is flushed once it holds `max_batch_size` crops or the oldest
+    request has waited `max_wait_ms`. A single request is never split, so a
+    large page may exceed `max_batch_size` on its own.
+    """
+    def __init__(self, reader, max_batch_size=32, max_wait_ms=10):
+        self.reader = reader
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.ignore_char = ignore_chars(reader)
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+        self._batches = 0
+        self._crops = 0
+        self._requests = 0
+
+    def recognize(self, image_list):
+        """
+        Blocking call. `image_list` is the output of easyocr.utils.get_image_list;
+        returns [(box, text, confidence), ...] in the same order.
+        """
+        if not image_list:
+            return []
+
+        request = _PendingCrops(image_list)
+        with self._cond:
+            self._ensure_thread()
+            self._pending.append(request)
+            self._cond.notify()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_thread(self):
+        # Started lazily so that a forked worker process gets its own thread.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="ocr-batcher", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = self._pending[0].enqueued + self.max_wait
+            while True:
+                queued = sum(len(r.image_list) for r in self._pending)
+                remaining = deadline - time.perf_counter()
+                if queued >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [self._pending.pop(0)]
+            size = len(batch[0].image_list)
+            while self._pending and size + len(self._pending[0].image_list) <= self.max_batch_size:
+                request = self._pending.pop(0)
+                size += len(request.image_list)
+                batch.append(request)
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._run(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+    def _run(self, batch):
+        image_list = []
+        for request in batch:
+            image_list.extend(request.image_list)
+
+        results = recognize_crops(self.reader, image_list, self.ignore_char, self.max_batch_size)
+
+        offset = 0
+        for request in batch:
+            count = len(request.image_list)
+            request.result = results[offset:offset + count]
+            offset += count
+
+        self._batches += 1
+        self._crops += len(image_list)
+        self._requests += len(batch)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "batches": self._batches,
+            "avg_crops_per_batch": round(self._crops / self._batches, 2) if self._batches else 0.0,
+            "avg_requests_per_batch": round(self._requests / self._batches, 2) if self._batches else 0.0,
+        }
@@ -0,0 +1,124 @@
+"""
+Accuracy and speed of each inference backend against the fp32 reference.
+
+Every backend gets a fresh OCREngine and extracts the same documents. Each
+one is compared with the torch-fp32 run: how closely its text agrees (mean
+rapidfuzz ratio over lines), how many lines are identical, how often the
+extracted fields agree, and field accuracy against the ground truth. Load
+time includes the one-off ONNX export when the cache is empty.
+
+    python -m benchmarks.backends --data bench_data --out bench_results/backends.json
+    python -m benchmarks.backends --backends torch-fp32,onnx-int8 --min-agreement 0.98
+
+Exits with status 1 if a backend's text agreement is below --min-agreement.
+"""
+import argparse
+import sys
+import time
+
+from rapidfuzz import fuzz
+
+import config
+from backends import BACKENDS
+from benchmarks.results import FieldAccuracy, latency_summary, peak_rss_mb, write_results
+from benchmarks.synthetic import add_dataset_args, dataset_from_args
+from ocr_engine import OCREngine
+
+REFERENCE = "torch-fp32"
+
+
+def run_backend(name, documents):
+    config.OCR_BACKEND = name
+    engine = OCREngine()
+    started = time.perf_counter()
+    engine.warmup()
+    load_seconds = time.perf_counter() - started
+
+    outputs = []
+    durations = []
+    for doc in documents:
+        started = time.perf_counter()
+        result = engine.extract_text(doc.png_bytes(), "auto")
+        durations.append(time.perf_counter() - started)
+        if result.get("error"):
+            print(f"{name} {doc.doc_id}: {result['error']}")
+        outputs.append(result)
+    return load_seconds, durations, outputs
+
+
+def agreement(outputs, reference):
+    """Text and field agreement of one backend's results with the reference's."""
+    ratios = []
+    identical = 0
+    lines = 0
+    fields_same = 0
+    fields = 0
+    for result, expected in zip(outputs, reference):
+        got_lines = result["raw_text"].splitlines()
+        expected_lines = expected["raw_text"].splitlines()
+        ratios.append(fuzz.ratio(result["raw_text"], expected["raw_text"]) / 100)
+        identical += sum(1 for a, b in zip(got_lines, expected_lines) if a == b)
+        lines += max(len(got_lines), len(expected_lines))
+        for key, value in expected["fields"].items():
+            fields += 1
+            fields_same += int(result["fields"].get(key) == value)
+    return {
+        "text_agreement": round(sum(ratios) / len(ratios), 4) if ratios else None,
+        "identical_lines": round(identical / lines, 4) if lines else None,
+        "field_agreement": round(fields_same / fields, 4) if fields else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR backends with the fp32 reference")
+    add_dataset_args(parser)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated subset of: " + ", ".join(BACKENDS))
+    parser.add_argument("--min-agreement", type=float, help="Fail if a backend's text agreement is below this (0-1)")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    documents = dataset_from_args(args)
+    names = [name for name in args.backends.split(",") if name]
+    # The reference runs first, whether or not it was asked for
+    names = [REFERENCE] + [name for name in names if name != REFERENCE]
+    print(f"Benchmarking {len(documents)} documents on {', '.join(names)}")
+
+    backend_setting = config.OCR_BACKEND
+    runs = {}
+    try:
+        for name in names:
+            runs[name] = run_backend(name, documents)
+    finally:
+        config.OCR_BACKEND = backend_setting
+
+    reference_seconds = sum(runs[REFERENCE][1])
+    results = {"documents": len(documents), "reference": REFERENCE, "backends": {}}
+    failed = []
+    for name, (load_seconds, durations, outputs) in runs.items():
+        accuracy = FieldAccuracy()
+        for doc, result in zip(documents, outputs):
+            accuracy.add(doc.fields, result.get("fields"))
+        summary = {
+            "load_seconds": round(load_seconds, 3),
+            "docs_per_second": round(len(durations) / sum(durations), 3),
+            "speedup": round(reference_seconds / sum(durations), 3),
+            "latency": latency_summary(durations),
+            "accuracy": accuracy.summary(),
+            **agreement(outputs, runs[REFERENCE][2]),
+        }
+        results["backends"][name] = summary
+        print(f"{name:11s} {summary['docs_per_second']:7.3f} docs/s   x{summary['speedup']:.2f}   "
+              f"text agreement {summary['text_agreement']}   identical lines {summary['identical_lines']}   "
+              f"field accuracy {summary['accuracy'].get('accuracy')}")
+        if args.min_agreement is not None and (summary["text_agreement"] or 0) < args.min_agreement:
+            failed.append(name)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    write_results(args.out, "backends", args, results)
+    if failed:
+        print(f"Below --min-agreement {args.min_agreement}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
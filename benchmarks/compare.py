@@ -0,0 +1,82 @@
+"""
+Compares two benchmark JSON files and flags regressions.
+
+    python -m benchmarks.compare bench_results/base.json bench_results/new.json
+
+Exits with status 1 when any metric got worse by more than the threshold,
+so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+# Metric name suffixes and which direction is better
+LOWER_IS_BETTER = ("_ms", "_mb", "wall_seconds", "rejected", "errors")
+HIGHER_IS_BETTER = ("throughput_rps", "accuracy", "similarity", "ok")
+
+
+def flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, node
+
+
+def direction(path):
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(base, new, threshold, accuracy_threshold):
+    """Returns [(path, base, new, change, regressed)] for every comparable metric."""
+    base_metrics = dict(flatten(base["results"]))
+    rows = []
+    for path, value in flatten(new["results"]):
+        sign = direction(path)
+        if sign == 0 or path not in base_metrics:
+            continue
+        old = base_metrics[path]
+        name = path.rsplit(".", 1)[-1]
+        if name.endswith(("accuracy", "similarity")):
+            # Accuracies are fractions; compare absolute points
+            change = value - old
+            regressed = -change > accuracy_threshold
+        else:
+            change = (value - old) / old if old else 0.0
+            regressed = sign * change < -threshold
+        rows.append((path, old, value, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+    parser.add_argument("--accuracy-threshold", type=float, default=0.01, help="Allowed absolute accuracy drop")
+    parser.add_argument("--all", action="store_true", help="Print every metric, not only regressions")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("benchmark") != new.get("benchmark"):
+        parser.error(f"Different benchmarks: {base.get('benchmark')} vs {new.get('benchmark')}")
+
+    rows = compare(base, new, args.threshold, args.accuracy_threshold)
+    regressions = [row for row in rows if row[4]]
+    for path, old, value, change, regressed in (rows if args.all else regressions):
+        marker = "REGRESSION" if regressed else ""
+        print(f"{path:60s} {old:12.4g} -> {value:12.4g}  {change:+8.1%}  {marker}")
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressions")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Throughput of the language cascade on English-only and mixed-script documents.
+
+Every document is extracted in-process under three recognizer setups:
+
+- english:   English model only (languages=en)
+- cascade:   English first, the en+hi model for the crops that need it
+- combined:  the en+hi model reads every crop (OCR_CASCADE=0)
+
+Results are grouped by document language: "en" documents are English only,
+"hi" documents mix Devanagari values with English labels.
+
+    python -m benchmarks.languages --count 16 --out bench_results/languages.json
+"""
+import argparse
+import time
+
+import config
+from benchmarks.results import FieldAccuracy, latency_summary, peak_rss_mb, write_results
+from benchmarks.synthetic import add_dataset_args, dataset_from_args
+from language_cascade import cascade_plan, parse_languages
+from ocr_engine import ocr_engine
+
+# name -> (languages, cascade)
+SETUPS = {
+    "english": ("en", True),
+    "cascade": ("en,hi", True),
+    "combined": ("en,hi", False),
+}
+
+
+def bench_setup(documents, languages, cascade):
+    config.OCR_CASCADE = cascade
+    groups = {}
+    for doc in documents:
+        group = groups.setdefault(doc.lang, {"seconds": [], "accuracy": FieldAccuracy(), "crops": {}})
+        started = time.perf_counter()
+        result = ocr_engine.extract_text(doc.png_bytes(), "auto", languages=languages)
+        group["seconds"].append(time.perf_counter() - started)
+        if result.get("error"):
+            print(f"{doc.doc_id}: {result['error']}")
+        group["accuracy"].add(doc.fields, result.get("fields"))
+        for key, crops in result.get("recognized_crops", {}).items():
+            group["crops"][key] = group["crops"].get(key, 0) + crops
+
+    return {
+        lang: {
+            "docs_per_second": round(len(group["seconds"]) / sum(group["seconds"]), 3),
+            "latency": latency_summary(group["seconds"]),
+            "accuracy": group["accuracy"].summary(),
+            "recognized_crops": group["crops"],
+        }
+        for lang, group in sorted(groups.items())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="English-only vs mixed-script throughput per recognizer setup")
+    add_dataset_args(parser)
+    parser.add_argument("--setups", default=",".join(SETUPS), help="Comma-separated subset of: " + ", ".join(SETUPS))
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    documents = dataset_from_args(args)
+    print(f"Benchmarking {len(documents)} documents")
+
+    # Load every recognizer up front so no setup pays for model loading
+    for name in args.setups.split(","):
+        languages, cascade = SETUPS[name]
+        for key in cascade_plan(parse_languages(languages), cascade):
+            if key:
+                ocr_engine.recognizer(key)
+    ocr_engine.warmup()
+
+    results = {"documents": len(documents), "setups": {}}
+    cascade_setting = config.OCR_CASCADE
+    try:
+        for name in args.setups.split(","):
+            languages, cascade = SETUPS[name]
+            results["setups"][name] = bench_setup(documents, languages, cascade)
+    finally:
+        config.OCR_CASCADE = cascade_setting
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    for name, groups in results["setups"].items():
+        for lang, summary in groups.items():
+            print(f"{name:9s} docs={lang:3s} {summary['docs_per_second']:7.3f} docs/s   "
+                  f"p50 {summary['latency']['p50_ms']:9.2f} ms   "
+                  f"accuracy {summary['accuracy'].get('accuracy')}   crops {summary['recognized_crops']}")
+
+    write_results(args.out, "languages", args, results)
+
+
+if __name__ == "__main__":
+    main()
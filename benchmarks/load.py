@@ -0,0 +1,242 @@
+"""
+End-to-end load generator for the FastAPI app.
+
+Starts the server (or targets --url), waits for /readyz and sends /extract
+requests at each concurrency level. Reports throughput, latency
+percentiles, rejections, field accuracy and the server's peak RSS per level.
+
+    python -m benchmarks.load --concurrency 1,2,4,8 --requests 32 --out bench_results/load.json
+
+Environment variables are passed through to a spawned server, so
+OCR_PROCESSES=4 python -m benchmarks.load ... benchmarks that mode.
+"""
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.results import FieldAccuracy, latency_summary, write_results
+from benchmarks.synthetic import add_dataset_args, dataset_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def unique_png(png, token):
+    """
+    Adds a tEXt chunk so every request has different bytes (and so misses
+    the extraction cache) without re-encoding the image.
+    """
+    data = b"bench\x00" + token.encode("ascii")
+    chunk = struct.pack(">I", len(data)) + b"tEXt" + data + struct.pack(">I", zlib.crc32(b"tEXt" + data))
+    # IEND is always the last 12 bytes
+    return png[:-12] + chunk + png[-12:]
+
+
+def _multipart(fields, file_field, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def post_extract(url, png, doc_type, timeout):
+    body, content_type = _multipart({"doc_type": doc_type}, "file", "page.png", png, "image/png")
+    request = urllib.request.Request(f"{url}/extract", data=body, headers={"Content-Type": content_type})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload, status = None, e.code
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        payload, status = None, 0
+    return status, time.perf_counter() - started, payload
+
+
+def _rss_bytes(pid):
+    """RSS of a process and its children, via psutil if installed, else /proc."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except psutil.Error:
+            return None
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending += [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            if current == pid:
+                return None
+    return total
+
+
+class RSSSampler:
+    """Samples the server's RSS in the background and keeps the peak."""
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = None
+        self._stop.clear()
+        if self.pid:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = _rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def peak_mb(self):
+        return round(self.peak / (1024 * 1024), 1) if self.peak else None
+
+
+def start_server(port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=dict(os.environ, OCR_PRELOAD="1"),
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+
+def wait_ready(url, server=None, timeout=900):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError("Server exited before it became ready")
+        try:
+            with urllib.request.urlopen(f"{url}/readyz", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"{url} was not ready after {timeout}s")
+
+
+def run_level(url, documents, payloads, concurrency, requests, args, sampler):
+    statuses = {}
+    latencies = []
+    accuracy = FieldAccuracy()
+
+    def one(index):
+        doc = documents[index % len(documents)]
+        png = payloads[index % len(payloads)]
+        if not args.allow_cache:
+            png = unique_png(png, f"{concurrency}-{index}-{uuid.uuid4().hex}")
+        return doc, post_extract(url, png, args.doc_type, args.timeout)
+
+    with sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for doc, (status, seconds, payload) in executor.map(one, range(requests)):
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(seconds)
+                    accuracy.add(doc.fields, payload.get("fields"))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": statuses.get(200, 0),
+        "rejected": statuses.get(503, 0),
+        "errors": sum(n for status, n in statuses.items() if status not in (200, 503)),
+        "wall_seconds": round(elapsed, 3),
+        "throughput_rps": round(statuses.get(200, 0) / elapsed, 3) if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "peak_rss_mb": sampler.peak_mb,
+        "accuracy": accuracy.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of POST /extract")
+    add_dataset_args(parser)
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, for peak RSS")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the server started by the benchmark")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--doc-type", default="auto")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--allow-cache", action="store_true", help="Send identical bytes so repeats hit the cache")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    documents = dataset_from_args(args)
+    payloads = [doc.png_bytes() for doc in documents]
+
+    server = None
+    url = args.url
+    pid = args.server_pid
+    if url is None:
+        server, url = start_server(args.port)
+        pid = server.pid
+    try:
+        print(f"Waiting for {url}/readyz ...")
+        wait_ready(url, server)
+        sampler = RSSSampler(pid)
+        levels = {}
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            level = run_level(url, documents, payloads, concurrency, args.requests, args, sampler)
+            levels[f"c{concurrency}"] = level
+            latency = level["latency"]
+            print(
+                f"c={concurrency:<3d} {level['throughput_rps']:7.2f} req/s  "
+                f"p50 {latency.get('p50_ms', 0):8.1f}  p95 {latency.get('p95_ms', 0):8.1f}  "
+                f"p99 {latency.get('p99_ms', 0):8.1f} ms  rss {level['peak_rss_mb']} MB  "
+                f"acc {level['accuracy'].get('accuracy')}  rejected {level['rejected']}  errors {level['errors']}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    write_results(args.out, "load", args, {"documents": len(documents), "levels": levels})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+from rapidfuzz import fuzz
+
+import config
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """What a result depends on besides the code: machine and config.py settings."""
+    settings = {k: v for k, v in vars(config).items() if k.isupper()}
+    return {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": settings,
+    }
+
+
+def write_results(path, benchmark, args, results):
+    report = {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "environment": environment(),
+        "results": results,
+    }
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        print(f"Results written to {path}")
+    return report
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean/max in ms for a list of durations in seconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _normalize(key, value):
+    value = " ".join(str(value or "").split()).lower()
+    if key in ("phone", "id_number"):
+        # Spacing and dashes in numbers are formatting, not errors
+        value = "".join(ch for ch in value if ch.isdigit())
+    return value
+
+
+class FieldAccuracy:
+    """
+    Compares extracted fields to ground truth. A field is correct when it
+    matches after whitespace and case normalization; `similarity` is the
+    mean rapidfuzz ratio, so near misses still show up as progress.
+    """
+    def __init__(self):
+        self.correct = {}
+        self.total = {}
+        self.similarity = {}
+
+    def add(self, truth, extracted):
+        for key, expected in truth.items():
+            expected = _normalize(key, expected)
+            got = _normalize(key, (extracted or {}).get(key))
+            self.total[key] = self.total.get(key, 0) + 1
+            self.correct[key] = self.correct.get(key, 0) + int(got == expected)
+            self.similarity[key] = self.similarity.get(key, 0.0) + fuzz.ratio(got, expected)
+
+    def summary(self):
+        total = sum(self.total.values())
+        if not total:
+            return {"fields": 0}
+        return {
+            "fields": total,
+            "accuracy": round(sum(self.correct.values()) / total, 4),
+            "similarity": round(sum(self.similarity.values()) / total / 100, 4),
+            "per_field": {
+                key: {
+                    "accuracy": round(self.correct[key] / n, 4),
+                    "similarity": round(self.similarity[key] / n / 100, 4),
+                }
+                for key, n in sorted(self.total.items())
+            },
+        }
+
+
+def peak_rss_mb():
+    """Peak RSS of this process in MB, or None where the platform can't tell."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
@@ -0,0 +1,121 @@
+"""
+Per-stage micro-benchmarks, run in-process against OCREngine.
+
+Decode, each preprocessing profile and field extraction run on every
+document without the models. Unless --no-ocr is given, the full pipeline
+then runs once per document and its per-stage timings (detect, recognize,
+...) and field accuracy are reported as well.
+
+    python -m benchmarks.stages --count 16 --out bench_results/stages.json
+"""
+import argparse
+import time
+
+from benchmarks.results import FieldAccuracy, latency_summary, peak_rss_mb, write_results
+from benchmarks.synthetic import add_dataset_args, dataset_from_args
+from ocr_engine import ocr_engine
+
+
+def _time(fn, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def _grouped(durations_by_doc, documents, attr):
+    groups = {}
+    for doc, durations in zip(documents, durations_by_doc):
+        groups.setdefault(f"{attr}={getattr(doc, attr)}", []).extend(durations)
+    return {name: latency_summary(values) for name, values in sorted(groups.items())}
+
+
+def bench_decode(documents, repeat):
+    per_doc = []
+    for doc in documents:
+        data = doc.png_bytes()
+        per_doc.append(_time(lambda: ocr_engine.decode_image(data), repeat))
+    return {"all": latency_summary(sum(per_doc, [])), **_grouped(per_doc, documents, "width")}
+
+
+def bench_preprocess(documents, repeat):
+    results = {}
+    for name, pipeline in ocr_engine.pipelines.items():
+        per_doc = [_time(lambda: pipeline.run(doc.image), repeat) for doc in documents]
+        results[name] = {"all": latency_summary(sum(per_doc, [])), **_grouped(per_doc, documents, "width")}
+    return results
+
+
+def bench_fields(documents, repeat):
+    """FieldMatcher on the ground-truth text: speed, and accuracy with perfect OCR."""
+    accuracy = FieldAccuracy()
+    durations = []
+    for doc in documents:
+        text = doc.text()
+        durations += _time(lambda: ocr_engine.field_matcher.extract(text), repeat)
+        accuracy.add(doc.fields, ocr_engine.field_matcher.extract(text))
+    return {"latency": latency_summary(durations), "accuracy_on_truth_text": accuracy.summary()}
+
+
+def bench_pipeline(documents):
+    ocr_engine.warmup()
+    stages = {}
+    totals = []
+    accuracy = FieldAccuracy()
+    by_group = {}
+    for doc in documents:
+        started = time.perf_counter()
+        result = ocr_engine.extract_text(doc.png_bytes(), "auto")
+        totals.append(time.perf_counter() - started)
+        if result.get("error"):
+            print(f"{doc.doc_id}: {result['error']}")
+        for stage, ms in result.get("timings_ms", {}).items():
+            stages.setdefault(stage, []).append(ms / 1000.0)
+        accuracy.add(doc.fields, result.get("fields"))
+        by_group.setdefault(f"{doc.kind}/{doc.lang}", FieldAccuracy()).add(doc.fields, result.get("fields"))
+
+    return {
+        "total": latency_summary(totals),
+        "stages": {stage: latency_summary(values) for stage, values in stages.items()},
+        "accuracy": accuracy.summary(),
+        "accuracy_by_group": {name: acc.summary() for name, acc in sorted(by_group.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage OCR micro-benchmarks")
+    add_dataset_args(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document for the model-free stages")
+    parser.add_argument("--no-ocr", action="store_true", help="Skip the stages that need the EasyOCR models")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    documents = dataset_from_args(args)
+    print(f"Benchmarking {len(documents)} documents")
+
+    results = {
+        "documents": len(documents),
+        "decode": bench_decode(documents, args.repeat),
+        "preprocess": bench_preprocess(documents, args.repeat),
+        "fields": bench_fields(documents, args.repeat),
+    }
+    if not args.no_ocr:
+        results["pipeline"] = bench_pipeline(documents)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    for name, summary in [("decode", results["decode"]["all"])] + \
+            [(f"preprocess[{k}]", v["all"]) for k, v in results["preprocess"].items()] + \
+            [("fields", results["fields"]["latency"])]:
+        print(f"{name:24s} p50 {summary['p50_ms']:9.2f} ms   p95 {summary['p95_ms']:9.2f} ms")
+    if "pipeline" in results:
+        for stage, summary in results["pipeline"]["stages"].items():
+            print(f"{stage:24s} p50 {summary['p50_ms']:9.2f} ms   p95 {summary['p95_ms']:9.2f} ms")
+        print(f"field accuracy           {results['pipeline']['accuracy'].get('accuracy')}")
+
+    write_results(args.out, "stages", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Synthetic ID cards and forms with known field values.
+
+Every document is fully determined by its seed, so two runs of the
+benchmarks see exactly the same images. Only OpenCV, PIL and numpy are used.
+
+    python -m benchmarks.synthetic --out bench_data --count 24
+"""
+import argparse
+import json
+import os
+import random
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, features
+
+# Tried in order; the first one that exists is used
+LATIN_FONTS = [
+    "C:/Windows/Fonts/arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/Library/Fonts/Arial.ttf",
+]
+DEVANAGARI_FONTS = [
+    "C:/Windows/Fonts/Nirmala.ttf",
+    "C:/Windows/Fonts/mangal.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf",
+    "/usr/share/fonts/truetype/fonts-deva-extra/chandas1-2.ttf",
+    "/System/Library/Fonts/Supplemental/DevanagariMT.ttc",
+]
+
+KINDS = ("id_card", "form")
+LANGUAGES = ("en", "hi")
+
+EN_FIRST = ["Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan", "Meera", "John", "Sarah"]
+EN_LAST = ["Sharma", "Patel", "Singh", "Iyer", "Gupta", "Reddy", "Nair", "Khan", "Das", "Mehta", "Smith", "Brown"]
+HI_FIRST = ["आरव", "प्रिया", "राहुल", "अनन्या", "विक्रम", "स्नेहा", "अर्जुन", "काव्या", "रोहन", "मीरा"]
+HI_LAST = ["शर्मा", "पटेल", "सिंह", "गुप्ता", "वर्मा", "मेहता", "यादव", "मिश्रा"]
+STREETS = ["MG Road", "Station Road", "Park Street", "Lake View Lane", "Gandhi Nagar", "Civil Lines", "Sector 14"]
+CITIES = ["Pune", "Delhi", "Jaipur", "Lucknow", "Bhopal", "Indore", "Nagpur", "Patna"]
+HI_STREETS = ["गांधी नगर", "स्टेशन रोड", "सिविल लाइंस", "शास्त्री नगर"]
+HI_CITIES = ["दिल्ली", "जयपुर", "लखनऊ", "भोपाल", "पटना"]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "hotmail.com"]
+
+# Printed label per field and language. Hindi documents have no email line.
+LABELS = {
+    "en": {"name": "Name", "age": "Age", "gender": "Gender", "phone": "Phone",
+           "email": "Email", "id_number": "ID Number", "address": "Address"},
+    "hi": {"name": "नाम", "age": "आयु", "gender": "लिंग", "phone": "मोबाइल",
+           "id_number": "पहचान पत्र", "address": "पता"},
+}
+GENDER_TEXT = {
+    "en": {"Male": "Male", "Female": "Female"},
+    # Bilingual, as on most Indian government cards
+    "hi": {"Male": "पुरुष / Male", "Female": "महिला / Female"},
+}
+TITLES = {
+    "en": {"id_card": "IDENTITY CARD", "form": "APPLICATION FORM"},
+    "hi": {"id_card": "पहचान पत्र", "form": "आवेदन पत्र"},
+}
+
+
+def _find_font(candidates):
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class FontSet:
+    """TrueType fonts for both scripts; Devanagari is None when no font is installed."""
+    def __init__(self, latin=None, devanagari=None):
+        self.latin_path = latin or _find_font(LATIN_FONTS)
+        self.devanagari_path = devanagari or _find_font(DEVANAGARI_FONTS)
+        # Without libraqm PIL can't shape conjuncts and matras correctly
+        self.layout = ImageFont.Layout.RAQM if features.check("raqm") else ImageFont.Layout.BASIC
+        self._cache = {}
+
+    @property
+    def has_devanagari(self):
+        return self.devanagari_path is not None
+
+    def get(self, size, devanagari=False):
+        key = (size, devanagari)
+        if key not in self._cache:
+            path = self.devanagari_path if devanagari else self.latin_path
+            if path is None:
+                if devanagari:
+                    raise RuntimeError("No Devanagari font found; pass --devanagari-font or generate --langs en")
+                self._cache[key] = ImageFont.load_default(size)
+            else:
+                self._cache[key] = ImageFont.truetype(path, size, layout_engine=self.layout)
+        return self._cache[key]
+
+
+def _has_devanagari(text):
+    return any("\u0900" <= ch <= "\u097f" for ch in text)
+
+
+def random_fields(rng, lang):
+    gender = rng.choice(["Male", "Female"])
+    if lang == "hi":
+        name = f"{rng.choice(HI_FIRST)} {rng.choice(HI_LAST)}"
+        address = f"{rng.randint(1, 250)}, {rng.choice(HI_STREETS)}, {rng.choice(HI_CITIES)}"
+    else:
+        name = f"{rng.choice(EN_FIRST)} {rng.choice(EN_LAST)}"
+        address = f"{rng.randint(1, 250)}, {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+
+    fields = {
+        "name": name,
+        "age": str(rng.randint(18, 80)),
+        "gender": gender,
+        "phone": f"{rng.choice('6789')}{rng.randint(0, 999999999):09d}",
+        "id_number": f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        "address": address,
+    }
+    if lang == "en":
+        first, last = name.lower().split()
+        fields["email"] = f"{first}.{last}{rng.randint(1, 99)}@{rng.choice(DOMAINS)}"
+    return fields
+
+
+def document_lines(fields, lang, kind):
+    """The document's text as a perfect OCR pass would return it."""
+    lines = [TITLES[lang][kind]]
+    for key in ("name", "id_number", "age", "gender", "phone", "email", "address"):
+        if key in fields:
+            value = GENDER_TEXT[lang][fields[key]] if key == "gender" else fields[key]
+            lines.append(f"{LABELS[lang][key]}: {value}")
+    return lines
+
+
+def _draw_text(draw, fonts, xy, text, size, fill=0):
+    # Mixed strings ("पुरुष / Male") render fine in a Devanagari font, which also has Latin glyphs
+    draw.text(xy, text, font=fonts.get(size, _has_devanagari(text)), fill=fill)
+
+
+def _render_id_card(fields, lang, fonts, rng):
+    # ID-1 card proportions at a base width of 1000 px
+    w, h = 1000, 630
+    page = Image.new("L", (w, h), 245)
+    draw = ImageDraw.Draw(page)
+    draw.rectangle([0, 0, w, 90], fill=rng.randint(150, 200))
+    _draw_text(draw, fonts, (30, 22), TITLES[lang]["id_card"], 42, fill=255)
+    # Photo placeholder
+    draw.rectangle([30, 130, 250, 410], outline=80, width=3, fill=215)
+
+    labels = LABELS[lang]
+    y = 120
+    for key in ("name", "age", "gender", "phone", "email", "id_number", "address"):
+        if key not in fields:
+            continue
+        value = GENDER_TEXT[lang][fields[key]] if key == "gender" else fields[key]
+        _draw_text(draw, fonts, (290, y), f"{labels[key]}: {value}", 30)
+        y += 62
+    return page
+
+
+def _render_form(fields, lang, fonts, rng):
+    # A4 proportions at a base width of 1000 px
+    w, h = 1000, 1414
+    page = Image.new("L", (w, h), 255)
+    draw = ImageDraw.Draw(page)
+    _draw_text(draw, fonts, (60, 50), TITLES[lang]["form"], 48)
+    draw.line([60, 125, w - 60, 125], fill=0, width=3)
+
+    labels = LABELS[lang]
+    keys = [k for k in ("name", "id_number", "age", "gender", "phone", "email", "address") if k in fields]
+    y = 180
+    for key in keys:
+        value = GENDER_TEXT[lang][fields[key]] if key == "gender" else fields[key]
+        _draw_text(draw, fonts, (70, y), f"{labels[key]}:", 32)
+        # Value written inside a ruled box, like a filled-in form
+        draw.rectangle([330, y - 12, w - 60, y + 50], outline=120, width=2)
+        _draw_text(draw, fonts, (345 + rng.randint(0, 20), y), value, 32)
+        y += 110
+    return page
+
+
+def _degrade(gray, noise, rng_np):
+    """Gaussian noise, a slight blur and a small rotation, scaled by `noise` (0..1)."""
+    if noise <= 0:
+        return gray
+    h, w = gray.shape
+    angle = float(rng_np.uniform(-3, 3) * noise)
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    gray = cv2.warpAffine(gray, matrix, (w, h), borderValue=255)
+    ksize = 3 if noise < 0.5 else 5
+    gray = cv2.GaussianBlur(gray, (ksize, ksize), 0)
+    noisy = gray.astype(np.float32) + rng_np.normal(0, 60 * noise, gray.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def render_document(kind, lang, width, noise, seed, fonts=None):
+    """Returns (gray_image, fields) for one synthetic document."""
+    fonts = fonts or FontSet()
+    rng = random.Random(seed)
+    fields = random_fields(rng, lang)
+    page = _render_id_card(fields, lang, fonts, rng) if kind == "id_card" else _render_form(fields, lang, fonts, rng)
+
+    gray = np.asarray(page)
+    h, w = gray.shape
+    if width != w:
+        interpolation = cv2.INTER_AREA if width < w else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, (width, round(h * width / w)), interpolation=interpolation)
+    return _degrade(gray, noise, np.random.default_rng(seed)), fields
+
+
+class SyntheticDocument:
+    def __init__(self, doc_id, kind, lang, width, noise, seed, image, fields):
+        self.doc_id = doc_id
+        self.kind = kind
+        self.lang = lang
+        self.width = width
+        self.noise = noise
+        self.seed = seed
+        self.image = image
+        self.fields = fields
+
+    def png_bytes(self):
+        return cv2.imencode(".png", self.image)[1].tobytes()
+
+    def text(self):
+        return "\n".join(document_lines(self.fields, self.lang, self.kind))
+
+    def meta(self):
+        return {"id": self.doc_id, "kind": self.kind, "lang": self.lang, "width": self.width,
+                "noise": self.noise, "seed": self.seed, "fields": self.fields}
+
+
+def generate_dataset(count, kinds=KINDS, langs=LANGUAGES, widths=(800, 1600), noise_levels=(0.0, 0.3), seed=0,
+                     fonts=None):
+    """
+    Cycles through every kind x language x width x noise combination until
+    `count` documents are produced. Hindi is skipped when no Devanagari
+    font is available.
+    """
+    fonts = fonts or FontSet()
+    if "hi" in langs and not fonts.has_devanagari:
+        print("No Devanagari font found, generating English documents only")
+        langs = [lang for lang in langs if lang != "hi"]
+
+    combos = [(k, l, w, n) for k in kinds for l in langs for w in widths for n in noise_levels]
+    documents = []
+    for index in range(count):
+        kind, lang, width, noise = combos[index % len(combos)]
+        doc_seed = seed * 100003 + index
+        image, fields = render_document(kind, lang, width, noise, doc_seed, fonts)
+        doc_id = f"{index:04d}-{kind}-{lang}-w{width}-n{noise:g}"
+        documents.append(SyntheticDocument(doc_id, kind, lang, width, noise, doc_seed, image, fields))
+    return documents
+
+
+def save_dataset(documents, directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "truth.jsonl"), "w", encoding="utf-8") as f:
+        for doc in documents:
+            cv2.imwrite(os.path.join(directory, f"{doc.doc_id}.png"), doc.image)
+            f.write(json.dumps(doc.meta(), ensure_ascii=False) + "\n")
+
+
+def load_dataset(directory):
+    documents = []
+    with open(os.path.join(directory, "truth.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            meta = json.loads(line)
+            image = cv2.imread(os.path.join(directory, f"{meta['id']}.png"), cv2.IMREAD_GRAYSCALE)
+            documents.append(SyntheticDocument(
+                meta["id"], meta["kind"], meta["lang"], meta["width"], meta["noise"], meta["seed"], image, meta["fields"]
+            ))
+    return documents
+
+
+def add_dataset_args(parser, from_disk=True):
+    """Options shared by every benchmark that needs documents."""
+    if from_disk:
+        parser.add_argument("--data", help="Directory written by benchmarks.synthetic; generated in memory if omitted")
+    parser.add_argument("--count", type=int, default=16)
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--langs", default=",".join(LANGUAGES))
+    parser.add_argument("--widths", default="800,1600", help="Image widths in px")
+    parser.add_argument("--noise", default="0,0.3", help="Degradation levels between 0 and 1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--devanagari-font", help="Path to a TrueType font with Devanagari glyphs")
+
+
+def dataset_from_args(args):
+    if getattr(args, "data", None):
+        return load_dataset(args.data)
+    return generate_dataset(
+        args.count,
+        kinds=args.kinds.split(","),
+        langs=args.langs.split(","),
+        widths=[int(w) for w in args.widths.split(",")],
+        noise_levels=[float(n) for n in args.noise.split(",")],
+        seed=args.seed,
+        fonts=FontSet(devanagari=args.devanagari_font),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render synthetic ID cards and forms with ground truth")
+    add_dataset_args(parser, from_disk=False)
+    parser.add_argument("--out", required=True, help="Output directory for the PNGs and truth.jsonl")
+    args = parser.parse_args()
+    documents = dataset_from_args(args)
+    save_dataset(documents, args.out)
+    print(f"Wrote {len(documents)} documents to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
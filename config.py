@@ -0,0 +1,191 @@
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def _env_map(name, default):
+    # "key=value,key=value" -> dict
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return dict(default)
+    result = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, val = item.split("=", 1)
+            result[key.strip()] = val.strip()
+    return result
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Serving ---
+# Number of threads that run OCR in parallel.
+OCR_WORKERS = _env_int("OCR_WORKERS", 2)
+# Requests allowed to wait for a free worker before we answer 503.
+OCR_QUEUE_SIZE = _env_int("OCR_QUEUE_SIZE", 8)
+# Run OCR in this many forked worker processes instead of threads. 0 disables.
+OCR_PROCESSES = _env_int("OCR_PROCESSES", 0)
+# torch intra-op threads per OCR process (or for the whole server when
+# OCR_PROCESSES is 0). 0 means cpu_count // OCR_PROCESSES, or torch's default.
+OCR_THREADS_PER_WORKER = _env_int("OCR_THREADS_PER_WORKER", 0)
+# Load models in the background when the server starts (otherwise on first request).
+OCR_PRELOAD = _env_bool("OCR_PRELOAD", True)
+# Run one synthetic inference after loading so /readyz only passes once warm.
+OCR_WARMUP = _env_bool("OCR_WARMUP", True)
+
+# --- Inference backend ---
+# "torch" (EasyOCR as shipped, int8 recognizer on CPU), "torch-fp32", "onnx"
+# or "onnx-int8". The ONNX backends need onnx and onnxruntime (see backends.py).
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "torch")
+# Where ONNX exports of the models are cached.
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", "onnx_models")
+
+# --- Recognition batching ---
+# Crops from concurrent requests are recognized together (see batcher.py).
+OCR_BATCHING = _env_bool("OCR_BATCHING", True)
+# Flush a batch once it holds this many crops...
+OCR_BATCH_SIZE = _env_int("OCR_BATCH_SIZE", 32)
+# ...or once the oldest request has waited this long.
+OCR_BATCH_WAIT_MS = _env_float("OCR_BATCH_WAIT_MS", 10.0)
+
+# --- Extraction cache ---
+# Results kept in memory, keyed by a hash of the file bytes + doc_type + engine settings.
+CACHE_MAX_ITEMS = _env_int("CACHE_MAX_ITEMS", 256)
+# SQLite file for a second cache tier that survives restarts. Empty disables it.
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "")
+CACHE_DISK_MAX_ITEMS = _env_int("CACHE_DISK_MAX_ITEMS", 10000)
+
+# --- Near duplicates ---
+# Reuse the cached result of an image that was extracted before and has only
+# been re-compressed, resized or re-encoded since (see dedup.py). Off by
+# default: a false match returns another document's fields.
+NEAR_DUPLICATES = _env_bool("NEAR_DUPLICATES", False)
+# Images whose fingerprints are kept (30-200 KB each). Their results must still be in the cache to be reused.
+NEAR_DUPLICATE_MAX_ITEMS = _env_int("NEAR_DUPLICATE_MAX_ITEMS", 2000)
+# pHash bits two copies of one image may differ in.
+NEAR_DUPLICATE_DISTANCE = _env_int("NEAR_DUPLICATE_DISTANCE", 6)
+
+# --- Record store ---
+# SQLite file where every extraction is kept with per-field indexes for bulk
+# verification (see record_store.py). Empty disables it.
+RECORD_DB_PATH = os.environ.get("RECORD_DB_PATH", "")
+
+# --- PDF ---
+# Resolution used to render PDF pages that have no text layer.
+PDF_DPI = _env_int("PDF_DPI", 200)
+# Pages OCRed in parallel within one PDF.
+PDF_PAGE_WORKERS = _env_int("PDF_PAGE_WORKERS", 2)
+# A page whose embedded text has at least this many characters skips OCR.
+PDF_TEXT_LAYER_MIN_CHARS = _env_int("PDF_TEXT_LAYER_MIN_CHARS", 20)
+
+# --- Preprocessing ---
+# Profile from preprocessing.PROFILES: "fast", "balanced" or "quality".
+PREPROCESS_PROFILE = os.environ.get("PREPROCESS_PROFILE", "quality")
+# Per doc_type overrides, e.g. "printed=fast,handwritten=quality".
+PREPROCESS_PROFILES = _env_map("PREPROCESS_PROFILES", {})
+# Directory for preprocessed debug images. Empty disables the dump.
+PREPROCESS_DEBUG_DIR = os.environ.get("PREPROCESS_DEBUG_DIR", "")
+
+# --- Form templates ---
+# Directory holding registered form templates (<name>.json + <name>.png).
+TEMPLATE_DIR = os.environ.get("TEMPLATE_DIR", "templates")
+
+# --- Observability ---
+# Python logging level: DEBUG, INFO, WARNING, ...
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# "json" for one JSON object per line, "text" for plain lines.
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# Log OCR output and extracted fields at DEBUG level. Off by default: it puts
+# personal data from the documents into the logs.
+LOG_DOCUMENT_TEXT = _env_bool("LOG_DOCUMENT_TEXT", False)
+# Allow profiling single requests that send "X-Profile: 1".
+PROFILING_ENABLED = _env_bool("PROFILING_ENABLED", False)
+# Where profiler reports are written.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+# --- Uploads ---
+# Largest accepted upload in MB; bigger files get 413. 0 disables the limit.
+UPLOAD_MAX_MB = _env_int("UPLOAD_MAX_MB", 50)
+# Directory for spooled uploads. Empty uses the system temp directory.
+UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR", "")
+# Longest side the web frontend uploads (GET /config); bigger photos are
+# downscaled and re-encoded in the browser. 0 uploads full resolution.
+CLIENT_MAX_SIDE = _env_int("CLIENT_MAX_SIDE", 2560)
+# JPEG quality (0-1) the frontend re-encodes downscaled images at.
+CLIENT_JPEG_QUALITY = _env_float("CLIENT_JPEG_QUALITY", 0.92)
+# Decode images wider than twice this at 1/2, 1/4 or 1/8 resolution, even
+# with a profile that keeps full resolution. 0 leaves it to the profile.
+DECODE_MAX_WIDTH = _env_int("DECODE_MAX_WIDTH", 0)
+
+# --- Tiling ---
+# Detect text in overlapping tiles: "auto" for pages larger than the
+# detector's 2560 px canvas, "always" or "never".
+OCR_TILING = os.environ.get("OCR_TILING", "auto")
+# Tile edge length and overlap in px. The overlap must be taller than a line of text.
+TILE_SIZE = _env_int("TILE_SIZE", 1536)
+TILE_OVERLAP = _env_int("TILE_OVERLAP", 128)
+# Tiles detected in parallel within one page.
+TILE_WORKERS = _env_int("TILE_WORKERS", 2)
+
+# --- Languages ---
+# Languages read by default, e.g. "en" or "en,hi" (see language_cascade.py).
+OCR_LANGUAGES = os.environ.get("OCR_LANGUAGES", "en,hi")
+# Per doc_type overrides, e.g. "printed=en,handwritten=en+hi".
+OCR_LANGUAGES_BY_DOC_TYPE = _env_map("OCR_LANGUAGES_BY_DOC_TYPE", {})
+# Read every crop with the English model first and only send Devanagari-looking
+# or low-confidence crops to the multi-language model.
+OCR_CASCADE = _env_bool("OCR_CASCADE", True)
+# English readings below this confidence are retried with the full language set.
+CASCADE_MIN_CONFIDENCE = _env_float("CASCADE_MIN_CONFIDENCE", 0.5)
+
+# --- Image quality ---
+# Skip OCR on pages that can't be read (blank, far too blurry, no contrast,
+# tiny text) and return their quality metrics instead (see quality.py).
+QUALITY_GATE = _env_bool("QUALITY_GATE", True)
+# Skip the preprocessing steps a page doesn't need (denoise on clean pages,
+# upscaling of large text, ...) and straighten skewed pages.
+ADAPTIVE_PREPROCESS = _env_bool("ADAPTIVE_PREPROCESS", True)
+
+# --- Field extraction ---
+# "text" parses the recognized lines in detection order. "layout" pairs
+# labels with values by the position of the recognized boxes and reports a
+# confidence per field (see layout.py); opt in with FIELD_EXTRACTION=layout.
+FIELD_EXTRACTION = os.environ.get("FIELD_EXTRACTION", "text")
+
+# --- Batch jobs ---
+# Job database and uploaded files waiting to be read (see jobs.py).
+JOB_DIR = os.environ.get("JOB_DIR", "jobs")
+# Job documents read at the same time. They only take idle OCR workers.
+JOB_CONCURRENCY = _env_int("JOB_CONCURRENCY", 1)
+# Most documents (files, or images and PDFs in zip archives) in one job.
+JOB_MAX_DOCUMENTS = _env_int("JOB_MAX_DOCUMENTS", 10000)
+# Largest POST /jobs upload (a zip archive, or all the files together), in MB.
+# Each document in it is still limited to UPLOAD_MAX_MB. 0 disables the limit.
+JOB_UPLOAD_MAX_MB = _env_int("JOB_UPLOAD_MAX_MB", 2048)
+# Most the zip archives of one job may unpack to, in MB. Scans barely
+# compress, so twice the upload limit leaves room. 0 disables the limit.
+JOB_UNPACKED_MAX_MB = _env_int("JOB_UNPACKED_MAX_MB", 2 * JOB_UPLOAD_MAX_MB)
+# Finished jobs and their results are deleted after this many days. 0 keeps them.
+JOB_RETENTION_DAYS = _env_int("JOB_RETENTION_DAYS", 7)
+
+# --- Live OCR ---
+# Frames read per second on each /live connection; the rest are only
+# checked for motion and sharpness (see live.py).
+LIVE_MAX_FPS = _env_float("LIVE_MAX_FPS", 2.0)
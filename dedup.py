@@ -0,0 +1,254 @@
+"""
+Near-duplicate detection, so a document sent again isn't OCRed again.
+
+The same scan often comes back re-compressed by a chat app, resized, or
+converted from PNG to JPEG: different bytes, so the extraction cache misses
+it. Every image extracted is fingerprinted after scaling it to
+FINGERPRINT_WIDTH, so JPEG and PNG copies are compared at the same size:
+
+- phash: 64-bit perceptual hash (low frequencies of the DCT of a 32x32
+         thumbnail), kept in a BK-tree per doc_type and engine signature,
+         finds candidates within `max_distance` bits
+- ink:   how dark each pixel is relative to the page's paper and ink,
+         lightly blurred, kept PNG-compressed. It confirms a candidate
+         pixel by pixel: cards printed from one template have nearly the
+         same pHash whoever they belong to, and a single changed digit of a
+         phone or ID number is only a few dozen pixels. Re-encoding and
+         resizing move pixels by well under PIXEL_DIFFERENCE; a changed
+         character moves a cluster of them by more.
+
+Re-photographed documents (another angle, focus or crop) are not matched,
+since they no longer line up pixel for pixel with the original.
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Images are compared at this width, or the narrower one's own width if
+# smaller. At 1000 px a digit of 10 pt text on an A4 scan is about 8 px wide.
+FINGERPRINT_WIDTH = 1000
+HASH_SIZE = 32
+# Blur (in pixels at FINGERPRINT_WIDTH) that absorbs resampling and JPEG noise
+INK_BLUR = 1.0
+# Stored ink value of the page's darkest ink (paper is 0)
+INK_LEVELS = 16
+# Width of the copy the paper and ink levels are measured on
+LEVELS_WIDTH = 250
+# A pixel has changed when its ink differs by this share of the page's ink
+# contrast. Re-encoded (JPEG q35 and up) and half-size copies of synthetic
+# cards, forms and dense 14 px text pages change no tile; one changed digit
+# changes about 4% of a tile or more.
+PIXEL_DIFFERENCE = 0.5
+# Pages are checked in TILE x TILE tiles (at FINGERPRINT_WIDTH); any tile
+# with more than this share of changed pixels means a different document
+TILE = 16
+MAX_CHANGED_SHARE = 0.01
+# Copies keep their aspect ratio (height / width) within this
+MAX_ASPECT_DIFFERENCE = 0.01
+
+
+def _popcount(value):
+    return bin(value).count("1")
+
+
+def _ink(gray, blur):
+    # Paper and ink levels come from a small copy, so a page and a
+    # downscaled copy of it (whose thin strokes are lighter) get the same scale
+    h, w = gray.shape
+    levels = cv2.resize(gray, (LEVELS_WIDTH, max(1, round(h * LEVELS_WIDTH / w))), interpolation=cv2.INTER_AREA)
+    paper = float(np.median(levels))
+    ink = float(np.percentile(levels, 1))
+    darkness = (paper - gray.astype(np.float32)) / max(paper - ink, 1.0)
+    darkness = cv2.GaussianBlur(darkness, (0, 0), blur)
+    return np.clip(np.round(darkness * INK_LEVELS), 0, 255).astype(np.uint8)
+
+
+class Fingerprint:
+    __slots__ = ("phash", "width", "height", "ink_png")
+
+    def __init__(self, phash, width, height, ink_png):
+        self.phash = phash
+        self.width = width
+        self.height = height
+        self.ink_png = ink_png
+
+    def ink(self):
+        return cv2.imdecode(self.ink_png, cv2.IMREAD_GRAYSCALE)
+
+
+def fingerprint(gray):
+    """Fingerprint of a grayscale page decoded at least FINGERPRINT_WIDTH wide (see the module docstring)."""
+    h, w = gray.shape
+    if w > FINGERPRINT_WIDTH:
+        h = max(1, round(h * FINGERPRINT_WIDTH / w))
+        w = FINGERPRINT_WIDTH
+        gray = cv2.resize(gray, (w, h), interpolation=cv2.INTER_AREA)
+
+    small = cv2.resize(gray, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    # The top-left 8x8 DCT coefficients without the DC term, against their median
+    low = cv2.dct(small)[:8, :8].flatten()[1:]
+    bits = low > np.median(low)
+    phash = int("".join("1" if bit else "0" for bit in bits), 2)
+
+    ink = _ink(gray, INK_BLUR * w / FINGERPRINT_WIDTH)
+    return Fingerprint(phash, w, h, cv2.imencode(".png", ink)[1])
+
+
+def changed_share(a, b):
+    """
+    Largest share of changed pixels in any tile of two fingerprints, compared
+    at the narrower one's size; 1.0 if their aspect ratios differ.
+    """
+    if abs(a.height / a.width - b.height / b.width) > MAX_ASPECT_DIFFERENCE:
+        return 1.0
+    if a.width > b.width:
+        a, b = b, a
+    ink_a = a.ink().astype(np.int16)
+    ink_b = b.ink()
+    if ink_b.shape != ink_a.shape:
+        ink_b = cv2.resize(ink_b, (a.width, a.height), interpolation=cv2.INTER_AREA)
+    changed = (np.abs(ink_a - ink_b) > PIXEL_DIFFERENCE * INK_LEVELS).astype(np.float32)
+
+    tile = max(4, round(TILE * a.width / FINGERPRINT_WIDTH))
+    rows, cols = a.height // tile, a.width // tile
+    if not rows or not cols:
+        return float(changed.mean())
+    # Tiles shifted by half a tile too, so a change on a tile corner isn't split four ways
+    shares = [
+        changed[dy:dy + (rows - 1 if dy else rows) * tile, dx:dx + (cols - 1 if dx else cols) * tile]
+        for dy, dx in ((0, 0), (tile // 2, tile // 2))
+    ]
+    return max(
+        float(c.reshape(c.shape[0] // tile, tile, c.shape[1] // tile, tile).mean(axis=(1, 3)).max())
+        for c in shares if c.size
+    )
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance."""
+    def __init__(self):
+        # Node: [hash, values, {distance: child node}]
+        self.root = None
+        self.size = 0
+
+    def add(self, key, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [key, [value], {}]
+            return
+        node = self.root
+        while True:
+            distance = _popcount(node[0] ^ key)
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [value], {}]
+                return
+            node = child
+
+    def search(self, key, max_distance):
+        """[(distance, value)] within `max_distance` bits, nearest first."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = _popcount(node[0] ^ key)
+            if distance <= max_distance:
+                found += [(distance, value) for value in node[1]]
+            # Triangle inequality: only these subtrees can hold a match
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class _Entry:
+    __slots__ = ("document_id", "scope", "fingerprint", "seconds")
+
+    def __init__(self, document_id, scope, fingerprint, seconds):
+        self.document_id = document_id
+        self.scope = scope
+        self.fingerprint = fingerprint
+        self.seconds = seconds
+
+
+class NearDuplicateIndex:
+    """
+    Fingerprints of the last `max_items` extracted images. A scope
+    (doc_type and engine signature) only matches documents extracted the
+    same way, like the extraction cache key.
+    """
+    def __init__(self, max_items=2000, max_distance=6):
+        self.max_items = max_items
+        self.max_distance = max_distance
+        self._trees = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.rejected = 0
+        self.seconds_saved = 0.0
+
+    def find(self, fingerprint, scope):
+        """The stored entry `fingerprint` is a near duplicate of, or None."""
+        with self._lock:
+            self.lookups += 1
+            tree = self._trees.get(scope)
+            found = tree.search(fingerprint.phash, self.max_distance) if tree is not None else []
+            # Evicted entries stay in the tree until it is rebuilt
+            candidates = [entry for _, entry in found if self._entries.get(entry.document_id) is entry]
+        # Confirmed outside the lock; each comparison decodes a stored ink map
+        rejected = 0
+        match = None
+        for entry in candidates:
+            if changed_share(fingerprint, entry.fingerprint) <= MAX_CHANGED_SHARE:
+                match = entry
+                break
+            rejected += 1
+        with self._lock:
+            self.rejected += rejected
+        return match
+
+    def record_hit(self, entry):
+        """Counts a result reused for `entry`, and the OCR time that saved."""
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += entry.seconds
+
+    def add(self, fingerprint, scope, document_id, seconds):
+        """Remembers an extracted image; `seconds` is what its OCR took."""
+        entry = _Entry(document_id, scope, fingerprint, seconds)
+        with self._lock:
+            if document_id in self._entries:
+                return
+            self._entries[document_id] = entry
+            self._trees.setdefault(scope, BKTree()).add(fingerprint.phash, entry)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+            # BK-trees can't delete, so drop evicted entries by rebuilding once they are half the tree
+            if sum(tree.size for tree in self._trees.values()) > 2 * max(self.max_items, len(self._entries)):
+                self._rebuild()
+
+    def _rebuild(self):
+        self._trees = {}
+        for entry in self._entries.values():
+            self._trees.setdefault(entry.scope, BKTree()).add(entry.fingerprint.phash, entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._entries),
+                "capacity": self.max_items,
+                "max_distance": self.max_distance,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "rejected": self.rejected,
+                "duplicate_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+            }
@@ -0,0 +1,112 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extraction results.
+
+    Keys are a SHA-256 of the file bytes, doc_type and the engine signature,
+    so the same upload is only OCRed once and the key doubles as the
+    document id returned by /extract. An in-memory LRU sits in front of an
+    optional SQLite table that survives restarts.
+    """
+    def __init__(self, max_items=256, db_path=None, disk_max_items=10000):
+        self.max_items = max_items
+        self.disk_max_items = disk_max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._puts = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_extractions_created ON extractions(created)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(file_bytes, doc_type, signature):
+        return ExtractionCache.make_key_from_hash(hashlib.sha256(file_bytes), doc_type, signature)
+
+    @staticmethod
+    def make_key_from_hash(content_hash, doc_type, signature):
+        # `content_hash` is a sha256 object already fed the file bytes (see uploads.py)
+        h = content_hash.copy()
+        h.update(b"\0")
+        h.update(str(doc_type).encode("utf-8"))
+        h.update(b"\0")
+        h.update(signature.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(self._memory[key])
+
+            if self._db is not None:
+                row = self._db.execute("SELECT result FROM extractions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return copy.deepcopy(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, result)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extractions (key, result, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(result, ensure_ascii=False), time.time()),
+                )
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    self._prune_disk()
+                self._db.commit()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        self._db.execute(
+            "DELETE FROM extractions WHERE key NOT IN "
+            "(SELECT key FROM extractions ORDER BY created DESC LIMIT ?)",
+            (self.disk_max_items,),
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            stats = {
+                "memory_items": len(self._memory),
+                "memory_capacity": self.max_items,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+            if self._db is not None:
+                stats["disk_items"] = self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            return stats
@@ -0,0 +1,434 @@
+import re
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Field schema: field key -> label keywords. Order matters, earlier fields win ties.
+FIELD_MAPPINGS = {
+    "name": ["Name", "First Name", "Full Name", "Student Name", "नाम"],
+    "age": ["Age", "Years", "DOB", "Date of Birth", "आयु", "उम्र"],
+    "gender": ["Gender", "Sex", "लिंग"],
+    "address": ["Address", "Add", "Residing at", "Location", "Permanent Address", "पता"],
+    "id_number": ["ID", "ID Number", "Ref No", "Roll No", "पहचान पत्र"],
+    "email": ["Email", "E-mail", "Mail", "ईमेल"],
+    "phone": ["Phone", "Mobile", "Cell", "Tel", "Contact", "फोन", "मोबाइल"]
+}
+
+NOISE_WORDS = {"id", "no", "number", "num", "#", "code", "address", "value", "val"}
+
+ADDRESS_KEYWORDS = ["Street", "St.", "Road", "Rd", "Lane", "Ave", "Apartment", "Apt", "Floor", "Block", "District", "State", "Pin", "Zip", "Nagar", "Colony", "Sector", "Plot", "Flat", "Suite", "Unit"]
+
+COMMON_DOMAINS = {
+    "gmail.com": ["gmai1.com", "gnail.com", "gmal.com", "gmil.com"],
+    "yahoo.com": ["yaho.com", "yhoo.com"],
+    "hotmail.com": ["hotmai1.com", "hotmal.com"],
+    "outlook.com": ["outlok.com"]
+}
+
+# Labels that may have leaked into the end of an address value
+ADDRESS_STOP_LABELS = ["Phone", "Email", "Gender", "ID", "Age", "Name"]
+
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_LABEL_RE = re.compile(r'(?:Phone|Mobile|Cell|Tel|Contact)\s*[:\-\.]?\s*([+\d\(\)\-\s]{10,})', re.IGNORECASE)
+AGE_LABEL_RE = re.compile(r'(?:Age|Years)\s*[:\-\.]?\s*(\d{1,3})', re.IGNORECASE)
+AGE_SUFFIX_RE = re.compile(r'(\d{1,3})\s*(?:Years|Yrs)', re.IGNORECASE)
+TWO_DIGITS_RE = re.compile(r'^\d{2}$')
+HOUSE_NUMBER_RE = re.compile(r'^\d+[\s,]+[a-zA-Z]')
+DATE_RE = re.compile(r'\d{2}[-/]\d{2}[-/]\d{2,4}')
+NON_DIGIT_RE = re.compile(r'\D')
+AGGRESSIVE_PHONE_RE = re.compile(r'\b\d[\d\s\-\(\)]{9,}\d\b')
+MALE_RE = re.compile(r'\b(?:Male|M)\b', re.IGNORECASE)
+FEMALE_RE = re.compile(r'\b(?:Female|F)\b', re.IGNORECASE)
+LATIN_RE = re.compile(r'[a-zA-Z]')
+TRAILING_AGE_RE = re.compile(r'(\d{1,3})$')
+
+# Score thresholds
+LABEL_SCORE = 70
+SPLIT_WORD_SCORE = 85
+OTHER_LABEL_SCORE = 80
+
+
+class FieldMatcher:
+    """
+    Turns OCR text into structured fields.
+
+    Everything derived from the schema (keyword regexes, the keyword column
+    layout used for fuzzy matching) is built once here. Fuzzy label lookup
+    scores every line against every keyword in a single rapidfuzz cdist call
+    instead of one extractOne per line and field.
+    """
+    def __init__(self, cleaner, field_mappings=FIELD_MAPPINGS):
+        # `cleaner` provides the clean_* / normalize_digits helpers (OCREngine)
+        self.cleaner = cleaner
+        self.field_mappings = field_mappings
+        self.field_keys = list(field_mappings)
+
+        # Flat keyword list with a column slice per field
+        self.keywords = []
+        self.field_slices = []
+        for key in self.field_keys:
+            start = len(self.keywords)
+            self.keywords.extend(field_mappings[key])
+            self.field_slices.append(slice(start, len(self.keywords)))
+
+        # Exact label hits: one alternation finds whether any keyword occurs
+        # at all; only lines that hit it are scanned keyword by keyword.
+        self.any_keyword_re = re.compile("|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True)))
+        self.keyword_res = [(k, re.compile(f"\\b{re.escape(k)}\\b", re.IGNORECASE)) for k in self.keywords]
+
+        # Lowercased labels of every field except name, for the name fallback
+        self.other_label_keywords = [k.lower() for key in self.field_keys if key != "name" for k in field_mappings[key]]
+        self.name_prefix_res = [
+            (nk.lower(), re.compile(f"^{re.escape(nk)}[:\\-\\.]?\\s*", re.IGNORECASE))
+            for nk in field_mappings.get("name", [])
+        ]
+        self.address_keywords = [k.lower() for k in ADDRESS_KEYWORDS]
+        self.address_stop_res = [(k, re.compile(f"{k}[:\\s]", re.IGNORECASE)) for k in ADDRESS_STOP_LABELS]
+
+    def _field_scores(self, queries, scorer, score_cutoff=None):
+        """
+        Best score per field for each query: array of shape (len(queries), n_fields).
+        Scores below score_cutoff come back as 0, which lets rapidfuzz skip work.
+        """
+        scores = process.cdist(queries, self.keywords, scorer=scorer, dtype=np.float64, score_cutoff=score_cutoff)
+        return np.stack([scores[:, s].max(axis=1) for s in self.field_slices], axis=1)
+
+    def split_line(self, line):
+        # Break lines like "Name: X Age: 30" into one segment per label
+        if not self.any_keyword_re.search(line):
+            return [line]
+
+        found_indices = []
+        for keyword, pattern in self.keyword_res:
+            if keyword in line:
+                for m in pattern.finditer(line):
+                    found_indices.append(m.start())
+
+        if len(found_indices) <= 1:
+            return [line]
+
+        segments = []
+        found_indices.sort()
+        last_idx = 0
+        for idx in found_indices:
+            if idx > last_idx:
+                segment = line[last_idx:idx].strip()
+                if segment: segments.append(segment)
+            last_idx = idx
+        if last_idx < len(line):
+            segments.append(line[last_idx:].strip())
+        return segments
+
+    def refine(self, fields):
+        cleaner = self.cleaner
+
+        # Values that swallowed another label ("John Age 30") are split at that label
+        candidates = []
+        for key, val in list(fields.items()):
+            if not val or len(val) < 5: continue
+            words = val.split()
+            for i, word in enumerate(words):
+                if i == 0 and len(words) == 1: continue
+                clean_word = word.strip(":,.-")
+                if len(clean_word) < 3: continue
+                candidates.append((key, words, i, clean_word))
+
+        if candidates:
+            word_scores = self._field_scores([c[3] for c in candidates], fuzz.ratio, SPLIT_WORD_SCORE)
+            done_keys = set()
+            for row, (key, words, i, _) in enumerate(candidates):
+                if key in done_keys: continue
+
+                # The last matching field in schema order wins
+                best_label = None
+                for col, f_key in enumerate(self.field_keys):
+                    if f_key == key: continue
+                    if word_scores[row, col] > SPLIT_WORD_SCORE:
+                        best_label = f_key
+
+                if best_label:
+                    fields[key] = " ".join(words[:i]).strip()
+                    if not fields.get(best_label):
+                        fields[best_label] = " ".join(words[i+1:]).strip()
+                    done_keys.add(key)
+
+        if fields.get("name"):
+            name_val = fields["name"]
+            match = TRAILING_AGE_RE.search(name_val.strip())
+            if match:
+                extracted_age = match.group(1)
+                if not fields.get("age"):
+                    fields["age"] = extracted_age
+                fields["name"] = name_val[:match.start()].strip()
+
+        if fields.get("address"):
+            addr = fields["address"]
+            for key, pattern in self.address_stop_res:
+                if key in addr:
+                    parts = pattern.split(addr)
+                    if len(parts) > 1:
+                        fields["address"] = parts[0].strip()
+
+        if fields.get("name"): fields["name"] = cleaner.clean_name(fields["name"])
+        if fields.get("age"): fields["age"] = NON_DIGIT_RE.sub('', cleaner.normalize_digits(fields["age"]))
+        if fields.get("gender"): fields["gender"] = cleaner.clean_gender(fields["gender"])
+        if fields.get("email"): fields["email"] = cleaner.clean_email(fields["email"])
+        if fields.get("phone"): fields["phone"] = cleaner.clean_phone(fields["phone"])
+        if fields.get("address"): fields["address"] = cleaner.clean_address(fields["address"])
+
+        return fields
+
+    def _label_fields(self, lines):
+        """
+        Field key per line, or None. A line is a label when its first three
+        words score above LABEL_SCORE against some keyword; every line is
+        scored in one cdist call.
+        """
+        label_fields = [None] * len(lines)
+        if lines:
+            line_starts = [" ".join(line.split()[:3]) for line in lines]
+            scores = self._field_scores(line_starts, fuzz.token_set_ratio)
+            best = scores.argmax(axis=1)
+            for n, col in enumerate(best):
+                if scores[n, col] > LABEL_SCORE:
+                    label_fields[n] = self.field_keys[col]
+        return label_fields
+
+    def _label_value(self, line, field):
+        """The value written after the label on a label line, or None if there is none worth keeping."""
+        parts = line.split(':', 1)
+        if len(parts) > 1:
+            val = parts[1].strip()
+        else:
+            val = " ".join(line.split()[1:])
+
+        # Normalize digits immediately for validation checks
+        val = self.cleaner.normalize_digits(val)
+        low_val = val.lower().strip()
+
+        if not val:
+            return None
+        if low_val in NOISE_WORDS:
+            return None
+        # Trust the label; refine() cleans odd-looking values later
+        if field == "email" and len(val) < 5:
+            return None
+        return val
+
+    def extract(self, text):
+        fields = {}
+        raw_lines = [line.strip() for line in text.split('\n') if line.strip()]
+
+        processed_lines = []
+        for line in raw_lines:
+            processed_lines.extend(self.split_line(line))
+        label_fields = self._label_fields(processed_lines)
+
+        current_field = None
+        i = 0
+        while i < len(processed_lines):
+            line = processed_lines[i]
+            best_match_field = label_fields[i]
+            i += 1
+
+            if best_match_field:
+                current_field = best_match_field
+                val = self._label_value(line, current_field)
+
+                if val is not None:
+                    # Only overwrite if current is empty or new value is longer/better
+                    if not fields.get(current_field) or len(val) > len(fields[current_field]):
+                        fields[current_field] = val
+                else:
+                    if i < len(processed_lines):
+                        next_line = processed_lines[i]
+                        if label_fields[i] is None:
+                            # Only overwrite if current is empty
+                            if not fields.get(current_field):
+                                fields[current_field] = next_line
+                            i += 1
+                        else:
+                            # Don't overwrite with empty if we already have something
+                            if not fields.get(current_field):
+                                fields[current_field] = ""
+
+            elif current_field:
+                if current_field == "address":
+                    if "Country" in line or "Post" in line:
+                        pass
+                    elif fields.get(current_field):
+                        fields[current_field] += ", " + line
+                    else:
+                        fields[current_field] = line
+
+        return self._fallbacks(self.refine(fields), text, raw_lines)
+
+    def extract_layout(self, layout):
+        """
+        Fields from a PageLayout (see layout.py), paired by position instead
+        of line order. Returns (fields, confidence), where confidence holds
+        the lowest recognizer score of the cells each value was read from.
+        """
+        segments = []
+        for cell in layout.cells:
+            parts = self.split_line(cell.text)
+            segments += [(cell, part, n == len(parts) - 1) for n, part in enumerate(parts)]
+        label_fields = self._label_fields([part for _, part, _ in segments])
+
+        # Cells holding a label are never another label's value
+        labels = {id(cell) for (cell, _, _), field in zip(segments, label_fields) if field}
+        taken = set()
+
+        def free(cell):
+            return id(cell) not in labels and id(cell) not in taken
+
+        # Labels claim their values first, so an address never runs on into
+        # the value of the label below it
+        pairs = []
+        for (cell, part, last), field in zip(segments, label_fields):
+            if field is None:
+                continue
+            val = self._label_value(part, field)
+            if val is not None:
+                pairs.append((field, val, [cell]))
+                continue
+            # Only the last label of a cell can own the text beside or under it
+            target = (layout.right_of(cell, free) or layout.below(cell, free)) if last else None
+            if target is not None:
+                taken.add(id(target))
+                pairs.append((field, target.text, [target]))
+            else:
+                pairs.append((field, "", []))
+
+        fields = {}
+        sources = {}
+        for field, val, used in pairs:
+            if field == "address" and used:
+                # The address goes on in the free cells directly beneath it
+                below = layout.below(used[-1], free)
+                while below is not None and "Country" not in below.text and "Post" not in below.text:
+                    taken.add(id(below))
+                    val += ", " + below.text
+                    used.append(below)
+                    below = layout.below(below, free)
+
+            if not val:
+                # Don't overwrite with empty if we already have something
+                fields.setdefault(field, "")
+            elif not fields.get(field) or len(val) > len(fields[field]):
+                fields[field] = val
+                sources[field] = used
+
+        text = layout.text
+        fields = self._fallbacks(self.refine(fields), text, [cell.text for cell in layout.cells])
+
+        confidence = {}
+        for key, value in fields.items():
+            if not value:
+                continue
+            if key in sources:
+                confidence[key] = round(min(cell.confidence for cell in sources[key]), 4)
+            else:
+                # Found by refine() or a fallback: score the cell it came from
+                confidence[key] = layout.confidence_for(value)
+        return fields, confidence
+
+    def _fallbacks(self, fields, text, raw_lines):
+        """Searches the whole text for fields no label gave a value for."""
+        if not fields.get("email"):
+            email_match = EMAIL_RE.search(text)
+            if email_match:
+                fields["email"] = email_match.group(0)
+
+        if not fields.get("phone"):
+            phone_match = PHONE_LABEL_RE.search(text)
+            if phone_match:
+                fields["phone"] = phone_match.group(1).strip()
+
+        if not fields.get("age"):
+            age_match = AGE_LABEL_RE.search(text)
+            if age_match:
+                fields["age"] = age_match.group(1)
+            else:
+                age_match_suffix = AGE_SUFFIX_RE.search(text)
+                if age_match_suffix:
+                    fields["age"] = age_match_suffix.group(1)
+                else:
+                    # Standalone Age Fallback: a line that is JUST a number (18-99)
+                    for line in raw_lines:
+                        if TWO_DIGITS_RE.match(line):
+                            val = int(line)
+                            if 18 <= val <= 99:
+                                fields["age"] = str(val)
+                                break
+
+        # Fallback: Address (Content-Based)
+        if not fields.get("address"):
+            potential_address = []
+            for line in raw_lines:
+                if len(line) < 5: continue
+                low_line = line.lower()
+                if any(k in low_line for k in self.address_keywords):
+                    potential_address.append(line)
+
+            if potential_address:
+                fields["address"] = ", ".join(potential_address[:3])
+            else:
+                # Lines starting with a house number, e.g. "123 MG Road"
+                for line in raw_lines:
+                    if HOUSE_NUMBER_RE.match(line) and len(line) > 10:
+                        # Exclude dates (DD/MM/YYYY) and Phones (10 digits)
+                        if not DATE_RE.search(line) and len(NON_DIGIT_RE.sub('', line)) < 10:
+                            fields["address"] = line
+                            break
+
+        # Aggressive Phone: any 10+ digit sequence if still missing
+        if not fields.get("phone"):
+            agg_phone = AGGRESSIVE_PHONE_RE.search(text)
+            if agg_phone:
+                val = agg_phone.group(0)
+                if len(NON_DIGIT_RE.sub('', val)) >= 10:
+                    fields["phone"] = val.strip()
+
+        # Fuzzy domain fixer (e.g. "john@gmai1.com")
+        if fields.get("email"):
+            parts = fields["email"].split('@')
+            if len(parts) == 2:
+                domain = parts[1]
+                for correct, typos in COMMON_DOMAINS.items():
+                    if domain in typos or fuzz.ratio(domain, correct) > 85:
+                        fields["email"] = parts[0] + "@" + correct
+                        break
+
+        # Fallback: Gender (Global Search)
+        if not fields.get("gender"):
+            if MALE_RE.search(text):
+                fields["gender"] = "Male"
+            elif FEMALE_RE.search(text):
+                fields["gender"] = "Female"
+
+        # Fallback: Name (first line that isn't another label or a heading)
+        if not fields.get("name") and raw_lines:
+            lowered = [line.lower() for line in raw_lines]
+            label_hits = process.cdist(
+                self.other_label_keywords, lowered, scorer=fuzz.partial_ratio,
+                dtype=np.float64, score_cutoff=OTHER_LABEL_SCORE
+            )
+            is_other_label = (label_hits > OTHER_LABEL_SCORE).any(axis=0)
+
+            for n, clean in enumerate(raw_lines):
+                if is_other_label[n]: continue
+
+                upper = clean.upper()
+                if "CARD" in upper or "FORM" in upper: continue
+
+                if LATIN_RE.search(clean):
+                    for nk_lower, pattern in self.name_prefix_res:
+                        if lowered[n].startswith(nk_lower):
+                            clean = pattern.sub("", clean)
+                            break
+
+                    fields["name"] = clean
+                    break
+
+        return fields
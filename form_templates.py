@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Alignment works on a downscaled copy; enough detail for ORB, cheap to compute
+ALIGN_WIDTH = 1000
+ORB_FEATURES = 1500
+MIN_GOOD_MATCHES = 25
+MIN_INLIERS = 15
+
+TEMPLATE_NAME_RE = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+# Directory mtimes only advance once per clock tick, so a directory changed
+# this recently may change again with the same mtime and is listed every time
+DIRECTORY_SETTLE_NS = 1_000_000_000
+
+
+def _downscale(gray):
+    h, w = gray.shape
+    if w <= ALIGN_WIDTH:
+        return gray, 1.0
+    scale = ALIGN_WIDTH / w
+    return cv2.resize(gray, (ALIGN_WIDTH, int(h * scale)), interpolation=cv2.INTER_AREA), scale
+
+
+class FormTemplate:
+    """
+    A fixed form layout: a reference image and named field boxes given as
+    [x0, y0, x1, y1] fractions of the reference page.
+    """
+    def __init__(self, name, reference, fields, doc_types=None):
+        self.name = name
+        self.reference = reference
+        self.fields = fields
+        self.doc_types = doc_types or []
+
+        digest = hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8"))
+        digest.update(reference.tobytes())
+        self.version = digest.hexdigest()[:12]
+
+        small, self._scale = _downscale(reference)
+        self._keypoints, self._descriptors = cv2.ORB_create(nfeatures=ORB_FEATURES).detectAndCompute(small, None)
+
+    def align(self, gray):
+        """
+        Warps `gray` onto the reference page. Returns (aligned, inliers), or
+        (None, inliers) when the page doesn't look like this template.
+        """
+        if self._descriptors is None:
+            return None, 0
+
+        small, scale = _downscale(gray)
+        # A fresh detector per call; OpenCV algorithm objects aren't thread-safe
+        keypoints, descriptors = cv2.ORB_create(nfeatures=ORB_FEATURES).detectAndCompute(small, None)
+        if descriptors is None or len(keypoints) < MIN_GOOD_MATCHES:
+            return None, 0
+
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        good = []
+        for pair in matcher.knnMatch(descriptors, self._descriptors, k=2):
+            # Lowe's ratio test
+            if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance:
+                good.append(pair[0])
+        if len(good) < MIN_GOOD_MATCHES:
+            return None, 0
+
+        # Keypoints back to full-resolution coordinates on both sides
+        src = np.float32([keypoints[m.queryIdx].pt for m in good]) / scale
+        dst = np.float32([self._keypoints[m.trainIdx].pt for m in good]) / self._scale
+        homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        inliers = int(mask.sum()) if mask is not None else 0
+        if homography is None or inliers < MIN_INLIERS:
+            return None, inliers
+
+        # Reject degenerate warps (mirrored, collapsed or wildly skewed pages)
+        h, w = gray.shape
+        corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]]).reshape(-1, 1, 2)
+        warped = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+        ref_h, ref_w = self.reference.shape
+        area = cv2.contourArea(warped)
+        if not cv2.isContourConvex(warped) or area < 0.25 * ref_w * ref_h or area > 4.0 * ref_w * ref_h:
+            return None, inliers
+
+        aligned = cv2.warpPerspective(gray, homography, (ref_w, ref_h), flags=cv2.INTER_LINEAR, borderValue=255)
+        return aligned, inliers
+
+    def boxes(self, width, height):
+        """Field boxes in pixels for an image of the given size, as EasyOCR horizontal_list entries."""
+        boxes = {}
+        for key, (x0, y0, x1, y1) in self.fields.items():
+            boxes[key] = [int(x0 * width), int(x1 * width), int(y0 * height), int(y1 * height)]
+        return boxes
+
+    def to_dict(self):
+        ref_h, ref_w = self.reference.shape
+        return {
+            "name": self.name,
+            "fields": self.fields,
+            "doc_types": self.doc_types,
+            "reference_size": [ref_w, ref_h],
+            "version": self.version
+        }
+
+
+class TemplateRegistry:
+    """
+    Templates live in `directory` as <name>.json (fields, doc_types) plus
+    <name>.png (reference page). Unknown names are looked up on disk again,
+    so templates registered by another process are picked up. Files are
+    written by rename, which changes the directory's mtime; refresh() lists
+    the directory only when that changed.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._templates = {}
+        self._mtimes = {}
+        self._directory_mtime = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Loads templates that are new or changed on disk."""
+        if not self.directory:
+            return
+        try:
+            directory_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if directory_mtime == self._directory_mtime:
+            return
+        if time.time_ns() - directory_mtime > DIRECTORY_SETTLE_NS:
+            self._directory_mtime = directory_mtime
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            name = filename[:-5]
+            try:
+                mtime = os.path.getmtime(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            if self._mtimes.get(name) != mtime:
+                self._load(name)
+
+    @staticmethod
+    def validate(name, fields):
+        if not TEMPLATE_NAME_RE.match(name or ""):
+            raise ValueError("Template name may only contain letters, digits, '_' and '-'")
+        if not isinstance(fields, dict) or not fields:
+            raise ValueError("fields must be a non-empty object of name -> [x0, y0, x1, y1]")
+        for key, box in fields.items():
+            if not isinstance(box, (list, tuple)) or len(box) != 4:
+                raise ValueError(f"Field '{key}' must be [x0, y0, x1, y1]")
+            x0, y0, x1, y1 = box
+            if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+                raise ValueError(f"Field '{key}' must use fractions of the page with x0 < x1 and y0 < y1")
+
+    def _load(self, name):
+        meta_path = os.path.join(self.directory, f"{name}.json")
+        image_path = os.path.join(self.directory, f"{name}.png")
+        if not (os.path.isfile(meta_path) and os.path.isfile(image_path)):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        reference = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if reference is None:
+            return None
+        template = FormTemplate(name, reference, meta["fields"], meta.get("doc_types"))
+        with self._lock:
+            self._templates[name] = template
+            self._mtimes[name] = os.path.getmtime(meta_path)
+        return template
+
+    def register(self, name, reference, fields, doc_types=None):
+        self.validate(name, fields)
+        template = FormTemplate(name, reference, fields, doc_types)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # Renamed into place, so other processes' refresh() sees the directory change
+            # and never reads a half-written file; the .json goes last as it marks a template
+            ok, png = cv2.imencode(".png", reference)
+            if not ok:
+                raise ValueError("Could not encode the reference page")
+            self._replace(f"{name}.png", png.tobytes())
+            meta = json.dumps({"fields": fields, "doc_types": template.doc_types}, indent=2)
+            meta_path = self._replace(f"{name}.json", meta.encode("utf-8"))
+        with self._lock:
+            self._templates[name] = template
+            if self.directory:
+                self._mtimes[name] = os.path.getmtime(meta_path)
+        return template
+
+    def _replace(self, filename, content):
+        path = os.path.join(self.directory, filename)
+        partial = os.path.join(self.directory, f".{filename}.tmp")
+        with open(partial, "wb") as f:
+            f.write(content)
+        os.replace(partial, path)
+        return path
+
+    def get(self, name):
+        with self._lock:
+            template = self._templates.get(name)
+        if self.directory and TEMPLATE_NAME_RE.match(name):
+            meta_path = os.path.join(self.directory, f"{name}.json")
+            if os.path.isfile(meta_path) and os.path.getmtime(meta_path) != self._mtimes.get(name):
+                template = self._load(name)
+        return template
+
+    def for_doc_type(self, doc_type):
+        # Other processes (OCR workers) may have registered templates since startup;
+        # a stat of the directory when none did
+        self.refresh()
+        with self._lock:
+            return [t for t in self._templates.values() if doc_type in t.doc_types]
+
+    def list(self):
+        with self._lock:
+            return [t.to_dict() for t in self._templates.values()]
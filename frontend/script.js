@@ -1,187 +1,338 @@
-const fileInput = document.getElementById('file-input');
-const dropArea = document.getElementById('drop-area');
-const previewContainer = document.getElementById('preview-container');
-const imagePreview = document.getElementById('image-preview');
-const extractBtn = document.getElementById('extract-btn');
-const resultsSection = document.getElementById('results-section');
-const rawText = document.getElementById('raw-text');
-const verifyBtn = document.getElementById('verify-btn');
-const verificationContainer = document.getElementById('verification-container');
-const verificationResults = document.getElementById('verification-results');
-
-let selectedFile = null;
-
-// Drag and drop events
-['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
-    dropArea.addEventListener(eventName, preventDefaults, false);
-});
-
-function preventDefaults(e) {
-    e.preventDefault();
-    e.stopPropagation();
-}
-
-dropArea.addEventListener('drop', handleDrop, false);
-fileInput.addEventListener('change', handleFiles, false);
-
-function handleDrop(e) {
-    const dt = e.dataTransfer;
-    const files = dt.files;
-    handleFiles({ target: { files: files } });
-}
-
-function handleFiles(e) {
-    const files = e.target.files;
-    if (files.length > 0) {
-        selectedFile = files[0];
-        previewFile(selectedFile);
-        extractBtn.classList.remove('hidden');
-        resultsSection.classList.add('hidden');
-    }
-}
-
-function previewFile(file) {
-    if (file.type === 'application/pdf') {
-        imagePreview.src = "https://upload.wikimedia.org/wikipedia/commons/8/87/PDF_file_icon.svg"; // Placeholder
-        imagePreview.style.width = "100px";
-        previewContainer.classList.remove('hidden');
-    } else {
-        const reader = new FileReader();
-        reader.readAsDataURL(file);
-        reader.onloadend = function () {
-            imagePreview.src = reader.result;
-            imagePreview.style.width = "100%";
-            previewContainer.classList.remove('hidden');
-        }
-    }
-}
-
-extractBtn.addEventListener('click', async () => {
-    if (!selectedFile) return;
-
-    extractBtn.textContent = "Processing... (Auto-detecting type)";
-    extractBtn.disabled = true;
-
-    const formData = new FormData();
-    formData.append('file', selectedFile);
-    formData.append('doc_type', 'auto'); // Always auto
-
-    try {
-        const response = await fetch('http://localhost:8000/extract', {
-            method: 'POST',
-            body: formData
-        });
-
-        if (!response.ok) throw new Error('Extraction failed');
-
-        const data = await response.json();
-        rawText.value = data.raw_text;
-
-        // Quality Check
-        if (data.quality_status === "Blurry") {
-            alert(`Warning: The document appears to be blurry (Score: ${Math.round(data.quality_score)}). Accuracy might be low. Consider re-scanning.`);
-        }
-
-        // Show detected type (Optional)
-        console.log("Detected Type:", data.detected_type);
-
-        // Auto-fill fields
-        if (data.fields) {
-            document.getElementById('field-name').value = data.fields.name || '';
-            document.getElementById('field-age').value = data.fields.age || '';
-            document.getElementById('field-gender').value = data.fields.gender || '';
-            document.getElementById('field-id').value = data.fields.id_number || '';
-            document.getElementById('field-address').value = data.fields.address || '';
-            document.getElementById('field-email').value = data.fields.email || '';
-            document.getElementById('field-phone').value = data.fields.phone || '';
-        }
-
-        resultsSection.classList.remove('hidden');
-        resultsSection.scrollIntoView({ behavior: 'smooth' });
-
-    } catch (error) {
-        console.error(error);
-        if (error.message.includes('Failed to fetch')) {
-            alert('Error: Could not connect to the backend server.\n\nPlease make sure you have run "run_app.bat" and the black terminal window is open and running without errors.');
-        } else {
-            alert('Error extracting text: ' + error.message);
-        }
-    } finally {
-        extractBtn.textContent = "Extract Text";
-        extractBtn.disabled = false;
-    }
-});
-
-verifyBtn.addEventListener('click', async () => {
-    if (!selectedFile) return;
-
-    verifyBtn.textContent = "Verifying...";
-    verifyBtn.disabled = true;
-
-    const submittedData = {
-        "name": document.getElementById('field-name').value,
-        "age": document.getElementById('field-age').value,
-        "gender": document.getElementById('field-gender').value,
-        "id_number": document.getElementById('field-id').value,
-        "address": document.getElementById('field-address').value,
-        "email": document.getElementById('field-email').value,
-        "phone": document.getElementById('field-phone').value
-    };
-
-    const formData = new FormData();
-    formData.append('file', selectedFile);
-    formData.append('submitted_data', JSON.stringify(submittedData));
-
-    try {
-        const response = await fetch('http://localhost:8000/verify', {
-            method: 'POST',
-            body: formData
-        });
-
-        if (!response.ok) throw new Error('Verification failed');
-
-        const data = await response.json();
-        displayVerificationResults(data.matches);
-
-        verificationContainer.classList.remove('hidden');
-        verificationContainer.scrollIntoView({ behavior: 'smooth' });
-
-    } catch (error) {
-        alert('Error verifying data: ' + error.message);
-    } finally {
-        verifyBtn.textContent = "Verify Data";
-        verifyBtn.disabled = false;
-    }
-});
-
-function displayVerificationResults(matches) {
-    verificationResults.innerHTML = '';
-
-    for (const [key, score] of Object.entries(matches)) {
-        const div = document.createElement('div');
-        div.className = 'result-item';
-
-        let status = "Mismatch";
-        let statusClass = 'status-mismatch';
-
-        if (score >= 90) {
-            status = "Match";
-            statusClass = 'status-match';
-        } else if (score >= 75) {
-            status = "Partial Match";
-            statusClass = 'status-partial';
-        }
-
-        // Capitalize key
-        const label = key.charAt(0).toUpperCase() + key.slice(1).replace('_', ' ');
-
-        div.innerHTML = `
-            <div>
-                <strong>${label}</strong>
-                <div style="font-size: 0.8rem; color: #666;">Match Score: ${Math.round(score)}%</div>
-            </div>
-            <span class="status-badge ${statusClass}">${status}</span>
-        `;
-        verificationResults.appendChild(div);
-    }
-}
+const fileInput = document.getElementById('file-input');
+const dropArea = document.getElementById('drop-area');
+const previewContainer = document.getElementById('preview-container');
+const imagePreview = document.getElementById('image-preview');
+const extractBtn = document.getElementById('extract-btn');
+const resultsSection = document.getElementById('results-section');
+const rawText = document.getElementById('raw-text');
+const verifyBtn = document.getElementById('verify-btn');
+const verificationContainer = document.getElementById('verification-container');
+const verificationResults = document.getElementById('verification-results');
+const progressContainer = document.getElementById('progress-container');
+const progressBar = document.getElementById('progress-bar');
+const progressText = document.getElementById('progress-text');
+
+const API_URL = 'http://localhost:8000';
+
+let selectedFile = null;
+// What is actually uploaded: the selected image, downscaled to what the server reads
+let uploadFile = null;
+// Returned by /extract; /verify uses it instead of uploading the file again
+let documentId = null;
+
+// The server's preferred input size (GET /config); these defaults apply if it can't be reached
+let uploadLimits = { max_width: null, max_side: 2560, jpeg_quality: 0.92 };
+
+fetch(`${API_URL}/config?doc_type=auto`)
+    .then(response => response.ok ? response.json() : null)
+    .then(config => { if (config) uploadLimits = config; })
+    .catch(() => {});
+
+// Drag and drop events
+['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
+    dropArea.addEventListener(eventName, preventDefaults, false);
+});
+
+function preventDefaults(e) {
+    e.preventDefault();
+    e.stopPropagation();
+}
+
+dropArea.addEventListener('drop', handleDrop, false);
+fileInput.addEventListener('change', handleFiles, false);
+
+function handleDrop(e) {
+    const dt = e.dataTransfer;
+    const files = dt.files;
+    handleFiles({ target: { files: files } });
+}
+
+function handleFiles(e) {
+    const files = e.target.files;
+    if (files.length > 0) {
+        selectedFile = files[0];
+        uploadFile = null;
+        documentId = null;
+        previewFile(selectedFile);
+        extractBtn.classList.remove('hidden');
+        resultsSection.classList.add('hidden');
+    }
+}
+
+function previewFile(file) {
+    if (file.type === 'application/pdf') {
+        imagePreview.src = "https://upload.wikimedia.org/wikipedia/commons/8/87/PDF_file_icon.svg"; // Placeholder
+        imagePreview.style.width = "100px";
+        previewContainer.classList.remove('hidden');
+    } else {
+        const reader = new FileReader();
+        reader.readAsDataURL(file);
+        reader.onloadend = function () {
+            imagePreview.src = reader.result;
+            imagePreview.style.width = "100%";
+            previewContainer.classList.remove('hidden');
+        }
+    }
+}
+
+// Scales an image down to the server's preferred size and re-encodes it as JPEG.
+// PDFs, small images and formats the browser can't decode are uploaded as they are.
+async function prepareUpload(file) {
+    if (!file.type.startsWith('image/')) return file;
+
+    let bitmap;
+    try {
+        bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+    } catch (error) {
+        return file;
+    }
+
+    let scale = 1;
+    if (uploadLimits.max_width) scale = Math.min(scale, uploadLimits.max_width / bitmap.width);
+    if (uploadLimits.max_side) scale = Math.min(scale, uploadLimits.max_side / Math.max(bitmap.width, bitmap.height));
+    if (scale >= 1) {
+        bitmap.close();
+        return file;
+    }
+
+    const width = Math.round(bitmap.width * scale);
+    const height = Math.round(bitmap.height * scale);
+    let blob;
+    if (typeof OffscreenCanvas !== 'undefined') {
+        const canvas = new OffscreenCanvas(width, height);
+        drawScaled(canvas, bitmap, width, height);
+        blob = await canvas.convertToBlob({ type: 'image/jpeg', quality: uploadLimits.jpeg_quality });
+    } else {
+        const canvas = document.createElement('canvas');
+        canvas.width = width;
+        canvas.height = height;
+        drawScaled(canvas, bitmap, width, height);
+        blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', uploadLimits.jpeg_quality));
+    }
+    bitmap.close();
+
+    // An already well-compressed original can be smaller than the re-encoded copy
+    if (!blob || blob.size >= file.size) return file;
+    const name = file.name.replace(/\.[^.]+$/, '') + '.jpg';
+    return new File([blob], name, { type: 'image/jpeg' });
+}
+
+function drawScaled(canvas, bitmap, width, height) {
+    const ctx = canvas.getContext('2d');
+    ctx.imageSmoothingEnabled = true;
+    ctx.imageSmoothingQuality = 'high';
+    ctx.drawImage(bitmap, 0, 0, width, height);
+}
+
+function showProgress(text, fraction) {
+    progressContainer.classList.remove('hidden');
+    progressText.textContent = text;
+    if (fraction === null) {
+        progressBar.removeAttribute('value'); // Indeterminate
+    } else {
+        progressBar.value = fraction;
+    }
+}
+
+function hideProgress() {
+    progressContainer.classList.add('hidden');
+}
+
+// POSTs to /extract/stream and resolves with its final result. XMLHttpRequest
+// reports upload progress; the NDJSON page events report processing progress.
+function extractWithProgress(formData) {
+    return new Promise((resolve, reject) => {
+        const xhr = new XMLHttpRequest();
+        let parsed = 0;
+        let pagesDone = 0;
+        let result = null;
+        let failure = null;
+
+        function readEvents() {
+            const text = xhr.responseText;
+            let end;
+            while ((end = text.indexOf('\n', parsed)) !== -1) {
+                const line = text.slice(parsed, end).trim();
+                parsed = end + 1;
+                if (!line) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'page') {
+                    pagesDone += 1;
+                    showProgress(`Processing... ${pagesDone} page${pagesDone === 1 ? '' : 's'} read`, null);
+                } else if (event.type === 'result') {
+                    result = event;
+                } else if (event.type === 'error') {
+                    failure = new Error(event.detail);
+                }
+            }
+        }
+
+        xhr.open('POST', `${API_URL}/extract/stream`);
+        xhr.upload.onprogress = (e) => {
+            if (e.lengthComputable) {
+                showProgress(`Uploading... ${Math.round(100 * e.loaded / e.total)}%`, e.loaded / e.total);
+            }
+        };
+        xhr.upload.onload = () => showProgress('Processing...', null);
+        xhr.onprogress = () => {
+            if (xhr.status === 200) readEvents();
+        };
+        xhr.onload = () => {
+            if (xhr.status === 503) return reject(new Error('The server is busy, please try again in a moment'));
+            if (xhr.status !== 200) return reject(new Error(`Extraction failed (${xhr.status})`));
+            readEvents();
+            if (failure) return reject(failure);
+            if (!result) return reject(new Error('Extraction failed'));
+            resolve(result);
+        };
+        // Same wording as fetch(), so the "backend not running" hint below still applies
+        xhr.onerror = () => reject(new Error('Failed to fetch'));
+        xhr.send(formData);
+    });
+}
+
+extractBtn.addEventListener('click', async () => {
+    if (!selectedFile) return;
+
+    extractBtn.textContent = "Processing... (Auto-detecting type)";
+    extractBtn.disabled = true;
+
+    try {
+        if (!uploadFile) {
+            showProgress('Preparing image...', null);
+            uploadFile = await prepareUpload(selectedFile);
+        }
+
+        const formData = new FormData();
+        formData.append('file', uploadFile);
+        formData.append('doc_type', 'auto'); // Always auto
+
+        const data = await extractWithProgress(formData);
+        documentId = data.document_id;
+        rawText.value = data.raw_text;
+
+        // Quality Check
+        if (data.quality_status === "Rejected") {
+            // Multi-page PDFs whose pages were all rejected have no single quality report
+            const reason = (data.quality && data.quality.rejected) || 'the image quality is too low';
+            alert(`The document could not be read: ${reason}. Please re-scan it.`);
+        } else if (data.quality_status === "Blurry") {
+            alert(`Warning: The document appears to be blurry (Score: ${Math.round(data.quality_score)}). Accuracy might be low. Consider re-scanning.`);
+        }
+
+        // Show detected type (Optional)
+        console.log("Detected Type:", data.detected_type);
+
+        // Auto-fill fields
+        if (data.fields) {
+            document.getElementById('field-name').value = data.fields.name || '';
+            document.getElementById('field-age').value = data.fields.age || '';
+            document.getElementById('field-gender').value = data.fields.gender || '';
+            document.getElementById('field-id').value = data.fields.id_number || '';
+            document.getElementById('field-address').value = data.fields.address || '';
+            document.getElementById('field-email').value = data.fields.email || '';
+            document.getElementById('field-phone').value = data.fields.phone || '';
+        }
+
+        resultsSection.classList.remove('hidden');
+        resultsSection.scrollIntoView({ behavior: 'smooth' });
+
+    } catch (error) {
+        console.error(error);
+        if (error.message.includes('Failed to fetch')) {
+            alert('Error: Could not connect to the backend server.\n\nPlease make sure you have run "run_app.bat" and the black terminal window is open and running without errors.');
+        } else {
+            alert('Error extracting text: ' + error.message);
+        }
+    } finally {
+        hideProgress();
+        extractBtn.textContent = "Extract Text";
+        extractBtn.disabled = false;
+    }
+});
+
+verifyBtn.addEventListener('click', async () => {
+    if (!selectedFile) return;
+
+    verifyBtn.textContent = "Verifying...";
+    verifyBtn.disabled = true;
+
+    const submittedData = {
+        "name": document.getElementById('field-name').value,
+        "age": document.getElementById('field-age').value,
+        "gender": document.getElementById('field-gender').value,
+        "id_number": document.getElementById('field-id').value,
+        "address": document.getElementById('field-address').value,
+        "email": document.getElementById('field-email').value,
+        "phone": document.getElementById('field-phone').value
+    };
+
+    async function verify(useDocumentId) {
+        const formData = new FormData();
+        if (useDocumentId) {
+            formData.append('document_id', documentId);
+        } else {
+            formData.append('file', uploadFile || selectedFile);
+            formData.append('doc_type', 'auto'); // Same as the extraction, so it reads the same way
+        }
+        formData.append('submitted_data', JSON.stringify(submittedData));
+        return fetch(`${API_URL}/verify`, {
+            method: 'POST',
+            body: formData
+        });
+    }
+
+    try {
+        let response = await verify(Boolean(documentId));
+        if (response.status === 404 && documentId) {
+            // The server no longer has the extraction cached; upload the file again
+            response = await verify(false);
+        }
+
+        if (!response.ok) throw new Error('Verification failed');
+
+        const data = await response.json();
+        displayVerificationResults(data.matches);
+
+        verificationContainer.classList.remove('hidden');
+        verificationContainer.scrollIntoView({ behavior: 'smooth' });
+
+    } catch (error) {
+        alert('Error verifying data: ' + error.message);
+    } finally {
+        verifyBtn.textContent = "Verify Data";
+        verifyBtn.disabled = false;
+    }
+});
+
+function displayVerificationResults(matches) {
+    verificationResults.innerHTML = '';
+
+    for (const [key, score] of Object.entries(matches)) {
+        const div = document.createElement('div');
+        div.className = 'result-item';
+
+        let status = "Mismatch";
+        let statusClass = 'status-mismatch';
+
+        if (score >= 90) {
+            status = "Match";
+            statusClass = 'status-match';
+        } else if (score >= 75) {
+            status = "Partial Match";
+            statusClass = 'status-partial';
+        }
+
+        // Capitalize key
+        const label = key.charAt(0).toUpperCase() + key.slice(1).replace('_', ' ');
+
+        div.innerHTML = `
+            <div>
+                <strong>${label}</strong>
+                <div style="font-size: 0.8rem; color: #666;">Match Score: ${Math.round(score)}%</div>
+            </div>
+            <span class="status-badge ${statusClass}">${status}</span>
+        `;
+        verificationResults.appendChild(div);
+    }
+}
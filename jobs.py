@@ -0,0 +1,364 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Files read from a zip archive; anything else in it is skipped
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+# How often a job worker checks whether the models have loaded
+POLL_SECONDS = 0.2
+# Results returned per database query while streaming JSONL
+RESULT_PAGE = 100
+
+
+class JobDocument:
+    def __init__(self, job_id, seq, filename, path, is_pdf):
+        self.job_id = job_id
+        self.seq = seq
+        self.filename = filename
+        self.path = path
+        self.is_pdf = is_pdf
+
+
+class Job:
+    def __init__(self, job_id, doc_type, template, languages):
+        self.id = job_id
+        self.doc_type = doc_type
+        self.template = template
+        self.languages = languages
+
+
+def is_zip(filename, content_type):
+    return content_type in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def document_kind(filename, content_type=None):
+    """(accepted, is_pdf) for an uploaded file or a zip member."""
+    name = (filename or "").lower()
+    if content_type == "application/pdf" or name.endswith(".pdf"):
+        return True, True
+    if (content_type or "").startswith("image/") or name.endswith(IMAGE_EXTENSIONS):
+        return True, False
+    return False, False
+
+
+def unpack_zip(path, directory, first_seq, max_documents, max_bytes, max_total_bytes=0, unpacked=0):
+    """
+    Extracts the images and PDFs of a zip archive into `directory`.
+    Returns ([(filename, path, is_pdf)], bytes written). Raises ValueError
+    on a bad archive, too many documents, a member larger than `max_bytes`,
+    or more than `max_total_bytes` unpacked in all, counting the `unpacked`
+    bytes of the job's earlier archives (0 = no limit).
+    """
+    documents = []
+    total = unpacked
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ValueError("Not a valid zip archive")
+    with archive:
+        for member in archive.infolist():
+            accepted, is_pdf = document_kind(member.filename)
+            if member.is_dir() or not accepted or os.path.basename(member.filename).startswith("."):
+                continue
+            if len(documents) >= max_documents:
+                raise ValueError(f"A job holds at most {max_documents} documents")
+            if max_bytes and member.file_size > max_bytes:
+                raise ValueError(f"{member.filename} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+            if max_total_bytes and total + member.file_size > max_total_bytes:
+                raise ValueError(_total_error(max_total_bytes))
+            target = os.path.join(directory, _stored_name(first_seq + len(documents), member.filename))
+            with archive.open(member) as src, open(target, "wb") as dst:
+                # file_size comes from the archive header; don't trust it for the copy
+                copied = 0
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    copied += len(chunk)
+                    if max_bytes and copied > max_bytes:
+                        raise ValueError(f"{member.filename} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                    if max_total_bytes and total + copied > max_total_bytes:
+                        raise ValueError(_total_error(max_total_bytes))
+                    dst.write(chunk)
+            total += copied
+            documents.append((member.filename, target, is_pdf))
+    return documents, total - unpacked
+
+
+def _total_error(max_total_bytes):
+    return f"The archives of a job unpack to at most {max_total_bytes // (1024 * 1024)} MB"
+
+
+def _stored_name(seq, filename):
+    # Member names may contain directories or "..", so only the extension is kept
+    return f"{seq:06d}{os.path.splitext(os.path.basename(filename))[1].lower()}"
+
+
+class JobStore:
+    """
+    Batch jobs and their documents in SQLite, so unfinished jobs survive a
+    restart. Uploaded files wait in `<directory>/<job id>/` and are deleted
+    once read; each document's result is kept in the database until the job
+    expires.
+    """
+    def __init__(self, directory, retention_days=7):
+        self.directory = directory
+        self.retention_days = retention_days
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "jobs.db"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, doc_type TEXT NOT NULL, template TEXT, languages TEXT,"
+            "created REAL NOT NULL, finished REAL);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "job_id TEXT NOT NULL, seq INTEGER NOT NULL, filename TEXT NOT NULL, path TEXT NOT NULL,"
+            "is_pdf INTEGER NOT NULL, status TEXT NOT NULL, document_id TEXT, result TEXT, error TEXT,"
+            "PRIMARY KEY (job_id, seq));"
+            "CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status);"
+        )
+        # Documents that were being read when the server stopped are read again
+        self._db.execute("UPDATE documents SET status = 'queued' WHERE status = 'running'")
+        self._db.commit()
+
+    def new_job_dir(self):
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, job_id)
+        os.makedirs(path)
+        return job_id, path
+
+    def discard_job_dir(self, job_id):
+        shutil.rmtree(os.path.join(self.directory, job_id), ignore_errors=True)
+
+    def create(self, job_id, doc_type, template, languages, documents):
+        """Queues a job; `documents` is [(filename, path, is_pdf)]."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, doc_type, template, languages, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, doc_type, template, languages, time.time()),
+            )
+            self._db.executemany(
+                "INSERT INTO documents (job_id, seq, filename, path, is_pdf, status) VALUES (?, ?, ?, ?, ?, 'queued')",
+                [(job_id, seq, name, path, int(is_pdf)) for seq, (name, path, is_pdf) in enumerate(documents)],
+            )
+            self._db.commit()
+
+    def job(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, doc_type, template, languages FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return Job(*row) if row is not None else None
+
+    def claim(self):
+        """The oldest queued document, marked running, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT d.job_id, d.seq, d.filename, d.path, d.is_pdf FROM documents d "
+                "JOIN jobs j ON j.id = d.job_id WHERE d.status = 'queued' "
+                "ORDER BY j.created, d.seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE documents SET status = 'running' WHERE job_id = ? AND seq = ?", (row[0], row[1])
+            )
+            self._db.commit()
+        job_id, seq, filename, path, is_pdf = row
+        return JobDocument(job_id, seq, filename, path, bool(is_pdf))
+
+    def finish(self, document, document_id, result=None, error=None):
+        """Stores a document's result (or error) and deletes its file."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET status = ?, document_id = ?, result = ?, error = ? WHERE job_id = ? AND seq = ?",
+                (
+                    "failed" if error else "done", document_id,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                    document.job_id, document.seq,
+                ),
+            )
+            remaining = self._db.execute(
+                "SELECT COUNT(*) FROM documents WHERE job_id = ? AND status IN ('queued', 'running')",
+                (document.job_id,),
+            ).fetchone()[0]
+            if not remaining:
+                self._db.execute("UPDATE jobs SET finished = ? WHERE id = ?", (time.time(), document.job_id))
+            self._db.commit()
+        try:
+            os.remove(document.path)
+        except FileNotFoundError:
+            pass
+        if not remaining:
+            self.discard_job_dir(document.job_id)
+        return not remaining
+
+    def progress(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT doc_type, template, languages, created, finished FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM documents WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        doc_type, template, languages, created, finished = row
+        counts = {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}
+        total = sum(counts.values())
+        if finished is not None:
+            status = "done"
+        elif counts["queued"] == total:
+            status = "queued"
+        else:
+            status = "running"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "doc_type": doc_type,
+            "template": template,
+            "languages": languages,
+            "total": total,
+            **counts,
+            "progress": round((counts["done"] + counts["failed"]) / total, 4) if total else 1.0,
+            "created": created,
+            "finished": finished,
+        }
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents WHERE status = 'queued'").fetchone()[0]
+
+    def iter_results(self, job_id):
+        """One dict per finished document, in upload order."""
+        after = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, filename, status, document_id, result, error FROM documents "
+                    "WHERE job_id = ? AND seq > ? AND status IN ('done', 'failed') ORDER BY seq LIMIT ?",
+                    (job_id, after, RESULT_PAGE),
+                ).fetchall()
+            for seq, filename, status, document_id, result, error in rows:
+                line = {"index": seq, "filename": filename, "status": status, "document_id": document_id}
+                if error:
+                    line["error"] = error
+                if result is not None:
+                    line["result"] = json.loads(result)
+                yield line
+            if len(rows) < RESULT_PAGE:
+                return
+            after = rows[-1][0]
+
+    def prune(self):
+        """Deletes finished jobs older than the retention period."""
+        if not self.retention_days:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            expired = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE finished IS NOT NULL AND finished < ?", (cutoff,)
+            ).fetchall()]
+            for job_id in expired:
+                self._db.execute("DELETE FROM documents WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.commit()
+        return len(expired)
+
+
+class JobRunner:
+    """
+    Reads queued job documents in the background, at most `concurrency` at
+    a time. Documents only start on an idle OCR worker (OCRPool.try_submit),
+    so interactive requests never queue behind a batch job. Store calls run
+    in a thread, so SQLite never blocks the event loop.
+
+    `process(job, document)` runs on the OCR pool and returns
+    (document_id, result). Nothing starts until `ready()` is true; if
+    `load_error()` returns an error instead, documents fail with it.
+    """
+    def __init__(self, store, pool, process, concurrency=1, ready=lambda: True, load_error=lambda: None):
+        self.store = store
+        self.pool = pool
+        self.process = process
+        self.concurrency = concurrency
+        self.ready = ready
+        self.load_error = load_error
+        self._wake = None
+        self._tasks = []
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        expired = await asyncio.to_thread(self.store.prune)
+        if expired:
+            logger.info("Deleted %d expired jobs", expired)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        # Resumes whatever was left queued before a restart
+        self._wake.set()
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            document = await asyncio.to_thread(self.store.claim)
+            if document is None:
+                self._wake.clear()
+                # A job may have been queued between the claim and the clear
+                document = await asyncio.to_thread(self.store.claim)
+                if document is None:
+                    await self._wake.wait()
+                    continue
+            await self._run(document)
+
+    async def _run(self, document):
+        job = await asyncio.to_thread(self.store.job, document.job_id)
+        while True:
+            if not self.ready():
+                error = self.load_error()
+                if error:
+                    # The models won't load by waiting longer
+                    finished = await asyncio.to_thread(
+                        self.store.finish, document, None, error=f"OCR models failed to load: {error}"
+                    )
+                    return await self._finished(document, finished)
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+            future = self.pool.try_submit(self.process, job, document)
+            if future is not None:
+                break
+            await self.pool.wait_for_idle()
+        try:
+            document_id, result = await future
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Job %s document %d failed: %s", document.job_id, document.seq, e)
+            finished = await asyncio.to_thread(self.store.finish, document, None, error=str(e))
+        else:
+            finished = await asyncio.to_thread(
+                self.store.finish, document, document_id, result, error=result.get("error")
+            )
+        await self._finished(document, finished)
+
+    async def _finished(self, document, finished):
+        if finished:
+            logger.info("Job finished", extra={"job_id": document.job_id})
+            await asyncio.to_thread(self.store.prune)
@@ -0,0 +1,85 @@
+"""
+Language sets and the English-first recognition cascade.
+
+Most documents are English only, and the English recognizer is smaller and
+faster than the combined Devanagari + Latin one. So for a language set such
+as en+hi every crop is read by the English model first. Only crops that
+look like Devanagari, or that the English model reads with low confidence,
+go to the Devanagari model.
+"""
+import cv2
+import numpy as np
+
+# Languages the engine can be asked for
+SUPPORTED_LANGUAGES = ("en", "hi")
+# Languages EasyOCR reads with its Devanagari model
+DEVANAGARI_LANGUAGES = {"hi"}
+
+# The headline (shirorekha) must cover this share of the crop's width...
+SHIROREKHA_MIN_COVER = 0.5
+# ...with unbroken runs at least this many text heights long. Latin letter
+# tops are separate short runs; a Devanagari word's headline spans the word.
+SHIROREKHA_MIN_RUN = 1.5
+
+
+def parse_languages(value):
+    """'en,hi' or 'en+hi' -> ('en', 'hi'), English first. Raises ValueError on unknown codes."""
+    codes = {code.strip().lower() for code in value.replace("+", ",").split(",") if code.strip()}
+    if not codes:
+        raise ValueError("No OCR language given")
+    unknown = codes - set(SUPPORTED_LANGUAGES)
+    if unknown:
+        raise ValueError(f"Unsupported OCR language(s): {', '.join(sorted(unknown))}")
+    return tuple(code for code in SUPPORTED_LANGUAGES if code in codes)
+
+
+def language_key(languages):
+    return "+".join(languages)
+
+
+def cascade_plan(languages, enabled=True):
+    """
+    (first, second) recognizer keys. `second` is None when one model reads
+    everything: English only, no English in the set, or the cascade is off.
+    """
+    if languages == ("en",):
+        return "en", None
+    if enabled and "en" in languages:
+        return "en", language_key(languages)
+    return language_key(languages), None
+
+
+def needs_script_check(languages):
+    return bool(DEVANAGARI_LANGUAGES & set(languages))
+
+
+def looks_devanagari(crop):
+    """
+    Cheap script test on a grayscale text crop: Devanagari words hang from a
+    continuous headline in the upper half of the line.
+    """
+    if crop.size == 0:
+        return False
+    _, ink = cv2.threshold(crop, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Light text on a dark background
+    if ink.mean() > 0.5:
+        ink = 1 - ink
+
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if len(rows) < 4 or len(cols) < 4:
+        return False
+    ink = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    height, width = ink.shape
+    min_run = SHIROREKHA_MIN_RUN * height
+    # One or two characters don't carry enough headline to tell
+    if width < 2 * min_run:
+        return False
+
+    for row in ink[: max(1, height // 2)]:
+        # Run lengths of ink along the row
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], row, [0]))))
+        runs = edges[1::2] - edges[::2]
+        if runs[runs >= min_run].sum() >= SHIROREKHA_MIN_COVER * width:
+            return True
+    return False
@@ -0,0 +1,211 @@
+"""
+Page layout from the recognizer's boxes, for field extraction by position.
+
+Text mode joins the recognized crops with newlines in detection order, so
+on a two-column form "Name" and "Age" values interleave and a label's value
+is whatever line happens to follow it. Here every crop keeps its box and
+confidence:
+
+- lines: boxes are swept top to bottom by their vertical centre; a box
+         joins the current line when its centre is within SAME_LINE of the
+         line's height
+- cells: boxes on a line closer than CELL_GAP line heights read as one
+         piece of text; a wider gap separates columns, or a label from a
+         tab-aligned value
+- grid:  cells are bucketed in a uniform grid, so the cells near a label
+         are found without scanning the page
+
+FieldMatcher.extract_layout() decides which cells are labels and pairs each
+label without a value of its own with the nearest free cell to its right,
+or else below it. Every lookup touches a constant number of grid buckets,
+so pairing is linear in the number of boxes after the sort.
+"""
+import re
+from collections import defaultdict
+
+# Box centres this close (as a share of the line height) are on the same line
+SAME_LINE = 0.5
+# Gap between boxes, in line heights, that starts a new cell
+CELL_GAP = 1.5
+# How far a label looks for its value: to the right, and below (in line heights)
+RIGHT_REACH = 15.0
+BELOW_REACH = 2.0
+# Cells this many line heights beside a cell still count as under it
+ALIGN = 1.0
+# Grid bucket edge in median line heights
+GRID_SIZE = 4
+
+_NOT_WORD_RE = re.compile(r"\W+")
+
+
+class TextBox:
+    """One recognized crop: its text, recognizer confidence and bounding box."""
+    __slots__ = ("text", "confidence", "x0", "y0", "x1", "y1")
+
+    def __init__(self, text, confidence, x0, y0, x1, y1):
+        self.text = text
+        self.confidence = confidence
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+
+    @classmethod
+    def from_result(cls, result):
+        """From EasyOCR's (four corner points, text, confidence)."""
+        points, text, confidence = result
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return cls(text.strip(), float(confidence), min(xs), min(ys), max(xs), max(ys))
+
+    @property
+    def height(self):
+        return max(1, self.y1 - self.y0)
+
+    @property
+    def cy(self):
+        return (self.y0 + self.y1) / 2
+
+
+class Cell:
+    """Boxes of one line that read as a single piece of text."""
+    __slots__ = ("boxes", "x0", "y0", "x1", "y1")
+
+    def __init__(self, box):
+        self.boxes = [box]
+        self.x0, self.y0, self.x1, self.y1 = box.x0, box.y0, box.x1, box.y1
+
+    def add(self, box):
+        self.boxes.append(box)
+        self.x0, self.y0 = min(self.x0, box.x0), min(self.y0, box.y0)
+        self.x1, self.y1 = max(self.x1, box.x1), max(self.y1, box.y1)
+
+    @property
+    def text(self):
+        return " ".join(box.text for box in self.boxes)
+
+    @property
+    def confidence(self):
+        # A value is only as reliable as its least certain crop
+        return min(box.confidence for box in self.boxes)
+
+    @property
+    def height(self):
+        return max(1, self.y1 - self.y0)
+
+    @property
+    def cy(self):
+        return (self.y0 + self.y1) / 2
+
+
+def group_lines(boxes):
+    """Boxes grouped into lines, top to bottom, each sorted left to right."""
+    lines = []
+    line, centre, height = [], 0.0, 0.0
+    for box in sorted(boxes, key=lambda b: b.cy):
+        if line and box.cy - centre <= SAME_LINE * min(height, box.height):
+            line.append(box)
+            # Running means, so a line's band follows its boxes
+            centre += (box.cy - centre) / len(line)
+            height += (box.height - height) / len(line)
+            continue
+        if line:
+            lines.append(sorted(line, key=lambda b: b.x0))
+        line, centre, height = [box], box.cy, box.height
+    if line:
+        lines.append(sorted(line, key=lambda b: b.x0))
+    return lines
+
+
+def split_cells(line):
+    """The cells of one line (boxes sorted left to right)."""
+    cells = [Cell(line[0])]
+    for box in line[1:]:
+        cell = cells[-1]
+        if box.x0 - cell.x1 <= CELL_GAP * max(cell.height, box.height):
+            cell.add(box)
+        else:
+            cells.append(Cell(box))
+    return cells
+
+
+class SpatialGrid:
+    """Uniform grid over the page; each item is listed in every bucket its box covers."""
+    def __init__(self, size):
+        self.size = max(1, size)
+        self.buckets = defaultdict(list)
+
+    def _span(self, lo, hi):
+        return range(int(lo // self.size), int(hi // self.size) + 1)
+
+    def add(self, item, x0, y0, x1, y1):
+        for gx in self._span(x0, x1):
+            for gy in self._span(y0, y1):
+                self.buckets[gx, gy].append(item)
+
+    def query(self, x0, y0, x1, y1):
+        """Items whose buckets overlap the rectangle (callers check the exact geometry)."""
+        found = {}
+        for gx in self._span(x0, x1):
+            for gy in self._span(y0, y1):
+                for item in self.buckets.get((gx, gy), ()):
+                    found[id(item)] = item
+        return found.values()
+
+
+class PageLayout:
+    """Lines and cells of one page, in reading order, with a grid index over the cells."""
+    def __init__(self, results):
+        boxes = [box for box in map(TextBox.from_result, results) if box.text]
+        self.lines = [split_cells(line) for line in group_lines(boxes)]
+        self.cells = [cell for line in self.lines for cell in line]
+        self._line_of = {id(cell): n for n, line in enumerate(self.lines) for cell in line}
+
+        heights = sorted(cell.height for cell in self.cells)
+        self.line_height = heights[len(heights) // 2] if heights else 1
+        self.grid = SpatialGrid(GRID_SIZE * self.line_height)
+        for cell in self.cells:
+            self.grid.add(cell, cell.x0, cell.y0, cell.x1, cell.y1)
+
+    @property
+    def text(self):
+        """One cell per line, in reading order; what text mode would have parsed."""
+        return "\n".join(cell.text for cell in self.cells)
+
+    def right_of(self, cell, free):
+        """The next cell on the same line, if `free(cell)` and within RIGHT_REACH."""
+        line = self.lines[self._line_of[id(cell)]]
+        n = line.index(cell)
+        if n + 1 < len(line):
+            candidate = line[n + 1]
+            if free(candidate) and candidate.x0 - cell.x1 <= RIGHT_REACH * cell.height:
+                return candidate
+        return None
+
+    def below(self, cell, free):
+        """The nearest free cell under `cell`, overlapping it horizontally, within BELOW_REACH line heights."""
+        reach = BELOW_REACH * cell.height
+        slack = ALIGN * cell.height
+        best, best_distance = None, None
+        for candidate in self.grid.query(cell.x0 - slack, cell.y1, cell.x1 + slack, cell.y1 + reach):
+            if candidate is cell or candidate.cy <= cell.y1 or candidate.y0 - cell.y1 > reach:
+                continue
+            if candidate.x1 < cell.x0 - slack or candidate.x0 > cell.x1 + slack or not free(candidate):
+                continue
+            distance = (candidate.y0 - cell.y1, abs(candidate.x0 - cell.x0))
+            if best is None or distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def confidence_for(self, value):
+        """
+        Confidence of the first cell containing `value`, or the lowest of the
+        cells `value` was joined from (ignoring case and punctuation); None
+        if it can't be traced to any cell.
+        """
+        needle = _NOT_WORD_RE.sub("", value.lower())
+        if not needle:
+            return None
+        texts = [_NOT_WORD_RE.sub("", cell.text.lower()) for cell in self.cells]
+        for cell, text in zip(self.cells, texts):
+            if needle in text:
+                return round(cell.confidence, 4)
+        parts = [cell.confidence for cell, text in zip(self.cells, texts) if text and text in needle]
+        return round(min(parts), 4) if parts else None
@@ -0,0 +1,187 @@
+"""
+Live OCR of camera frames (the /live WebSocket).
+
+A counter camera sends 10-30 frames a second, nearly all of them either
+moving, blurred, or the same card as the last one. Each frame is decoded at
+half size and checked cheaply before any OCR:
+
+- moving:    the frame differs from the previous one (the share of pixels
+             of small blurred thumbnails that changed); wait for the card
+             to be held still for STABLE_FRAMES frames
+- blurry:    Laplacian variance below MIN_SHARPNESS
+- unchanged: the same scene as the last frame read, and its fields have
+             already settled (or MAX_READINGS frames of it were read)
+
+Frames that pass are read at most `max_fps` times a second. Field values
+settle once SETTLE_VOTES readings of the same scene agree on them, and only
+settled values are pushed to the client, so one misread frame never shows.
+"""
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+# Thumbnail width for frame differencing
+THUMB_WIDTH = 320
+# A thumbnail pixel changed if it moved by more than this many gray levels
+PIXEL_DELTA = 25
+# Share of changed pixels between consecutive frames above which the frame counts as moving
+MOTION_THRESHOLD = 0.01
+# Consecutive still frames before one is read
+STABLE_FRAMES = 2
+# Share of pixels changed since the last frame read above which the scene is a
+# new card. A different card of the same layout only changes its text, so this is small.
+CHANGE_THRESHOLD = 0.02
+# Laplacian variance of the half-size frame below which it is too blurred to read
+MIN_SHARPNESS = 60.0
+# Readings of one scene that must agree on a field value
+SETTLE_VOTES = 2
+# Most frames of one scene read while fields are still unsettled
+MAX_READINGS = 6
+
+# Frame outcome -> state shown to the operator
+STATES = {
+    "invalid": "invalid",
+    "moving": "moving",
+    "blurry": "blurry",
+    "read": "reading",
+    "busy": "reading",
+    "rate": "reading",
+    "unchanged": "settled",
+}
+
+
+def _changed(before, after):
+    """Share of thumbnail pixels that differ noticeably (1.0 if there is nothing to compare with)."""
+    if before is None or before.shape != after.shape:
+        return 1.0
+    return float(np.count_nonzero(cv2.absdiff(before, after) > PIXEL_DELTA)) / after.size
+
+
+class FieldSettler:
+    """Majority vote over the field values read from frames of one scene."""
+    def __init__(self, votes=SETTLE_VOTES):
+        self.votes = votes
+        self.readings = []
+
+    def add(self, fields):
+        self.readings.append({k: v.strip() for k, v in (fields or {}).items() if v and v.strip()})
+
+    def values(self):
+        """(settled, candidates): agreed values, and the best guess for fields not agreed on yet."""
+        counts = {}
+        for reading in self.readings:
+            for field, value in reading.items():
+                counts.setdefault(field, Counter())[value] += 1
+        settled, candidates = {}, {}
+        for field, values in counts.items():
+            ranked = values.most_common(2)
+            value, votes = ranked[0]
+            if votes >= self.votes and (len(ranked) == 1 or ranked[1][1] < votes):
+                settled[field] = value
+            else:
+                candidates[field] = value
+        return settled, candidates
+
+    def complete(self):
+        if len(self.readings) < self.votes:
+            return False
+        return not self.values()[1]
+
+
+class LiveSession:
+    """
+    Frame gating and field settling for one /live connection. check()
+    decides what to do with a frame; readings of frames it passed go to
+    add_reading(), which returns the message to push when settled fields change.
+    """
+    def __init__(self, max_fps=2.0):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.frames = 0
+        self.scene = 0
+        self.state = None
+        self._previous = None
+        self._stable = 0
+        self._reference = None
+        self._last_read = 0.0
+        self._readings = 0
+        self._settler = FieldSettler()
+        self._sent = {}
+
+    def reset(self):
+        """Forget the current scene, e.g. when the operator starts over."""
+        self._reference = None
+
+    def check(self, frame, busy=False):
+        """
+        Outcome for an encoded frame: "read" (OCR it now, as scene
+        self.scene), or why not: "invalid", "moving", "blurry", "busy",
+        "rate", "unchanged".
+        """
+        self.frames += 1
+        gray = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+        if gray is None:
+            return "invalid"
+        h, w = gray.shape
+        thumb = cv2.GaussianBlur(
+            cv2.resize(gray, (THUMB_WIDTH, max(1, h * THUMB_WIDTH // w)), interpolation=cv2.INTER_AREA), (5, 5), 0
+        )
+
+        moving = _changed(self._previous, thumb) > MOTION_THRESHOLD
+        self._previous = thumb
+        self._stable = 0 if moving else self._stable + 1
+        if self._stable < STABLE_FRAMES:
+            return "moving"
+        if cv2.Laplacian(gray, cv2.CV_64F).var() < MIN_SHARPNESS:
+            return "blurry"
+
+        changed = _changed(self._reference, thumb) > CHANGE_THRESHOLD
+        if not changed and (self._readings >= MAX_READINGS or self._settler.complete()):
+            return "unchanged"
+        if busy:
+            return "busy"
+        now = time.monotonic()
+        if now - self._last_read < self.min_interval:
+            return "rate"
+
+        if changed:
+            self.scene += 1
+            self._reference = thumb
+            self._readings = 0
+            self._settler = FieldSettler()
+            self._sent = {}
+        self._readings += 1
+        self._last_read = now
+        return "read"
+
+    def unread(self):
+        """The frame check() passed could not be read after all (no idle worker)."""
+        self._readings -= 1
+        self._last_read = 0.0
+
+    def state_change(self, outcome):
+        """The operator-facing state for this outcome if it differs from the last one sent, else None."""
+        state = STATES[outcome]
+        if state == self.state:
+            return None
+        self.state = state
+        return state
+
+    def add_reading(self, scene, result):
+        """A "fields" message when the settled fields of the current scene changed, else None."""
+        if scene != self.scene or result.get("error"):
+            return None
+        self._settler.add(result.get("fields"))
+        settled, candidates = self._settler.values()
+        if settled == self._sent:
+            return None
+        self._sent = settled
+        return {
+            "type": "fields",
+            "scene": scene,
+            "fields": settled,
+            "candidates": candidates,
+            "complete": self._settler.complete(),
+            "raw_text": result.get("raw_text", ""),
+        }
@@ -1,71 +1,675 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Optional
-import json
-from rapidfuzz import fuzz
-from ocr_engine import ocr_engine
-
-app = FastAPI(title="OCR Extraction and Verification API")
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/")
-async def root():
-    return {"message": "OCR API is running"}
-
-@app.post("/extract")
-async def extract_text(
-    file: UploadFile = File(...),
-    doc_type: str = Form("handwritten") # Default to handwritten
-):
-    if not (file.content_type.startswith("image/") or file.content_type == "application/pdf"):
-        raise HTTPException(status_code=400, detail="File must be an image or PDF")
-    
-    content = await file.read()
-    is_pdf = file.content_type == "application/pdf"
-    result = ocr_engine.extract_text(content, doc_type, is_pdf)
-    
-    return result
-
-@app.post("/verify")
-async def verify_data(
-    file: UploadFile = File(...), 
-    submitted_data: str = Form(...)
-):
-    content = await file.read()
-    # We re-extract using the same default or maybe passed type? 
-    # For now, let's assume handwritten for verification re-check or just use the text if we stored it.
-    # But to be stateless, we re-extract.
-    extraction_result = ocr_engine.extract_text(content, "handwritten")
-    extracted_text = extraction_result["raw_text"]
-    
-    try:
-        submitted_dict = json.loads(submitted_data)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON in submitted_data")
-
-    matches = {}
-    
-    for key, user_value in submitted_dict.items():
-        # Find the best match in the extracted text
-        # Partial ratio is good for finding the substring
-        score = fuzz.partial_ratio(str(user_value).lower(), extracted_text.lower())
-        
-        matches[key] = score
-
-    return {
-        "matches": matches,
-        "original_extracted_text": extracted_text
-    }
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import asyncio
+import csv
+import json
+import logging
+import threading
+import time
+from rapidfuzz import fuzz
+import config
+from logging_config import configure_logging
+configure_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+
+import metrics
+from dedup import FINGERPRINT_WIDTH, NearDuplicateIndex, fingerprint
+from extraction_cache import ExtractionCache
+from jobs import JobRunner, JobStore, document_kind, is_zip, unpack_zip
+from live import LiveSession
+from metrics import REGISTRY, Counter, Gauge, StageTimings, observe_extraction, observe_stage
+from ocr_engine import ocr_engine
+from ocr_pool import OCRPool, QueueFullError
+from ocr_workers import OCRWorkerProcesses, WorkersUnavailable
+from profiling import run_profiled
+from record_store import RecordStore, csv_records
+from uploads import RequestSizeLimit, UploadTooLarge, hash_file, spool_upload
+
+logger = logging.getLogger("ocr_api")
+
+app = FastAPI(title="OCR Extraction and Verification API")
+
+# OCR either runs in this process or in forked worker processes (OCR_PROCESSES).
+# Both expose extract_text / iter_pages / combine_pages and readiness.
+if config.OCR_PROCESSES > 0:
+    ocr_backend = OCRWorkerProcesses(ocr_engine, config.OCR_PROCESSES, config.OCR_THREADS_PER_WORKER)
+    ocr_pool_size = config.OCR_PROCESSES
+else:
+    ocr_backend = ocr_engine
+    ocr_pool_size = config.OCR_WORKERS
+
+# OCR is blocking (torch + OpenCV), so it runs on a bounded worker pool
+ocr_pool = OCRPool(ocr_pool_size, config.OCR_QUEUE_SIZE)
+
+# /extract followed by /verify on the same bytes only runs OCR once
+extraction_cache = ExtractionCache(config.CACHE_MAX_ITEMS, config.CACHE_DB_PATH, config.CACHE_DISK_MAX_ITEMS)
+
+# Re-compressed or resized copies of an image extracted before reuse its result (see dedup.py)
+near_duplicates = NearDuplicateIndex(
+    config.NEAR_DUPLICATE_MAX_ITEMS, config.NEAR_DUPLICATE_DISTANCE
+) if config.NEAR_DUPLICATES else None
+
+# Every fresh extraction is indexed here for /verify/bulk when RECORD_DB_PATH is set
+record_store = RecordStore(config.RECORD_DB_PATH) if config.RECORD_DB_PATH else None
+
+# Batch jobs (POST /jobs) are read in the background on idle OCR workers.
+# The store opens JOB_DIR, so both are created at startup, not on import.
+job_store = None
+job_runner = None
+
+def extract_job_document(job, document):
+    # Runs on the OCR pool, like run_extraction but blocking
+    signature = ocr_engine.cache_signature(job.doc_type, job.template, job.languages)
+    document_id = extraction_cache.make_key_from_hash(hash_file(document.path), job.doc_type, signature)
+    scope = f"{job.doc_type}|{signature}"
+    result, image_fingerprint = cached_extraction(document_id, document.path, document.is_pdf, scope)
+    if result is None:
+        started = time.perf_counter()
+        result = ocr_backend.extract_text(
+            document.path, job.doc_type, document.is_pdf, job.template, job.languages
+        )
+        record_extraction(document_id, result, image_fingerprint, scope, time.perf_counter() - started)
+    return document_id, result
+
+# Values owned by the pool and cache are read when /metrics is scraped
+REGISTRY.register(Gauge("ocr_queue_depth", "Requests waiting for a free OCR worker.",
+                        fn=lambda: ocr_pool.stats()["queued"]))
+REGISTRY.register(Gauge("ocr_queue_running", "Requests currently running OCR.",
+                        fn=lambda: ocr_pool.stats()["running"]))
+REGISTRY.register(Counter("ocr_queue_rejected", "Requests turned away with 503 because the queue was full.",
+                          fn=lambda: ocr_pool.stats()["rejected"]))
+REGISTRY.register(Counter("ocr_cache_hits", "Extraction cache hits (memory and disk).",
+                          fn=lambda: extraction_cache.memory_hits + extraction_cache.disk_hits))
+REGISTRY.register(Counter("ocr_cache_misses", "Extraction cache misses.",
+                          fn=lambda: extraction_cache.misses))
+REGISTRY.register(Counter("ocr_near_duplicate_hits", "Uploads answered with the result of a near-duplicate image.",
+                          fn=lambda: near_duplicates.hits if near_duplicates else None))
+REGISTRY.register(Counter("ocr_near_duplicate_seconds_saved", "OCR time the near-duplicate hits would have taken.",
+                          fn=lambda: near_duplicates.seconds_saved if near_duplicates else None))
+REGISTRY.register(Gauge("ocr_job_documents_queued", "Batch job documents waiting to be read.",
+                        fn=lambda: job_store.pending() if job_store else None))
+REGISTRY.register(Gauge("ocr_ready", "1 once the models are loaded and warmed up.",
+                        fn=lambda: int(bool(ocr_backend.ready))))
+
+def upload_limit(path):
+    mb = 1024 * 1024
+    return (config.JOB_UPLOAD_MAX_MB if path == "/jobs" else config.UPLOAD_MAX_MB) * mb
+
+# Added first so it runs inside the metrics and CORS middleware
+app.add_middleware(RequestSizeLimit, limit_for=upload_limit)
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Streaming responses are timed until the headers are sent
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        # The route template, not the raw path, keeps label cardinality bounded
+        path = route.path if route is not None else "unmatched"
+        metrics.REQUESTS.inc(route=path, status=status)
+        metrics.REQUEST_SECONDS.observe(elapsed, route=path)
+        if status >= 500:
+            metrics.REQUEST_ERRORS.inc(route=path)
+        logger.info(
+            "request",
+            extra={"method": request.method, "route": path, "status": status, "duration_ms": round(elapsed * 1000, 2)}
+        )
+
+# CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "OCR queue is full, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(WorkersUnavailable)
+async def workers_unavailable_handler(request: Request, exc: WorkersUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large_handler(request: Request, exc: UploadTooLarge):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+async def read_upload(file):
+    # Spooled to disk in chunks; OCR memory-maps it instead of holding the bytes
+    with observe_stage("upload_read"):
+        return await spool_upload(file, config.UPLOAD_MAX_MB * 1024 * 1024, config.UPLOAD_SPOOL_DIR)
+
+@app.on_event("startup")
+async def startup():
+    if ocr_backend is not ocr_engine:
+        # Returns immediately; the workers load and warm up in the background after bind
+        ocr_backend.start(warmup=config.OCR_WARMUP)
+    elif config.OCR_PRELOAD:
+        # Returns immediately; models load and warm up in the background after bind
+        ocr_engine.start_background_load(warmup=config.OCR_WARMUP)
+    global job_store, job_runner
+    job_store = await asyncio.to_thread(JobStore, config.JOB_DIR, config.JOB_RETENTION_DAYS)
+    job_runner = JobRunner(
+        job_store, ocr_pool, extract_job_document, config.JOB_CONCURRENCY,
+        # Without preloading, the first document loads the models (worker processes always preload)
+        ready=lambda: ocr_backend.ready or (ocr_backend is ocr_engine and not config.OCR_PRELOAD),
+        load_error=lambda: ocr_backend.load_error,
+    )
+    # Picks up jobs left unfinished by the last run
+    await job_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if job_runner is not None:
+        await job_runner.stop()
+    ocr_pool.shutdown()
+    if ocr_backend is not ocr_engine:
+        ocr_backend.shutdown()
+
+async def run_extraction(upload, doc_type, is_pdf=False, template=None, profile=False, languages=None):
+    try:
+        signature = ocr_engine.cache_signature(doc_type, template, languages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    document_id = extraction_cache.make_key_from_hash(upload.content_hash, doc_type, signature)
+
+    if profile:
+        if ocr_backend is not ocr_engine:
+            # It would load a second copy of the models into the server process
+            raise HTTPException(status_code=400, detail="Profiling is not available with OCR_PROCESSES set")
+        # Always a fresh run, in this process
+        result, report = await ocr_pool.run(
+            run_profiled, config.PROFILE_DIR, ocr_engine.extract_text, upload.path, doc_type, is_pdf, template, languages
+        )
+        result["profile"] = report
+        return document_id, result
+
+    scope = f"{doc_type}|{signature}"
+    result, image_fingerprint = await asyncio.to_thread(cached_extraction, document_id, upload.path, is_pdf, scope)
+    if result is None:
+        started = time.perf_counter()
+        result = await ocr_pool.run(ocr_backend.extract_text, upload.path, doc_type, is_pdf, template, languages)
+        # Writes the cache and record store (SQLite), so off the event loop like the lookup
+        await asyncio.to_thread(
+            record_extraction, document_id, result, image_fingerprint, scope, time.perf_counter() - started
+        )
+    return document_id, result
+
+def cached_extraction(document_id, path, is_pdf, scope):
+    """
+    (result, fingerprint): the cached result for these bytes, or else for a
+    near duplicate of the image. On a miss, pass the fingerprint on to
+    record_extraction so later copies can find this one.
+    """
+    result = extraction_cache.get(document_id)
+    if result is not None or near_duplicates is None or is_pdf:
+        return result, None
+    with observe_stage("near_duplicate"):
+        try:
+            image_fingerprint = fingerprint(ocr_engine.decode_image(path, max_width=FINGERPRINT_WIDTH))
+        except ValueError:
+            # Not decodable; extraction reports the error
+            return None, None
+        entry = near_duplicates.find(image_fingerprint, scope)
+    if entry is None:
+        return None, image_fingerprint
+    result = extraction_cache.get(entry.document_id)
+    if result is None:
+        # The earlier result has left the cache
+        return None, image_fingerprint
+    near_duplicates.record_hit(entry)
+    result["near_duplicate_of"] = entry.document_id
+    # So /verify works with this upload's own document_id. It is not added to
+    # record_store: the fields are the original's, which already has a record.
+    extraction_cache.put(document_id, result)
+    return result, None
+
+def record_extraction(document_id, result, image_fingerprint=None, scope=None, seconds=0.0):
+    # Blocks on SQLite writes; from the event loop, run it with asyncio.to_thread
+    # `seconds` is the wall time the OCR took; stage timings overlap, so they don't add up to it.
+    # Cache hits would skew the stage histograms, so only fresh runs are observed
+    observe_extraction(result)
+    # Don't cache failures, a retry may succeed
+    if result.get("error"):
+        metrics.EXTRACTION_ERRORS.inc()
+    else:
+        extraction_cache.put(document_id, result)
+        if record_store is not None:
+            record_store.add(document_id, result)
+        if image_fingerprint is not None:
+            near_duplicates.add(image_fingerprint, scope, document_id, seconds)
+
+def profiling_requested(request):
+    return config.PROFILING_ENABLED and request.headers.get("X-Profile") == "1"
+
+@app.get("/")
+async def root():
+    return {"message": "OCR API is running"}
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: models are loaded and warmed up
+    if ocr_backend.ready:
+        return {"status": "ready", "device": ocr_backend.device}
+    if ocr_backend.load_error:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": ocr_backend.load_error})
+    if getattr(ocr_backend, "rebuilding", False):
+        # A worker process died and its replacements are loading
+        return JSONResponse(status_code=503, content={"status": "rebuilding"})
+    return JSONResponse(status_code=503, content={"status": "loading"})
+
+@app.get("/queue")
+async def queue_stats():
+    stats = ocr_pool.stats()
+    if ocr_backend.batcher is not None:
+        stats["batching"] = ocr_backend.batcher.stats()
+    return stats
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache")
+async def cache_stats():
+    # Counts the disk cache's rows
+    stats = await asyncio.to_thread(extraction_cache.stats)
+    if near_duplicates is not None:
+        stats["near_duplicates"] = near_duplicates.stats()
+    return stats
+
+@app.get("/config")
+async def client_config(doc_type: str = "auto"):
+    """Upload settings for clients: images beyond these dimensions are scaled down before sending."""
+    try:
+        max_width, max_side = ocr_engine.input_limits(doc_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "doc_type": doc_type,
+        "max_width": max_width,
+        "max_side": max_side,
+        "jpeg_quality": config.CLIENT_JPEG_QUALITY,
+        "max_upload_mb": config.UPLOAD_MAX_MB,
+    }
+
+@app.get("/templates")
+async def list_templates():
+    return {"templates": ocr_engine.templates.list()}
+
+@app.post("/templates")
+async def register_template(
+    name: str = Form(...),
+    fields: str = Form(...),
+    file: UploadFile = File(...),
+    doc_types: str = Form("")
+):
+    """
+    Registers a fixed form layout. `file` is a blank or filled reference page,
+    `fields` a JSON object of field name -> [x0, y0, x1, y1] as fractions of
+    that page. Requests with a matching doc_type (or template=name) then read
+    only those boxes.
+    """
+    try:
+        field_boxes = json.loads(fields)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in fields")
+
+    content = await file.read()
+    try:
+        reference = ocr_engine.decode_image(content)
+        template = ocr_engine.templates.register(
+            name, reference, field_boxes, [d.strip() for d in doc_types.split(",") if d.strip()]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return template.to_dict()
+
+@app.post("/extract")
+async def extract_text(
+    request: Request,
+    file: UploadFile = File(...),
+    doc_type: str = Form("handwritten"), # Default to handwritten
+    template: Optional[str] = Form(None),
+    languages: Optional[str] = Form(None)
+):
+    if not (file.content_type.startswith("image/") or file.content_type == "application/pdf"):
+        raise HTTPException(status_code=400, detail="File must be an image or PDF")
+    
+    upload = await read_upload(file)
+    is_pdf = file.content_type == "application/pdf"
+    try:
+        document_id, result = await run_extraction(
+            upload, doc_type, is_pdf, template, profiling_requested(request), languages
+        )
+    finally:
+        upload.close()
+    result["document_id"] = document_id
+    
+    return result
+
+@app.post("/extract/stream")
+async def extract_text_stream(
+    file: UploadFile = File(...),
+    doc_type: str = Form("handwritten"),
+    template: Optional[str] = Form(None),
+    languages: Optional[str] = Form(None)
+):
+    """
+    Same as /extract but streams NDJSON: one {"type": "page"} line per page as
+    soon as it is done (PDF pages finish out of order), then a final
+    {"type": "result"} line with the combined text, fields and document_id.
+    """
+    if not (file.content_type.startswith("image/") or file.content_type == "application/pdf"):
+        raise HTTPException(status_code=400, detail="File must be an image or PDF")
+
+    try:
+        language_set = ocr_engine.languages_for(doc_type, languages)
+        # Same key as /extract, which also reads registered form templates
+        signature = ocr_engine.cache_signature(doc_type, template, language_set)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload = await read_upload(file)
+    is_pdf = file.content_type == "application/pdf"
+    document_id = extraction_cache.make_key_from_hash(upload.content_hash, doc_type, signature)
+    scope = f"{doc_type}|{signature}"
+
+    events = asyncio.Queue()
+    cached, image_fingerprint = await asyncio.to_thread(cached_extraction, document_id, upload.path, is_pdf, scope)
+    if cached is not None:
+        for page in cached.get("pages") or [{"page": 1, "raw_text": cached["raw_text"], "fields": cached["fields"]}]:
+            events.put_nowait({"type": "page", **page})
+        events.put_nowait({"type": "result", "document_id": document_id, **cached})
+        events.put_nowait(None)
+        upload.close()
+    else:
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+
+        def emit(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def produce():
+            try:
+                started = time.perf_counter()
+                timings = StageTimings()
+                pages = []
+                for page in ocr_backend.iter_pages(upload.path, doc_type, is_pdf, timings, language_set, template):
+                    if cancelled.is_set():
+                        return
+                    pages.append(page)
+                    emit({"type": "page", **page})
+                result = ocr_backend.combine_pages(pages, timings)
+                result["timings_ms"] = timings.as_ms()
+                result["recognized_crops"] = timings.counts()
+                result["peak_memory_mb"] = timings.peak_memory_mb()
+                if not is_pdf:
+                    # Keep the cached entry identical to what /extract stores
+                    result.pop("pages")
+                record_extraction(document_id, result, image_fingerprint, scope, time.perf_counter() - started)
+                emit({"type": "result", "document_id": document_id, **result})
+            except Exception as e:
+                logger.exception("Streaming extraction failed: %s", e)
+                metrics.EXTRACTION_ERRORS.inc()
+                emit({"type": "error", "detail": str(e)})
+            finally:
+                upload.close()
+                emit(None)
+
+        # Admission happens here, so a full queue is still a 503 rather than a broken stream
+        try:
+            ocr_pool.submit(produce)
+        except QueueFullError:
+            upload.close()
+            raise
+
+    async def stream():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            if cached is None:
+                cancelled.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    files: List[UploadFile] = File(...),
+    doc_type: str = Form("handwritten"),
+    template: Optional[str] = Form(None),
+    languages: Optional[str] = Form(None)
+):
+    """
+    Queues images, PDFs and zip archives of them for background extraction
+    and returns a job id at once. Poll GET /jobs/{job_id} for progress and
+    download GET /jobs/{job_id}/results as JSONL.
+    """
+    try:
+        ocr_engine.cache_signature(doc_type, template, languages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    mb = 1024 * 1024
+    job_id, job_dir = await asyncio.to_thread(job_store.new_job_dir)
+    documents = []
+    unpacked = 0
+    try:
+        for file in files:
+            if is_zip(file.filename, file.content_type):
+                archive = await spool_upload(file, config.JOB_UPLOAD_MAX_MB * mb, job_dir)
+                try:
+                    members, size = await asyncio.to_thread(
+                        unpack_zip, archive.path, job_dir, len(documents),
+                        config.JOB_MAX_DOCUMENTS - len(documents), config.UPLOAD_MAX_MB * mb,
+                        config.JOB_UNPACKED_MAX_MB * mb, unpacked
+                    )
+                    documents += members
+                    unpacked += size
+                finally:
+                    archive.close()
+                continue
+            accepted, is_pdf = document_kind(file.filename, file.content_type)
+            if not accepted:
+                raise ValueError(f"{file.filename}: must be an image, a PDF or a zip archive of them")
+            if len(documents) >= config.JOB_MAX_DOCUMENTS:
+                raise ValueError(f"A job holds at most {config.JOB_MAX_DOCUMENTS} documents")
+            upload = await spool_upload(file, config.UPLOAD_MAX_MB * mb, job_dir)
+            documents.append((file.filename, upload.path, is_pdf))
+        if not documents:
+            raise ValueError("No images or PDFs in the upload")
+    except BaseException as e:
+        await asyncio.to_thread(job_store.discard_job_dir, job_id)
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
+
+    await asyncio.to_thread(job_store.create, job_id, doc_type, template, languages, documents)
+    job_runner.notify()
+    return {"job_id": job_id, "status": "queued", "total": len(documents)}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    progress = await asyncio.to_thread(job_store.progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return progress
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str):
+    """JSONL, one line per finished document in upload order. Available while the job runs."""
+    if await asyncio.to_thread(job_store.job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+
+    # A plain generator, so Starlette iterates it (and queries SQLite) in a thread
+    def lines():
+        for line in job_store.iter_results(job_id):
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.jsonl"'},
+    )
+
+@app.websocket("/live")
+async def live_ocr(websocket: WebSocket, doc_type: str = "auto", languages: Optional[str] = None):
+    """
+    Live OCR of camera frames. The client sends encoded frames (JPEG/PNG)
+    as binary messages, or {"type": "reset"} to start over. The server
+    sends {"type": "status", "state": ...} when the state changes
+    (moving, blurry, reading, settled, invalid) and {"type": "fields", ...}
+    when the fields agreed on across frames change.
+    """
+    try:
+        language_set = ocr_engine.languages_for(doc_type, languages)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+
+    session = LiveSession(config.LIVE_MAX_FPS)
+    reading = None
+
+    async def read_frame(future, scene):
+        try:
+            result = await future
+        except Exception as e:
+            logger.exception("Live OCR failed: %s", e)
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return
+        observe_extraction(result)
+        update = session.add_reading(scene, result)
+        if update is not None:
+            await websocket.send_json(update)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text"):
+                if json.loads(message["text"]).get("type") == "reset":
+                    session.reset()
+                continue
+            frame = message.get("bytes")
+            if not frame:
+                continue
+
+            # Only one frame per connection is read at a time; the rest are checked and dropped
+            outcome = await asyncio.to_thread(session.check, frame, reading is not None and not reading.done())
+            if outcome == "read":
+                # Live frames only take idle workers, so /extract requests never wait behind a camera
+                future = ocr_pool.try_submit(ocr_backend.extract_text, frame, doc_type, False, None, language_set)
+                if future is None:
+                    session.unread()
+                    outcome = "busy"
+                else:
+                    reading = asyncio.create_task(read_frame(future, session.scene))
+            metrics.LIVE_FRAMES.inc(outcome=outcome)
+            state = session.state_change(outcome)
+            if state is not None:
+                await websocket.send_json({"type": "status", "state": state, "frame": session.frames})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if reading is not None:
+            reading.cancel()
+
+@app.post("/verify")
+async def verify_data(
+    submitted_data: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    document_id: Optional[str] = Form(None),
+    doc_type: str = Form("handwritten"),
+    languages: Optional[str] = Form(None)
+):
+    try:
+        submitted_dict = json.loads(submitted_data)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in submitted_data")
+
+    # Prefer the document_id returned by /extract; fall back to re-uploading the file
+    if document_id:
+        # May read the disk cache
+        extraction_result = await asyncio.to_thread(extraction_cache.get, document_id)
+        if extraction_result is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired document_id, please upload the file again")
+    elif file is not None:
+        upload = await read_upload(file)
+        try:
+            document_id, extraction_result = await run_extraction(upload, doc_type, languages=languages)
+        finally:
+            upload.close()
+    else:
+        raise HTTPException(status_code=400, detail="Either file or document_id is required")
+
+    extracted_text = extraction_result["raw_text"]
+
+    matches = {}
+    
+    with observe_stage("verify_scoring"):
+        for key, user_value in submitted_dict.items():
+            # Find the best match in the extracted text
+            # Partial ratio is good for finding the substring
+            score = fuzz.partial_ratio(str(user_value).lower(), extracted_text.lower())
+
+            matches[key] = score
+
+    return {
+        "matches": matches,
+        "original_extracted_text": extracted_text,
+        "document_id": document_id
+    }
+
+@app.post("/verify/bulk")
+async def verify_bulk(file: UploadFile = File(...)):
+    """
+    Matches every row of a CSV (one column per field, e.g. name, phone,
+    email, id_number, plus an optional record_id) with its best stored
+    extraction. Returns per-field scores and the top candidates per row.
+    """
+    if record_store is None:
+        raise HTTPException(status_code=503, detail="Bulk verification needs the record store (set RECORD_DB_PATH)")
+    upload = await read_upload(file)
+    try:
+        # A large CSV takes a while to parse, so neither runs on the event loop
+        records = await asyncio.to_thread(lambda: csv_records(upload.read_bytes().decode("utf-8-sig")))
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    finally:
+        upload.close()
+
+    with observe_stage("bulk_verify"):
+        results = await asyncio.to_thread(record_store.verify, records)
+    return {
+        "records": len(results),
+        "matched": sum(1 for r in results if r["document_id"]),
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
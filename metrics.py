@@ -0,0 +1,277 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers everything from a regex pass to a slow multi-page PDF
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes; 16 MB to 4 GB
+MEMORY_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(4, 13))
+
+
+def current_rss():
+    """Resident memory of this process in bytes, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def peak_rss():
+    """Highest resident memory this process has reached, in bytes, or None."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        # Windows reports the peak working set
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        # Optional callable read at scrape time, for values owned elsewhere
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        if self.fn is not None:
+            value = self.fn()
+            return [f"{self.name}_total {_format_value(value)}"] if value is not None else []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.fn is not None:
+            value = self.fn()
+            return [f"{self.name} {_format_value(value)}"] if value is not None else []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimings:
+    """
+    Wall time per pipeline stage for one request. Thread-safe, so PDF pages
+    OCRed in parallel add into the same object; stages that run several
+    times (one per page) accumulate.
+
+    Also samples the process RSS at the end of every stage, so
+    peak_memory_bytes() approximates how much memory the request needed.
+    Other requests running in the same process at the same time are counted
+    too.
+
+    count() tallies work items per name, e.g. crops read by each recognizer.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = {}
+        self._counts = {}
+        self._rss_start = current_rss()
+        self._rss_peak = self._rss_start
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        rss = current_rss() if self._rss_start is not None else None
+        with self._lock:
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+            if rss is not None and rss > self._rss_peak:
+                self._rss_peak = rss
+
+    def count(self, name, amount):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def peak_memory_bytes(self):
+        if self._rss_start is None:
+            return None
+        with self._lock:
+            return max(0, self._rss_peak - self._rss_start)
+
+    def peak_memory_mb(self):
+        peak = self.peak_memory_bytes()
+        return round(peak / (1024 * 1024), 1) if peak is not None else None
+
+    def as_ms(self):
+        with self._lock:
+            return {name: round(seconds * 1000, 3) for name, seconds in self._seconds.items()}
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "ocr_http_requests", "HTTP requests by route and status code.", ("route", "status")))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "ocr_http_request_errors", "Requests that ended in a 5xx.", ("route",)))
+EXTRACTION_ERRORS = REGISTRY.register(Counter(
+    "ocr_extraction_errors", "Extractions that returned an error result."))
+REQUEST_MEMORY = REGISTRY.register(Histogram(
+    "ocr_request_peak_memory_bytes", "RSS growth while an extraction ran, sampled at stage boundaries.",
+    buckets=MEMORY_BUCKETS))
+REGISTRY.register(Gauge("ocr_process_resident_memory_bytes", "Current RSS of the API process.", fn=current_rss))
+REGISTRY.register(Gauge("ocr_process_peak_resident_memory_bytes", "Peak RSS of the API process.", fn=peak_rss))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "ocr_http_request_duration_seconds", "End-to-end request latency.", ("route",)))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ocr_stage_duration_seconds", "Time spent per pipeline stage.", ("stage",)))
+RECOGNIZED_CROPS = REGISTRY.register(Counter(
+    "ocr_recognized_crops", "Text crops read, by recognizer language set.", ("languages",)))
+LIVE_FRAMES = REGISTRY.register(Counter(
+    "ocr_live_frames", "Frames received over /live, by what was done with them.", ("outcome",)))
+
+
+@contextmanager
+def observe_stage(stage):
+    """Times a stage that runs outside the engine (upload read, verify scoring)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def observe_stages(timings_ms):
+    for stage, ms in (timings_ms or {}).items():
+        STAGE_SECONDS.observe(ms / 1000.0, stage=stage)
+
+
+def observe_extraction(result):
+    """Stage timings, recognizer usage and peak memory of a fresh (not cached) extraction result."""
+    observe_stages(result.get("timings_ms"))
+    for languages, crops in (result.get("recognized_crops") or {}).items():
+        RECOGNIZED_CROPS.inc(crops, languages=languages)
+    if result.get("peak_memory_mb") is not None:
+        REQUEST_MEMORY.observe(result["peak_memory_mb"] * 1024 * 1024)
@@ -1,480 +1,835 @@
-import easyocr
-import torch
-import cv2
-import numpy as np
-import re
-import io
-from PIL import Image
-from rapidfuzz import fuzz, process
-
-class OCREngine:
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"OCR Engine initialized on {self.device}")
-        
-        print("Loading EasyOCR model...")
-        # Enable Hindi ('hi') support alongside English ('en')
-        self.reader = easyocr.Reader(['en', 'hi'], gpu=(self.device == "cuda"))
-        print("EasyOCR model loaded.")
-
-    def preprocess_image(self, image_bytes):
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # 1. Grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # 2. Resize (Upscale if too small, but don't overdo it)
-        h, w = gray.shape
-        if w < 1000:
-            scale = 1000 / w
-            new_h = int(h * scale)
-            gray = cv2.resize(gray, (1000, new_h))
-        
-        # 3. Minimal Denoising
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-
-        # 4. Gamma Correction (Darken faint text)
-        # Gamma < 1.0 makes image darker/contrastier
-        gamma = 0.8 
-        lookUpTable = np.empty((1,256), np.uint8)
-        for i in range(256):
-            lookUpTable[0,i] = np.clip(pow(i / 255.0, gamma) * 255.0, 0, 255)
-        corrected = cv2.LUT(denoised, lookUpTable)
-
-        # 5. Unsharp Masking (Better sharpening)
-        gaussian = cv2.GaussianBlur(corrected, (0, 0), 3.0)
-        unsharp_image = cv2.addWeighted(corrected, 1.5, gaussian, -0.5, 0, corrected)
-
-        # Save debug to see what the AI sees
-        cv2.imwrite("debug_preprocessed.png", unsharp_image)
-        
-        return unsharp_image
-
-    def normalize_digits(self, text):
-        # Mapping for Hindi (Devanagari) digits to English
-        hindi_digits = str.maketrans("०१२३४५६७८९", "0123456789")
-        return text.translate(hindi_digits)
-
-    def smart_typo_fixer(self, text, field_type="text"):
-        """
-        Manually tuned logic to fix common OCR character confusions.
-        This is how we 'teach' the system to be smarter!
-        """
-        if field_type == "digits":
-            # Fix letters that look like numbers
-            corrections = {
-                'O': '0', 'o': '0', 'D': '0',
-                'I': '1', 'l': '1', '|': '1',
-                'Z': '2', 'z': '2',
-                'S': '5', 's': '5',
-                'G': '6', 'b': '6',
-                'B': '8',
-                'g': '9', 'q': '9'
-            }
-            for char, digit in corrections.items():
-                text = text.replace(char, digit)
-        return text
-
-    def clean_email(self, text):
-        # ... (existing email logic) ...
-        # Replace spaces with dots only if they look like they separate parts of a domain or name
-        # But for now, let's just be careful. 
-        # "john smith@example com" -> "john.smith@example.com" is better than "johnsmith@examplecom"
-        
-        # First, fix common OCR spacing issues in domains
-        text = re.sub(r'@\s+', '@', text) # "user@ example.com" -> "user@example.com"
-        text = re.sub(r'\s+\.', '.', text) # "example .com" -> "example.com"
-        text = re.sub(r'\.\s+', '.', text) # "example. com" -> "example.com"
-        
-        # Handle "example com" -> "example.com"
-        if "@" in text:
-            parts = text.split("@")
-            if len(parts) == 2:
-                domain = parts[1]
-                if " " in domain and "." not in domain:
-                    domain = domain.replace(" ", ".")
-                parts[1] = domain
-                text = "@".join(parts)
-
-        text = text.replace(" ", "").replace(",", ".").replace("..", ".")
-        text = text.replace("$com", ".com").replace("$", "s")
-        text = text.replace("examp&", "example").replace("&", "e")
-        
-        if "@" not in text:
-            if "at" in text:
-                text = text.replace("at", "@")
-            elif ".com" in text:
-                domains = ["example.com", "gmail.com", "yahoo.com", "hotmail.com", "outlook.com"]
-                for d in domains:
-                    if d in text:
-                        idx = text.find(d)
-                        if idx > 0:
-                            if text[idx-1] == 'e' and d.startswith('e'):
-                                text = text[:idx-1] + "@" + d
-                            else:
-                                text = text[:idx] + "@" + d
-                        break
-                        
-        match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
-        if match: return match.group(0)
-        return text
-
-    def clean_phone(self, text):
-        text = self.normalize_digits(text)
-        # Apply smart typo fixing for digits
-        text = self.smart_typo_fixer(text, field_type="digits")
-        return re.sub(r'[^\d\+\-\(\)\s]', '', text).strip()
-
-    def clean_gender(self, text):
-        t = text.lower().strip()
-        if 'female' in t or t.startswith('f') or 'fem' in t:
-            return "Female"
-        if 'male' in t or t.startswith('m'):
-            return "Male"
-        return text.strip()
-
-    def clean_name(self, text):
-        # Allow unicode characters for Hindi support
-        return re.sub(r'[^\w\s\.]', '', text, flags=re.UNICODE).strip()
-
-    def clean_address(self, text):
-        text = self.normalize_digits(text)
-        text = text.strip(" .,-:")
-        text = text.replace("|", "I")
-        return text
-
-    def refine_fields(self, fields):
-        field_mappings = {
-            "name": ["Name", "First Name", "Full Name", "Student Name", "नाम"],
-            "age": ["Age", "Years", "DOB", "Date of Birth", "आयु", "उम्र"],
-            "gender": ["Gender", "Sex", "लिंग"],
-            "address": ["Address", "Add", "Residing at", "Location", "Permanent Address", "पता"],
-            "id_number": ["ID", "ID Number", "Ref No", "Roll No", "पहचान पत्र"],
-            "email": ["Email", "E-mail", "Mail", "ईमेल"],
-            "phone": ["Phone", "Mobile", "Cell", "Tel", "Contact", "फोन", "मोबाइल"]
-        }
-
-        for key, val in list(fields.items()):
-            if not val or len(val) < 5: continue
-            
-            words = val.split()
-            for i, word in enumerate(words):
-                if i == 0 and len(words) == 1: continue
-                
-                clean_word = word.strip(":,.-")
-                if len(clean_word) < 3: continue 
-                
-                best_label = None
-                best_score = 0
-                
-                for f_key, keywords in field_mappings.items():
-                    if f_key == key: continue 
-                    
-                    match = process.extractOne(clean_word, keywords, scorer=fuzz.ratio)
-                    if match:
-                        score = match[1]
-                        if score > 85: 
-                            best_score = score
-                            best_label = f_key
-                
-                if best_label:
-                    new_val_current = " ".join(words[:i]).strip()
-                    new_val_detected = " ".join(words[i+1:]).strip()
-                    fields[key] = new_val_current
-                    if not fields.get(best_label):
-                        fields[best_label] = new_val_detected
-                    break 
-
-        if fields.get("name"):
-            name_val = fields["name"]
-            match = re.search(r'(\d{1,3})$', name_val.strip())
-            if match:
-                extracted_age = match.group(1)
-                if not fields.get("age"):
-                    fields["age"] = extracted_age
-                fields["name"] = name_val[:match.start()].strip()
-
-        if fields.get("address"):
-            addr = fields["address"]
-            for key in ["Phone", "Email", "Gender", "ID", "Age", "Name"]:
-                if key in addr:
-                    parts = re.split(f"{key}[:\s]", addr, flags=re.IGNORECASE)
-                    if len(parts) > 1:
-                        fields["address"] = parts[0].strip()
-
-        if fields.get("name"): fields["name"] = self.clean_name(fields["name"])
-        if fields.get("age"): fields["age"] = re.sub(r'\D', '', self.normalize_digits(fields["age"]))
-        if fields.get("gender"): fields["gender"] = self.clean_gender(fields["gender"])
-        if fields.get("email"): fields["email"] = self.clean_email(fields["email"])
-        if fields.get("phone"): fields["phone"] = self.clean_phone(fields["phone"])
-        if fields.get("address"): fields["address"] = self.clean_address(fields["address"])
-            
-        return fields
-
-    def extract_fields(self, text):
-        fields = {}
-        raw_lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        field_mappings = {
-            "name": ["Name", "First Name", "Full Name", "Student Name", "नाम"],
-            "age": ["Age", "Years", "DOB", "Date of Birth", "आयु", "उम्र"],
-            "gender": ["Gender", "Sex", "लिंग"],
-            "address": ["Address", "Add", "Residing at", "Location", "Permanent Address", "पता"],
-            "id_number": ["ID", "ID Number", "Ref No", "Roll No", "पहचान पत्र"],
-            "email": ["Email", "E-mail", "Mail", "ईमेल"],
-            "phone": ["Phone", "Mobile", "Cell", "Tel", "Contact", "फोन", "मोबाइल"]
-        }
-
-        processed_lines = []
-        for line in raw_lines:
-            found_indices = []
-            for field_key, keywords in field_mappings.items():
-                for keyword in keywords:
-                    if keyword in line:
-                        matches = list(re.finditer(f"\\b{re.escape(keyword)}\\b", line, re.IGNORECASE))
-                        for m in matches:
-                            found_indices.append(m.start())
-            
-            if len(found_indices) > 1:
-                found_indices.sort()
-                last_idx = 0
-                for idx in found_indices:
-                    if idx > last_idx: 
-                        segment = line[last_idx:idx].strip()
-                        if segment: processed_lines.append(segment)
-                    last_idx = idx
-                if last_idx < len(line):
-                    processed_lines.append(line[last_idx:].strip())
-            else:
-                processed_lines.append(line)
-
-        current_field = None
-        i = 0
-        while i < len(processed_lines):
-            line = processed_lines[i]
-            i += 1
-            
-            best_match_field = None
-            best_match_score = 0
-            
-            line_start = " ".join(line.split()[:3])
-            
-            for field_key, keywords in field_mappings.items():
-                match = process.extractOne(line_start, keywords, scorer=fuzz.token_set_ratio)
-                if match:
-                    score = match[1]
-                    if score > 70 and score > best_match_score:
-                        best_match_score = score
-                        best_match_field = field_key
-
-            if best_match_field:
-                current_field = best_match_field
-                
-                parts = line.split(':', 1)
-                if len(parts) > 1:
-                    val = parts[1].strip()
-                else:
-                    val = " ".join(line.split()[1:])
-                
-                # Normalize digits immediately for validation checks
-                val = self.normalize_digits(val)
-                
-                is_valid_value = True
-                low_val = val.lower().strip()
-                noise_words = ["id", "no", "number", "num", "#", "code", "address", "value", "val"]
-                
-                if not val:
-                    is_valid_value = False
-                elif low_val in noise_words:
-                    is_valid_value = False
-                # Relaxed checks: Trust the label more. 
-                # If we found "Phone:", we should take the value even if it looks weird, 
-                # because refine_fields will clean it up later.
-                # Only reject if it's completely empty or just noise words.
-                elif current_field == "email" and len(val) < 5:
-                    is_valid_value = False
-                
-                if is_valid_value:
-                    # Only overwrite if current is empty or new value is longer/better
-                    if not fields.get(current_field) or len(val) > len(fields[current_field]):
-                        fields[current_field] = val
-                else:
-                    if i < len(processed_lines):
-                        next_line = processed_lines[i].strip()
-                        is_next_label = False
-                        next_start = " ".join(next_line.split()[:3])
-                        for f_key, kws in field_mappings.items():
-                            m = process.extractOne(next_start, kws, scorer=fuzz.token_set_ratio)
-                            if m and m[1] > 70:
-                                is_next_label = True
-                                break
-                        
-                        if not is_next_label:
-                            # Only overwrite if current is empty
-                            if not fields.get(current_field):
-                                fields[current_field] = next_line
-                            i += 1 
-                        else:
-                            # Don't overwrite with empty if we already have something
-                            if not fields.get(current_field):
-                                fields[current_field] = "" 
-            
-            elif current_field:
-                if current_field == "address":
-                    if "Country" in line or "Post" in line:
-                        pass 
-                    elif fields.get(current_field):
-                        fields[current_field] += ", " + line
-                    else:
-                        fields[current_field] = line
-                else:
-                    pass
-
-        fields = self.refine_fields(fields)
-        
-        if not fields.get("email"):
-            email_match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
-            if email_match:
-                fields["email"] = email_match.group(0)
-        
-        if not fields.get("phone"):
-            phone_match = re.search(r'(?:Phone|Mobile|Cell|Tel|Contact)\s*[:\-\.]?\s*([+\d\(\)\-\s]{10,})', text, re.IGNORECASE)
-            if phone_match:
-                fields["phone"] = phone_match.group(1).strip()
-
-        if not fields.get("age"):
-            age_match = re.search(r'(?:Age|Years)\s*[:\-\.]?\s*(\d{1,3})', text, re.IGNORECASE)
-            if age_match:
-                fields["age"] = age_match.group(1)
-            else:
-                age_match_suffix = re.search(r'(\d{1,3})\s*(?:Years|Yrs)', text, re.IGNORECASE)
-                if age_match_suffix:
-                    fields["age"] = age_match_suffix.group(1)
-                else:
-                    # Standalone Age Fallback: Look for a line that is JUST a number (18-99)
-                    # This catches cases where "Age:" label was missed but "30" is on its own line
-                    for line in raw_lines:
-                        clean = line.strip()
-                        if re.match(r'^\d{2}$', clean):
-                            val = int(clean)
-                            if 18 <= val <= 99:
-                                fields["age"] = str(val)
-                                break
-
-        # Fallback: Address (Content-Based)
-        if not fields.get("address"):
-            # Expanded keywords including Indian/Global terms
-            address_keywords = ["Street", "St.", "Road", "Rd", "Lane", "Ave", "Apartment", "Apt", "Floor", "Block", "District", "State", "Pin", "Zip", "Nagar", "Colony", "Sector", "Plot", "Flat", "Suite", "Unit"]
-            potential_address = []
-            for line in raw_lines:
-                if len(line) < 5: continue
-                if any(k.lower() in line.lower() for k in address_keywords):
-                    potential_address.append(line)
-            
-            if potential_address:
-                fields["address"] = ", ".join(potential_address[:3])
-            else:
-                # AGGRESSIVE ADDRESS: Look for lines starting with digits (House Numbers)
-                # e.g. "123 MG Road"
-                for line in raw_lines:
-                    clean_line = line.strip()
-                    # Starts with digits, followed by space/comma, then letters
-                    if re.match(r'^\d+[\s,]+[a-zA-Z]', clean_line) and len(clean_line) > 10:
-                        # Exclude dates (DD/MM/YYYY) and Phones (10 digits)
-                        if not re.search(r'\d{2}[-/]\d{2}[-/]\d{2,4}', clean_line) and \
-                           len(re.sub(r'\D', '', clean_line)) < 10:
-                            fields["address"] = clean_line
-                            break
-
-        # --- AGGRESSIVE FALLBACKS (Last Resort) ---
-        
-        # Aggressive Phone: Just find any 10+ digit sequence if still missing
-        if not fields.get("phone"):
-            # Matches 1234567890, 123 456 7890, 123-456-7890
-            # We look for a sequence that has at least 10 digits
-            agg_phone = re.search(r'\b\d[\d\s\-\(\)]{9,}\d\b', text)
-            if agg_phone:
-                val = agg_phone.group(0)
-                # Double check digit count
-                if len(re.sub(r'\D', '', val)) >= 10:
-                    fields["phone"] = val.strip()
-
-        # Aggressive Email: Fuzzy Domain Fixer
-        if fields.get("email"):
-            # If we have an email but it looks broken (e.g. "john@gmai1.com")
-            e = fields["email"]
-            # List of common domains to enforce
-            common_domains = {
-                "gmail.com": ["gmai1.com", "gnail.com", "gmal.com", "gmil.com"],
-                "yahoo.com": ["yaho.com", "yhoo.com"],
-                "hotmail.com": ["hotmai1.com", "hotmal.com"],
-                "outlook.com": ["outlok.com"]
-            }
-            parts = e.split('@')
-            if len(parts) == 2:
-                domain = parts[1]
-                for correct, typos in common_domains.items():
-                    if domain in typos or fuzz.ratio(domain, correct) > 85:
-                        fields["email"] = parts[0] + "@" + correct
-                        break
-
-        # Fallback: Gender (Global Search)
-        if not fields.get("gender"):
-            if re.search(r'\b(?:Male|M)\b', text, re.IGNORECASE):
-                fields["gender"] = "Male"
-            elif re.search(r'\b(?:Female|F)\b', text, re.IGNORECASE):
-                fields["gender"] = "Female"
-
-        # Fallback: Name (Heuristic)
-        if not fields.get("name"):
-            for line in raw_lines:
-                clean = line.strip()
-                if not clean: continue
-                
-                is_other_label = False
-                for k, v in field_mappings.items():
-                    if k == "name": continue
-                    for keyword in v:
-                        if fuzz.partial_ratio(keyword.lower(), clean.lower()) > 80:
-                            is_other_label = True
-                            break
-                    if is_other_label: break
-                
-                if is_other_label: continue
-                
-                if "CARD" in clean.upper() or "FORM" in clean.upper(): continue
-                
-                if re.search(r'[a-zA-Z]', clean):
-                    for nk in field_mappings["name"]:
-                        if clean.lower().startswith(nk.lower()):
-                            clean = re.sub(f"^{re.escape(nk)}[:\-\.]?\s*", "", clean, flags=re.IGNORECASE)
-                            break
-                    
-                    fields["name"] = clean
-                    break
-
-        print(f"DEBUG: Extracted Fields: {fields}")
-        return fields
-
-    def extract_text(self, file_bytes, doc_type="auto", is_pdf=False):
-        try:
-            processed_img = self.preprocess_image(file_bytes)
-            results = self.reader.readtext(processed_img, detail=0, paragraph=False)
-            generated_text = "\n".join(results)
-            print(f"DEBUG: EasyOCR Output:\n{generated_text}")
-            fields = self.extract_fields(generated_text)
-            
-            return {
-                "raw_text": generated_text,
-                "fields": fields,
-                "quality_status": "Good",
-                "detected_type": "auto"
-            }
-            
-        except Exception as e:
-            print(f"Error in EasyOCR extraction: {e}")
-            return {"raw_text": "", "fields": {}}
-
-ocr_engine = OCREngine()
+import cv2
+import numpy as np
+import re
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from importlib import metadata
+import pymupdf
+from PIL import Image
+
+import config
+from backends import make_backend
+from field_matcher import FieldMatcher
+from form_templates import TemplateRegistry
+from language_cascade import cascade_plan, looks_devanagari, needs_script_check, parse_languages
+from layout import PageLayout
+from metrics import StageTimings
+from preprocessing import PROFILES, PreprocessPipeline
+from quality import Adjustments, analyze
+from tiling import DETECTOR_CANVAS, merge_tile_boxes, offset_boxes, plan_tiles
+
+logger = logging.getLogger(__name__)
+
+def _stage(timings, name):
+    return timings.stage(name) if timings is not None else nullcontext()
+
+# Decode straight to grayscale at 1/8, 1/4 or 1/2 size (JPEG scales during decoding)
+REDUCED_GRAYSCALE = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+def _source_buffer(source):
+    # Uploads arrive as a spooled temp file path (memory-mapped, not read) or as bytes
+    if isinstance(source, str):
+        if os.path.getsize(source) == 0:
+            return None
+        return np.memmap(source, dtype=np.uint8, mode="r")
+    return np.frombuffer(source, np.uint8)
+
+def _stored_width(source):
+    """Image width from the file header without decoding pixels, or None."""
+    try:
+        with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as im:
+            width, height = im.size
+            # EXIF orientations 5-8 are rotated by 90 degrees when OpenCV decodes them
+            if im.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                width = height
+            return width
+    except Exception:
+        return None
+
+def _quality_fields(report):
+    """quality_status plus the metrics behind it; `report` is a QualityReport or its dict."""
+    if report is None:
+        return {"quality_status": "Good"}
+    quality = report if isinstance(report, dict) else report.to_dict()
+    # quality_score is the blur measure the frontend shows with a "Blurry" warning
+    return {"quality_status": quality["status"], "quality_score": quality["blur"], "quality": quality}
+
+
+def _easyocr_version():
+    try:
+        return metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+class OCREngine:
+    def __init__(self):
+        # Enable Hindi ('hi') support alongside English ('en'); see language_cascade.py
+        self.languages = parse_languages(config.OCR_LANGUAGES)
+        self.doc_type_languages = {k: parse_languages(v) for k, v in config.OCR_LANGUAGES_BY_DOC_TYPE.items()}
+
+        # Runs the EasyOCR models: torch, torch-fp32, onnx or onnx-int8 (see backends.py)
+        self.backend = make_backend(config.OCR_BACKEND, config.ONNX_CACHE_DIR, config.OCR_THREADS_PER_WORKER)
+
+        # torch and the EasyOCR models are loaded by load(), not at import time
+        self.device = None
+        # English reader; also the text detector for every language set
+        self.reader = None
+        # Recognizer key ("en", "en+hi", ...) -> (reader, batcher or None)
+        self.recognizers = {}
+        # True once loaded, or once warmed up if start_background_load is warming up
+        self.ready = False
+        self.load_error = None
+        self._warmup_pending = False
+        self._load_lock = threading.Lock()
+
+        self.field_matcher = FieldMatcher(self)
+        self.templates = TemplateRegistry(config.TEMPLATE_DIR or None)
+
+        # Threads start on first use, so forked OCR workers don't inherit any
+        self.tile_executor = ThreadPoolExecutor(max_workers=max(1, config.TILE_WORKERS), thread_name_prefix="ocr-tile")
+
+        self.pipelines = {
+            name: PreprocessPipeline(profile, config.PREPROCESS_DEBUG_DIR or None)
+            for name, profile in PROFILES.items()
+        }
+
+    def load(self):
+        """Loads torch and the EasyOCR models. Safe to call from several threads."""
+        with self._load_lock:
+            if self.reader is not None:
+                return
+
+            import easyocr
+            import torch
+
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info("OCR Engine initialized on %s", self.device)
+            if config.OCR_THREADS_PER_WORKER > 0 and config.OCR_PROCESSES == 0:
+                torch.set_num_threads(config.OCR_THREADS_PER_WORKER)
+            if self.device == "cuda" and self.backend.cpu_only:
+                raise RuntimeError(f"OCR_BACKEND={self.backend.name} runs on CPU only; use torch on CUDA")
+
+            logger.info("Loading EasyOCR model (%s backend)...", self.backend.name)
+            reader = easyocr.Reader(["en"], gpu=(self.device == "cuda"), **self.backend.reader_options())
+            self._add_recognizer("en", reader)
+
+            # Every configured language set is loaded now; per-request ones on first use
+            for languages in [self.languages, *self.doc_type_languages.values()]:
+                for key in cascade_plan(languages, config.OCR_CASCADE):
+                    if key and key not in self.recognizers:
+                        self._add_recognizer(key)
+            logger.info("EasyOCR model loaded.")
+            self.reader = reader
+            if not self._warmup_pending:
+                self.ready = True
+
+    def _add_recognizer(self, key, reader=None):
+        # Caller holds _load_lock
+        import easyocr
+        from batcher import RecognitionBatcher
+
+        if reader is None:
+            # Recognition only; detection always uses the English reader's detector
+            reader = easyocr.Reader(
+                key.split("+"), gpu=(self.device == "cuda"), detector=False, **self.backend.reader_options()
+            )
+        self.backend.prepare(reader)
+        # Shares the recognizer across concurrent requests (see batcher.py)
+        batcher = None
+        if config.OCR_BATCHING:
+            batcher = RecognitionBatcher(reader, config.OCR_BATCH_SIZE, config.OCR_BATCH_WAIT_MS)
+        self.recognizers[key] = (reader, batcher)
+        return reader, batcher
+
+    def recognizer(self, key):
+        """(reader, batcher) for a language set key such as "en+hi", loaded on first use."""
+        entry = self.recognizers.get(key)
+        if entry is None:
+            self.load()
+            with self._load_lock:
+                entry = self.recognizers.get(key) or self._add_recognizer(key)
+        return entry
+
+    @property
+    def batcher(self):
+        return self.recognizers.get("en", (None, None))[1]
+
+    def languages_for(self, doc_type=None, languages=None):
+        """Language set for a request: explicit > per doc_type > OCR_LANGUAGES."""
+        if isinstance(languages, str):
+            return parse_languages(languages)
+        if languages:
+            return tuple(languages)
+        return self.doc_type_languages.get(doc_type, self.languages)
+
+    def warmup(self):
+        """
+        Runs one inference on a synthetic page so torch initializes its
+        kernels here instead of on the first real request.
+        """
+        self.load()
+        started = time.perf_counter()
+        page = np.full((200, 800), 255, np.uint8)
+        cv2.putText(page, "Name: Warmup 12345", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 0, 3)
+        processed_img, _ = self.preprocess_gray(page)
+        horizontal_list, free_list = self.detect(processed_img)
+        image_list = self.crops(processed_img, horizontal_list, free_list)
+        # Every loaded recognizer, not just the ones this Latin text would reach
+        for key in list(self.recognizers):
+            self.recognize_crops(key, image_list)
+        logger.info("Warmup finished in %.2fs", time.perf_counter() - started)
+        self._warmup_pending = False
+        self.ready = True
+
+    def start_background_load(self, warmup=True):
+        # Lazy loads by early requests mustn't report ready before the warmup has run
+        self._warmup_pending = warmup
+
+        def run():
+            try:
+                if warmup:
+                    self.warmup()
+                else:
+                    self.load()
+            except Exception as e:
+                self.load_error = str(e)
+                logger.exception("Error loading OCR models: %s", e)
+
+        thread = threading.Thread(target=run, name="ocr-load", daemon=True)
+        thread.start()
+        return thread
+
+    def cache_signature(self, doc_type=None, template=None, languages=None):
+        """
+        Identifies the settings that change extraction output.
+        Part of the extraction cache key, so bump it when the pipeline changes.
+        """
+        profiles = ",".join(f"{k}={v}" for k, v in sorted(config.PREPROCESS_PROFILES.items()))
+        templates = ",".join(f"{t.name}:{t.version}" for t in self.templates_for(doc_type, template))
+        plan = cascade_plan(self.languages_for(doc_type, languages), config.OCR_CASCADE)
+        return (
+            f"easyocr-{_easyocr_version()}:{self.backend.name}|{'>'.join(k for k in plan if k)}:{config.CASCADE_MIN_CONFIDENCE}"
+            f"|pdf{config.PDF_DPI}"
+            f"|pre={config.PREPROCESS_PROFILE};{profiles}|dec={config.DECODE_MAX_WIDTH}"
+            f"|tile={config.OCR_TILING}:{config.TILE_SIZE}:{config.TILE_OVERLAP}|tpl={templates}"
+            f"|q={config.QUALITY_GATE}:{config.ADAPTIVE_PREPROCESS}|fx={config.FIELD_EXTRACTION}|v4"
+        )
+
+    def templates_for(self, doc_type=None, template=None):
+        # An explicitly requested template, otherwise any registered for this doc_type
+        if template:
+            found = self.templates.get(template)
+            if found is None:
+                raise ValueError(f"Unknown template: {template}")
+            return [found]
+        return self.templates.for_doc_type(doc_type) if doc_type else []
+
+    def pipeline_for(self, doc_type):
+        name = config.PREPROCESS_PROFILES.get(doc_type, config.PREPROCESS_PROFILE)
+        if name not in self.pipelines:
+            raise ValueError(f"Unknown preprocessing profile: {name}")
+        return self.pipelines[name]
+
+    def decode_width_for(self, doc_type):
+        """Width OCR will work at; wider images are decoded at reduced resolution."""
+        widths = [w for w in (self.pipeline_for(doc_type).profile.max_width, config.DECODE_MAX_WIDTH) if w]
+        return min(widths) if widths else None
+
+    def input_limits(self, doc_type="auto"):
+        """(max_width, max_side) beyond which an upload only costs bandwidth; None means no limit."""
+        max_side = config.CLIENT_MAX_SIDE or None
+        if config.OCR_TILING == "never":
+            # Without tiles the detector shrinks anything larger than its canvas
+            max_side = min(max_side or DETECTOR_CANVAS, DETECTOR_CANVAS)
+        return self.decode_width_for(doc_type), max_side
+
+    def decode_image(self, source, timings=None, max_width=None):
+        """
+        Decodes bytes or a file path straight to grayscale, so no full-size
+        BGR copy is made. With `max_width`, an image at least twice as wide is
+        decoded at 1/2, 1/4 or 1/8 size, staying at or above `max_width`.
+        """
+        with _stage(timings, "decode"):
+            buffer = _source_buffer(source)
+            flag = cv2.IMREAD_GRAYSCALE
+            if max_width and buffer is not None:
+                width = _stored_width(source)
+                for factor, reduced in REDUCED_GRAYSCALE:
+                    if width and width // factor >= max_width:
+                        flag = reduced
+                        break
+
+            gray = cv2.imdecode(buffer, flag) if buffer is not None else None
+            if gray is None:
+                raise ValueError("Could not decode image")
+            return gray
+
+    def preprocess_image(self, source, doc_type="auto"):
+        return self.preprocess_gray(self.decode_image(source, max_width=self.decode_width_for(doc_type)), doc_type)
+
+    def assess(self, gray, timings=None):
+        """Quality metrics of a page (see quality.py)."""
+        with _stage(timings, "quality"):
+            return analyze(gray)
+
+    def preprocess_gray(self, gray, doc_type="auto", timings=None, report=None, deskew=True):
+        """
+        Returns (image, info) where info has the profile name and per-stage timings.
+        With a quality report, steps the page doesn't need are skipped.
+        """
+        pipeline = self.pipeline_for(doc_type)
+        adjustments = None
+        if report is not None and config.ADAPTIVE_PREPROCESS:
+            adjustments = Adjustments.for_report(report)
+            if not deskew:
+                adjustments.deskew = 0.0
+        with _stage(timings, "preprocess"):
+            processed_img, steps = pipeline.run(gray, adjustments)
+        info = {"profile": pipeline.profile.name, "timings_ms": steps}
+        if adjustments is not None:
+            info["skipped"] = adjustments.skipped()
+            info["deskew"] = round(adjustments.deskew, 2)
+        return processed_img, info
+
+    def rejected(self, report):
+        # Hopeless pages skip OCR; with QUALITY_GATE off they are still read
+        return config.QUALITY_GATE and report.rejected is not None
+
+    def normalize_digits(self, text):
+        # Mapping for Hindi (Devanagari) digits to English
+        hindi_digits = str.maketrans("०१२३४५६७८९", "0123456789")
+        return text.translate(hindi_digits)
+
+    def smart_typo_fixer(self, text, field_type="text"):
+        """
+        Manually tuned logic to fix common OCR character confusions.
+        This is how we 'teach' the system to be smarter!
+        """
+        if field_type == "digits":
+            # Fix letters that look like numbers
+            corrections = {
+                'O': '0', 'o': '0', 'D': '0',
+                'I': '1', 'l': '1', '|': '1',
+                'Z': '2', 'z': '2',
+                'S': '5', 's': '5',
+                'G': '6', 'b': '6',
+                'B': '8',
+                'g': '9', 'q': '9'
+            }
+            for char, digit in corrections.items():
+                text = text.replace(char, digit)
+        return text
+
+    def clean_email(self, text):
+        # ... (existing email logic) ...
+        # Replace spaces with dots only if they look like they separate parts of a domain or name
+        # But for now, let's just be careful. 
+        # "john smith@example com" -> "john.smith@example.com" is better than "johnsmith@examplecom"
+        
+        # First, fix common OCR spacing issues in domains
+        text = re.sub(r'@\s+', '@', text) # "user@ example.com" -> "user@example.com"
+        text = re.sub(r'\s+\.', '.', text) # "example .com" -> "example.com"
+        text = re.sub(r'\.\s+', '.', text) # "example. com" -> "example.com"
+        
+        # Handle "example com" -> "example.com"
+        if "@" in text:
+            parts = text.split("@")
+            if len(parts) == 2:
+                domain = parts[1]
+                if " " in domain and "." not in domain:
+                    domain = domain.replace(" ", ".")
+                parts[1] = domain
+                text = "@".join(parts)
+
+        text = text.replace(" ", "").replace(",", ".").replace("..", ".")
+        text = text.replace("$com", ".com").replace("$", "s")
+        text = text.replace("examp&", "example").replace("&", "e")
+        
+        if "@" not in text:
+            if "at" in text:
+                text = text.replace("at", "@")
+            elif ".com" in text:
+                domains = ["example.com", "gmail.com", "yahoo.com", "hotmail.com", "outlook.com"]
+                for d in domains:
+                    if d in text:
+                        idx = text.find(d)
+                        if idx > 0:
+                            if text[idx-1] == 'e' and d.startswith('e'):
+                                text = text[:idx-1] + "@" + d
+                            else:
+                                text = text[:idx] + "@" + d
+                        break
+                        
+        match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
+        if match: return match.group(0)
+        return text
+
+    def clean_phone(self, text):
+        text = self.normalize_digits(text)
+        # Apply smart typo fixing for digits
+        text = self.smart_typo_fixer(text, field_type="digits")
+        return re.sub(r'[^\d\+\-\(\)\s]', '', text).strip()
+
+    def clean_gender(self, text):
+        t = text.lower().strip()
+        if 'female' in t or t.startswith('f') or 'fem' in t:
+            return "Female"
+        if 'male' in t or t.startswith('m'):
+            return "Male"
+        return text.strip()
+
+    def clean_name(self, text):
+        # Allow unicode characters for Hindi support
+        return re.sub(r'[^\w\s\.]', '', text, flags=re.UNICODE).strip()
+
+    def clean_address(self, text):
+        text = self.normalize_digits(text)
+        text = text.strip(" .,-:")
+        text = text.replace("|", "I")
+        return text
+
+    def clean_field(self, key, text):
+        # Same per-field cleanup refine_fields() applies at the end
+        if key == "name": return self.clean_name(text)
+        if key == "age": return re.sub(r'\D', '', self.normalize_digits(text))
+        if key == "gender": return self.clean_gender(text)
+        if key == "email": return self.clean_email(text)
+        if key == "phone": return self.clean_phone(text)
+        if key == "address": return self.clean_address(text)
+        return text.strip()
+
+    def refine_fields(self, fields):
+        return self.field_matcher.refine(fields)
+
+    def extract_fields(self, text, timings=None):
+        with _stage(timings, "fields"):
+            fields = self.field_matcher.extract(text)
+        if config.LOG_DOCUMENT_TEXT:
+            logger.debug("Extracted fields: %s", fields)
+        return fields
+
+    def read_boxes(self, img, timings=None, languages=None):
+        """
+        Same output as reader.readtext(img, detail=1), [(box, text,
+        confidence), ...], but recognition goes through the language cascade
+        and, when enabled, the batcher so crops from concurrent requests
+        share one batch.
+        """
+        if self.reader is None:
+            self.load()
+
+        horizontal_list, free_list = self.detect(img, timings)
+        image_list = self.crops(img, horizontal_list, free_list)
+        return self.recognize_cascade(image_list, languages or self.languages, timings)
+
+    def read_lines(self, img, timings=None, languages=None):
+        """Same output as reader.readtext(img, detail=0)."""
+        return [text for _, text, _ in self.read_boxes(img, timings, languages)]
+
+    def read_page(self, img, timings=None, languages=None):
+        """
+        (raw_text, fields, field_confidence) of a preprocessed page. With
+        FIELD_EXTRACTION=layout fields are paired by box position (see
+        layout.py); in text mode field_confidence is None.
+        """
+        if config.FIELD_EXTRACTION != "layout":
+            text = "\n".join(self.read_lines(img, timings, languages))
+            return text, self.extract_fields(text, timings), None
+
+        results = self.read_boxes(img, timings, languages)
+        with _stage(timings, "layout"):
+            page = PageLayout(results)
+        with _stage(timings, "fields"):
+            fields, confidence = self.field_matcher.extract_layout(page)
+        if config.LOG_DOCUMENT_TEXT:
+            logger.debug("Extracted fields: %s", fields)
+        return page.text, fields, confidence
+
+    def crops(self, img, horizontal_list, free_list):
+        from easyocr.config import imgH
+        from easyocr.utils import get_image_list
+
+        # readtext() on CPU recognizes horizontal boxes first, then free boxes, in detection order
+        image_list, _ = get_image_list(horizontal_list, [], img, model_height=imgH, sort_output=False)
+        free_images, _ = get_image_list([], free_list, img, model_height=imgH, sort_output=False)
+        return image_list + free_images
+
+    def recognize_crops(self, key, image_list):
+        """[(box, text, confidence), ...] for the crops, read by one recognizer."""
+        if not image_list:
+            return []
+        from batcher import ignore_chars, recognize_crops
+
+        reader, batcher = self.recognizer(key)
+        if batcher is not None:
+            return batcher.recognize(image_list)
+        # One crop at a time, like readtext() on CPU
+        ignore_char = ignore_chars(reader)
+        return [recognize_crops(reader, [crop], ignore_char)[0] for crop in image_list]
+
+    def recognize_cascade(self, image_list, languages, timings=None):
+        """
+        English first: crops that look like Devanagari, or that the English
+        model reads below CASCADE_MIN_CONFIDENCE, are read again by the full
+        language set, and the more confident reading wins.
+        """
+        first, second = cascade_plan(languages, config.OCR_CASCADE)
+        if second is None:
+            with _stage(timings, "recognize"):
+                results = self.recognize_crops(first, image_list)
+            if timings is not None:
+                timings.count(first, len(image_list))
+            return results
+
+        devanagari = [False] * len(image_list)
+        if needs_script_check(languages):
+            with _stage(timings, "script"):
+                devanagari = [looks_devanagari(crop) for _, crop in image_list]
+
+        results = [None] * len(image_list)
+        with _stage(timings, "recognize"):
+            latin = [i for i, flag in enumerate(devanagari) if not flag]
+            for i, result in zip(latin, self.recognize_crops(first, [image_list[i] for i in latin])):
+                results[i] = result
+
+            retry = [i for i, result in enumerate(results) if result is None or result[2] < config.CASCADE_MIN_CONFIDENCE]
+            for i, result in zip(retry, self.recognize_crops(second, [image_list[i] for i in retry])):
+                if results[i] is None or result[2] > results[i][2]:
+                    results[i] = result
+        if timings is not None:
+            timings.count(first, len(latin))
+            timings.count(second, len(retry))
+        return results
+
+    def use_tiling(self, img):
+        if config.OCR_TILING == "always":
+            return True
+        if config.OCR_TILING == "auto":
+            return max(img.shape[:2]) > DETECTOR_CANVAS
+        return False
+
+    def detect(self, img, timings=None):
+        """Text boxes as EasyOCR's (horizontal_list, free_list); large pages are detected in tiles."""
+        if self.use_tiling(img):
+            return self.detect_tiled(img, timings)
+        with _stage(timings, "detect"):
+            horizontal_list, free_list = self.reader.detect(img)
+        return horizontal_list[0], free_list[0]
+
+    def detect_tiled(self, img, timings=None):
+        """
+        Detects overlapping tiles in parallel at full resolution and merges
+        the boxes across seams (see tiling.py). Tiles are views of `img`,
+        not copies.
+        """
+        h, w = img.shape[:2]
+        rects = plan_tiles(h, w, config.TILE_SIZE, config.TILE_OVERLAP)
+
+        def detect_tile(index, rect):
+            x0, y0, x1, y1 = rect
+            with _stage(timings, "detect"):
+                horizontal_list, free_list = self.reader.detect(img[y0:y1, x0:x1])
+            return offset_boxes(horizontal_list[0], free_list[0], index, rect, w, h)
+
+        boxes, free = [], []
+        for tile_boxes, tile_free in self.tile_executor.map(detect_tile, range(len(rects)), rects):
+            boxes += tile_boxes
+            free += tile_free
+        with _stage(timings, "tile_merge"):
+            return merge_tile_boxes(boxes, free)
+
+    def recognize_boxes(self, img, boxes, languages=None, timings=None):
+        """
+        Recognizes each [x_min, x_max, y_min, y_max] box as a single line,
+        skipping text detection. Returns [(text, confidence), ...] per box.
+        """
+        if self.reader is None:
+            self.load()
+
+        from easyocr.config import imgH
+        from easyocr.utils import get_image_list
+
+        image_list = []
+        owners = []
+        for n, box in enumerate(boxes):
+            items, _ = get_image_list([box], [], img, model_height=imgH, sort_output=False)
+            image_list += items
+            owners += [n] * len(items)
+
+        recognized = [("", 0.0)] * len(boxes)
+        results = self.recognize_cascade(image_list, languages or self.languages, timings)
+        for n, (_, text, confidence) in zip(owners, results):
+            recognized[n] = (text, float(confidence))
+        return recognized
+
+    def extract_with_template(self, gray, template, doc_type="auto", timings=None, languages=None, report=None):
+        """
+        Template/ROI mode: align the page to a registered form and read only
+        the field boxes. Returns None when the page doesn't align.
+        """
+        with _stage(timings, "align"):
+            aligned, inliers = template.align(gray)
+        if aligned is None:
+            return None
+
+        # Alignment already straightened the page
+        processed_img, preprocess = self.preprocess_gray(aligned, doc_type, timings, report, deskew=False)
+        h, w = processed_img.shape
+        boxes = template.boxes(w, h)
+        recognized = self.recognize_boxes(processed_img, list(boxes.values()), languages, timings)
+
+        fields = {}
+        confidence = {}
+        lines = []
+        with _stage(timings, "fields"):
+            for key, (text, score) in zip(boxes, recognized):
+                fields[key] = self.clean_field(key, text) if text else ""
+                confidence[key] = round(score, 4)
+                if text:
+                    lines.append(text)
+
+        return {
+            "raw_text": "\n".join(lines),
+            "fields": fields,
+            "field_confidence": {key: confidence[key] for key in fields if fields[key]},
+            **_quality_fields(report),
+            "detected_type": f"template:{template.name}",
+            "template": {"name": template.name, "aligned": True, "inliers": inliers, "confidence": confidence},
+            "preprocess": preprocess
+        }
+
+    def rasterize_pdf(self, source, dpi=None, timings=None):
+        """
+        Yields (page_number, text_layer, gray_image) for each page, one page at a time.
+        Pages with an embedded text layer are not rendered, so gray_image is None for them.
+        """
+        dpi = dpi or config.PDF_DPI
+        if isinstance(source, str):
+            opened = pymupdf.open(source, filetype="pdf")
+        else:
+            opened = pymupdf.open(stream=source, filetype="pdf")
+        with opened as doc:
+            for index, page in enumerate(doc):
+                with _stage(timings, "rasterize"):
+                    text = page.get_text("text").strip()
+                    if len(text) >= config.PDF_TEXT_LAYER_MIN_CHARS:
+                        gray = None
+                    else:
+                        text = None
+                        pix = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, alpha=False)
+                        gray = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].copy()
+                yield index + 1, text, gray
+
+    def _page_result(self, page_number, text, source, preprocess=None, timings=None, report=None,
+                     fields=None, confidence=None):
+        result = {
+            "page": page_number,
+            "source": source,
+            "raw_text": text,
+            "fields": fields if fields is not None else self.extract_fields(text, timings)
+        }
+        if confidence is not None:
+            result["field_confidence"] = confidence
+        if report is not None:
+            result["quality"] = report.to_dict()
+        if preprocess is not None:
+            result["preprocess"] = preprocess
+        return result
+
+    def ocr_page(self, page_number, gray, doc_type="auto", timings=None, languages=None):
+        report = self.assess(gray, timings)
+        if self.rejected(report):
+            return self._page_result(page_number, "", "rejected", timings=timings, report=report)
+        processed_img, preprocess = self.preprocess_gray(gray, doc_type, timings, report)
+        text, fields, confidence = self.read_page(processed_img, timings, languages)
+        return self._page_result(page_number, text, "ocr", preprocess, timings, report, fields, confidence)
+
+    def extract_pdf_pages(self, source, doc_type="auto", timings=None, languages=None):
+        """
+        Yields per-page results as soon as each page is done, so not in page order.
+        Pages are OCRed in parallel; at most 2 * PDF_PAGE_WORKERS rendered pages
+        are held in memory at once.
+        """
+        workers = max(1, config.PDF_PAGE_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-page") as executor:
+            pending = set()
+            for page_number, text, gray in self.rasterize_pdf(source, timings=timings):
+                if text is not None:
+                    yield self._page_result(page_number, text, "text_layer", timings=timings)
+                    continue
+
+                pending.add(executor.submit(self.ocr_page, page_number, gray, doc_type, timings, languages))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            for future in as_completed(pending):
+                yield future.result()
+
+    def image_page(self, gray, doc_type="auto", template=None, timings=None, languages=None):
+        """An image's single page, read by a registered form template when one aligns."""
+        report = self.assess(gray, timings)
+        if self.rejected(report):
+            return self._page_result(1, "", "rejected", timings=timings, report=report)
+        result, tried = self._read_templates(gray, doc_type, template, timings, languages, report)
+        if result is not None:
+            page = self._page_result(1, result["raw_text"], "template", result["preprocess"], timings, report,
+                                     result["fields"], result["field_confidence"])
+            page["template"] = result["template"]
+            return page
+        processed_img, preprocess = self.preprocess_gray(gray, doc_type, timings, report)
+        text, fields, confidence = self.read_page(processed_img, timings, languages)
+        page = self._page_result(1, text, "ocr", preprocess, timings, report, fields, confidence)
+        if tried:
+            page["template"] = {"name": ",".join(tried), "aligned": False}
+        return page
+
+    def iter_pages(self, source, doc_type="auto", is_pdf=False, timings=None, languages=None, template=None):
+        """Pages as they are done; `template` applies to images only, as in extract_text."""
+        languages = self.languages_for(doc_type, languages)
+        if is_pdf:
+            yield from self.extract_pdf_pages(source, doc_type, timings, languages)
+        else:
+            gray = self.decode_image(source, timings, self.decode_width_for(doc_type))
+            yield self.image_page(gray, doc_type, template, timings, languages)
+
+    def combine_pages(self, pages, timings=None):
+        pages = sorted(pages, key=lambda p: p["page"])
+        generated_text = "\n".join(p["raw_text"] for p in pages if p["raw_text"])
+        result = {
+            "raw_text": generated_text,
+            "quality_status": "Good",
+            "detected_type": "auto",
+            "pages": pages
+        }
+        if any("field_confidence" in p for p in pages):
+            result["fields"], result["field_confidence"] = self._merge_page_fields(pages)
+        else:
+            result["fields"] = self.extract_fields(generated_text, timings)
+        reports = [p["quality"] for p in pages if "quality" in p]
+        if len(pages) == 1 and reports:
+            result.update(_quality_fields(reports[0]))
+        if len(pages) == 1 and "template" in pages[0]:
+            # Images only; reported as extract_text does
+            result["template"] = pages[0]["template"]
+            if result["template"]["aligned"]:
+                result["detected_type"] = f"template:{result['template']['name']}"
+        elif reports:
+            # Rejected only if no page had anything to read; otherwise the first page's issue
+            if all(p["source"] == "rejected" for p in pages):
+                result["quality_status"] = "Rejected"
+            else:
+                statuses = [r["status"] for r in reports if r["status"] not in ("Good", "Rejected")]
+                result["quality_status"] = statuses[0] if statuses else "Good"
+            rejected = [p["page"] for p in pages if p["source"] == "rejected"]
+            if rejected:
+                result["rejected_pages"] = rejected
+        return result
+
+    def _merge_page_fields(self, pages):
+        """
+        Fields of pages read by layout, merged in page order: the first page
+        with a value for a field wins. Text-layer pages have no boxes, so
+        their values come without a confidence.
+        """
+        fields, confidence = {}, {}
+        for page in pages:
+            page_confidence = page.get("field_confidence", {})
+            for key, value in page["fields"].items():
+                if value and not fields.get(key):
+                    fields[key] = value
+                    confidence[key] = page_confidence.get(key)
+                else:
+                    fields.setdefault(key, value)
+        return fields, confidence
+
+    def extract_text(self, source, doc_type="auto", is_pdf=False, template=None, languages=None):
+        """
+        `source` is the file's bytes or the path of a spooled upload;
+        `languages` overrides the doc_type's language set ("en", "en,hi").
+        """
+        timings = StageTimings()
+        try:
+            result = self._extract(source, doc_type, is_pdf, template, timings, self.languages_for(doc_type, languages))
+        except Exception as e:
+            logger.exception("Error in EasyOCR extraction: %s", e)
+            result = {"raw_text": "", "fields": {}, "error": str(e)}
+        result["timings_ms"] = timings.as_ms()
+        result["recognized_crops"] = timings.counts()
+        result["peak_memory_mb"] = timings.peak_memory_mb()
+        return result
+
+    def _extract(self, source, doc_type, is_pdf, template, timings, languages):
+        if is_pdf:
+            result = self.combine_pages(self.extract_pdf_pages(source, doc_type, timings, languages), timings)
+            self._log_result(result, doc_type)
+            return result
+
+        gray = self.decode_image(source, timings, self.decode_width_for(doc_type))
+        report = self.assess(gray, timings)
+        if self.rejected(report):
+            result = {"raw_text": "", "fields": {}, **_quality_fields(report), "detected_type": "auto"}
+            self._log_result(result, doc_type)
+            return result
+
+        result, tried = self._read_templates(gray, doc_type, template, timings, languages, report)
+        if result is not None:
+            self._log_result(result, doc_type)
+            return result
+
+        # Fall back to full-page detection when no template aligned
+        processed_img, preprocess = self.preprocess_gray(gray, doc_type, timings, report)
+        generated_text, fields, confidence = self.read_page(processed_img, timings, languages)
+
+        result = {
+            "raw_text": generated_text,
+            "fields": fields,
+            **_quality_fields(report),
+            "detected_type": "auto",
+            "preprocess": preprocess
+        }
+        if confidence is not None:
+            result["field_confidence"] = confidence
+        if tried:
+            result["template"] = {"name": ",".join(tried), "aligned": False}
+        self._log_result(result, doc_type)
+        return result
+
+    def _read_templates(self, gray, doc_type, template, timings, languages, report):
+        """
+        Known forms: reads only the field boxes of the first template that
+        aligns. Returns (result or None, names of the templates tried).
+        """
+        tried = []
+        for form in self.templates_for(doc_type, template):
+            result = self.extract_with_template(gray, form, doc_type, timings, languages, report)
+            if result is not None:
+                return result, tried
+            tried.append(form.name)
+        return None, tried
+
+    def _log_result(self, result, doc_type):
+        # Counts only; document text goes to the log only with LOG_DOCUMENT_TEXT
+        logger.info(
+            "Extraction finished",
+            extra={
+                "doc_type": doc_type,
+                "lines": len(result["raw_text"].splitlines()),
+                "fields_found": sum(1 for v in result["fields"].values() if v),
+                "pages": len(result.get("pages") or [None]),
+            }
+        )
+        if config.LOG_DOCUMENT_TEXT:
+            logger.debug("EasyOCR output:\n%s", result["raw_text"])
+
+ocr_engine = OCREngine()
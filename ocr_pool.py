@@ -0,0 +1,150 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("OCR queue is full")
+        self.retry_after = retry_after
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class OCRPool:
+    """
+    Runs blocking OCR work off the event loop on a fixed set of workers.
+    At most `max_workers` jobs run and `queue_size` more may wait; anything
+    beyond that is rejected with QueueFullError so callers can back off.
+    """
+    def __init__(self, max_workers, queue_size):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+        # Exponential moving average of job run time, used for Retry-After.
+        self._avg_service = 1.0
+        # (loop, future) of callers waiting in wait_for_idle()
+        self._idle_waiters = []
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.queue_size
+
+    def retry_after(self):
+        with self._lock:
+            waiting = max(self._admitted - self._running, 0)
+            estimate = (waiting + 1) * self._avg_service / self.max_workers
+        return max(1, math.ceil(estimate))
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.submit(fn, *args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Admits the job or raises QueueFullError immediately, without awaiting.
+        Returns an asyncio future for the result.
+        """
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                rejected = True
+            else:
+                self._admitted += 1
+                rejected = False
+        if rejected:
+            raise QueueFullError(self.retry_after())
+        return self._start(fn, args, kwargs)
+
+    def try_submit(self, fn, *args, **kwargs):
+        """
+        Starts the job only if a worker is idle right now, else returns None.
+        For background work that must not make requests wait.
+        """
+        with self._lock:
+            if self._admitted >= self.max_workers:
+                return None
+            self._admitted += 1
+        return self._start(fn, args, kwargs)
+
+    async def wait_for_idle(self):
+        """
+        Returns once a worker is idle. Another caller may still take it
+        first, so try_submit() can return None afterwards.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._admitted < self.max_workers:
+                return
+            waiter = loop.create_future()
+            self._idle_waiters.append((loop, waiter))
+        await waiter
+
+    def _start(self, fn, args, kwargs):
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            wait = started - submitted
+            with self._lock:
+                self._running += 1
+                self._total_wait += wait
+                self._last_wait = wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._avg_service = 0.8 * self._avg_service + 0.2 * elapsed
+
+        future = self.executor.submit(job)
+        # Release the slot when the job finishes or is cancelled before it starts.
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self._admitted -= 1
+            waiters, self._idle_waiters = self._idle_waiters, []
+        # Called on the worker thread; waiters are woken on their own loop
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The loop has closed (shutdown)
+                pass
+
+    def stats(self):
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.max_workers,
+                "queue_capacity": self.queue_size,
+                "running": self._running,
+                "queued": max(self._admitted - self._running, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(1000 * self._total_wait / started, 2) if started else 0.0,
+                "last_wait_ms": round(1000 * self._last_wait, 2),
+                "max_wait_ms": round(1000 * self._max_wait, 2),
+                "avg_service_ms": round(1000 * self._avg_service, 2),
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,15 @@
+"""
+Imported once by the forkserver the OCR worker processes are started from
+(see ocr_workers.py). The models are loaded here, before any worker is
+forked, so every worker shares the weights copy-on-write.
+"""
+import logging
+
+from ocr_engine import ocr_engine
+
+try:
+    # No inference here, so torch's thread pools stay uninitialized for the forks
+    ocr_engine.load()
+except Exception as e:
+    # Each worker then tries to load the models itself and reports the error
+    logging.getLogger(__name__).exception("Error preloading OCR models: %s", e)
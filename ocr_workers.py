@@ -0,0 +1,257 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backends import OnnxBackend
+from metrics import StageTimings
+from ocr_engine import ocr_engine
+
+logger = logging.getLogger(__name__)
+
+# How often iter_pages() checks that its worker is still alive
+PAGE_POLL_SECONDS = 1.0
+
+
+class WorkersUnavailable(RuntimeError):
+    """The worker processes are starting, or restarting after one died."""
+
+
+def default_threads_per_worker(processes):
+    return max(1, (os.cpu_count() or 1) // max(1, processes))
+
+
+def configure_torch_threads(intra_op, inter_op=1):
+    import torch
+    torch.set_num_threads(intra_op)
+    try:
+        torch.set_num_interop_threads(inter_op)
+    except RuntimeError:
+        # Only allowed before torch starts any parallel work in this process
+        pass
+
+
+def _add_to_forkserver_path():
+    # The forkserver is started with this process's environment but not its
+    # sys.path, and must find ocr_preload there; the workers do get sys.path
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+    if here not in paths:
+        os.environ["PYTHONPATH"] = os.pathsep.join([here, *paths])
+
+
+# --- Functions below run inside the worker processes ---
+
+def _init_worker(threads, warmup, status):
+    # Reports None, or why this worker can't serve, on `status`
+    try:
+        configure_torch_threads(threads)
+        if isinstance(ocr_engine.backend, OnnxBackend):
+            # Sessions are created on first use in each worker, so this applies to them
+            ocr_engine.backend.threads = threads
+        if ocr_engine.reader is None:
+            logger.warning("The forkserver didn't preload the OCR models; this worker loads its own copy")
+        # The forkserver loaded the models before forking this worker; a no-op then
+        ocr_engine.load()
+        if ocr_engine.device == "cuda":
+            raise RuntimeError("OCR_PROCESSES is for CPU serving; CUDA cannot be used in forked workers")
+        if warmup:
+            ocr_engine.warmup()
+    except Exception as e:
+        status.put(f"{type(e).__name__}: {e}")
+        raise
+    status.put(None)
+
+
+def _extract_text(source, doc_type, is_pdf, template, languages):
+    return ocr_engine.extract_text(source, doc_type, is_pdf, template, languages)
+
+
+def _stream_pages(source, doc_type, is_pdf, events, languages, template):
+    timings = StageTimings()
+    try:
+        for page in ocr_engine.iter_pages(source, doc_type, is_pdf, timings, languages, template):
+            events.put(page)
+    finally:
+        events.put(None)
+    return timings.as_ms(), timings.counts()
+
+
+class OCRWorkerProcesses:
+    """
+    Runs OCR in a fixed set of worker processes.
+
+    The workers are forked from a forkserver that loads the models once
+    when it starts (see ocr_preload.py), so the weights are shared
+    copy-on-write instead of being loaded N times, and this process, which
+    runs the server's threads, never forks itself. Each worker limits torch
+    to `threads_per_worker` intra-op threads so that processes x threads
+    stays within the CPU count.
+
+    If a worker dies the pool is broken; it is replaced by new workers from
+    the same forkserver. Requests get WorkersUnavailable and `ready` is
+    false until they are up. If a worker fails to load the models,
+    `load_error` is set and the pool is not restarted.
+
+    Exposes the same extract_text / iter_pages / readiness interface as
+    OCREngine, so main.py can use either one.
+    """
+    def __init__(self, engine, processes, threads_per_worker=0):
+        self.engine = engine
+        self.processes = processes
+        self.threads_per_worker = threads_per_worker or default_threads_per_worker(processes)
+        self.executor = None
+        self.ready = False
+        self.rebuilding = False
+        self.load_error = None
+        self.warmup = True
+        self._manager = None
+        self._lock = threading.Lock()
+
+    @property
+    def device(self):
+        # The workers refuse CUDA (see _init_worker)
+        return "cpu" if self.ready else None
+
+    @property
+    def batcher(self):
+        # Each worker process batches on its own; nothing to report from the API process
+        return None
+
+    def start(self, warmup=True):
+        """
+        Starts the workers in the background and returns; `ready` turns true
+        once every worker has loaded (and, with `warmup`, warmed up) the models.
+        """
+        self.warmup = warmup
+        _add_to_forkserver_path()
+        return self._start_in_background()
+
+    def _start_in_background(self):
+        thread = threading.Thread(target=self._start_workers, name="ocr-workers", daemon=True)
+        thread.start()
+        return thread
+
+    def _start_workers(self):
+        # Starting the forkserver, the manager and the first worker each
+        # wait for the forkserver to load the models, so this runs on its own thread
+        try:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["ocr_preload"])
+            if self._manager is None:
+                # Serves the page queues of iter_pages()
+                self._manager = context.Manager()
+            status = context.Queue()
+            executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.threads_per_worker, self.warmup, status),
+            )
+            # Each submit that finds no idle worker launches one more
+            for _ in range(self.processes):
+                executor.submit(os.getpid)
+        except Exception as e:
+            logger.exception("Error starting OCR worker processes: %s", e)
+            self._failed(str(e))
+            return
+        with self._lock:
+            self.executor = executor
+
+        reported = 0
+        while reported < self.processes:
+            try:
+                error = status.get(timeout=PAGE_POLL_SECONDS)
+            except queue.Empty:
+                # A worker killed while loading never reports; a request then finds the pool broken
+                if self.executor is not executor:
+                    return
+                continue
+            if error is not None:
+                logger.error("An OCR worker process failed to load the models: %s", error)
+                self._failed(error)
+                return
+            reported += 1
+        with self._lock:
+            if self.executor is not executor:
+                return
+            self.ready = True
+            self.rebuilding = False
+            self.load_error = None
+        logger.info("Started %d OCR worker processes with %d torch threads each", self.processes, self.threads_per_worker)
+
+    def _failed(self, error):
+        with self._lock:
+            self.load_error = error
+            self.ready = False
+            self.rebuilding = False
+
+    def _rebuild(self, broken):
+        with self._lock:
+            # Workers that couldn't load the models wouldn't load them on a restart either
+            if self.executor is not broken or self.rebuilding or self.load_error:
+                return
+            self.rebuilding = True
+            self.ready = False
+        logger.error("An OCR worker process died; starting new workers")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._start_in_background()
+
+    def _require_started(self):
+        with self._lock:
+            if self.load_error:
+                raise WorkersUnavailable(f"OCR worker processes failed to start: {self.load_error}")
+            if self.executor is None or self.rebuilding:
+                raise WorkersUnavailable(
+                    "OCR worker processes are restarting" if self.rebuilding else "OCR worker processes are still starting"
+                )
+            return self.executor
+
+    def _broken(self, executor):
+        self._rebuild(executor)
+        return WorkersUnavailable("An OCR worker process died; restarting the workers")
+
+    def extract_text(self, source, doc_type="auto", is_pdf=False, template=None, languages=None):
+        executor = self._require_started()
+        try:
+            return executor.submit(_extract_text, source, doc_type, is_pdf, template, languages).result()
+        except BrokenProcessPool as e:
+            raise self._broken(executor) from e
+
+    def iter_pages(self, source, doc_type="auto", is_pdf=False, timings=None, languages=None, template=None):
+        executor = self._require_started()
+        events = self._manager.Queue()
+        try:
+            future = executor.submit(_stream_pages, source, doc_type, is_pdf, events, languages, template)
+            while True:
+                try:
+                    page = events.get(timeout=PAGE_POLL_SECONDS)
+                except queue.Empty:
+                    # A worker that dies never sends the end marker
+                    if future.done():
+                        break
+                    continue
+                if page is None:
+                    break
+                yield page
+            # Surface errors raised in the worker, and merge its stage timings and counts into ours
+            worker_timings, worker_counts = future.result()
+        except BrokenProcessPool as e:
+            raise self._broken(executor) from e
+        if timings is not None:
+            for stage, ms in worker_timings.items():
+                timings.add(stage, ms / 1000.0)
+            for name, amount in worker_counts.items():
+                timings.count(name, amount)
+
+    def combine_pages(self, pages, timings=None):
+        return self.engine.combine_pages(pages, timings)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
@@ -0,0 +1,111 @@
+import os
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+
+def build_gamma_lut(gamma):
+    # Gamma < 1.0 makes image darker/contrastier
+    return np.clip(np.power(np.arange(256) / 255.0, gamma) * 255.0, 0, 255).astype(np.uint8).reshape(1, 256)
+
+
+class PreprocessProfile:
+    def __init__(self, name, min_width=1000, max_width=None, denoise=None, gamma=0.8, unsharp=True):
+        self.name = name
+        # Upscale narrower images to this width so small text is readable
+        self.min_width = min_width
+        # Downscale wider images to this width; None keeps full resolution
+        self.max_width = max_width
+        # ("nlmeans", h, template_window, search_window) | ("bilateral", d, sigma_color, sigma_space)
+        # | ("median", ksize) | None
+        self.denoise = denoise
+        self.gamma = gamma
+        self.unsharp = unsharp
+
+
+PROFILES = {
+    # Downscale big scans and use a cheap edge-preserving filter
+    "fast": PreprocessProfile("fast", max_width=1800, denoise=("median", 3)),
+    # Non-local means with a smaller search window (roughly 4x cheaper than "quality")
+    "balanced": PreprocessProfile("balanced", max_width=2500, denoise=("nlmeans", 10, 7, 11)),
+    # The original pipeline: full resolution, full non-local means
+    "quality": PreprocessProfile("quality", denoise=("nlmeans", 10, 7, 21)),
+}
+
+
+class PreprocessPipeline:
+    """
+    Grayscale page -> image handed to EasyOCR.
+    Lookup tables are built once per pipeline; run() returns per-stage timings in ms.
+    `adjustments` (quality.Adjustments) turns off the steps a page doesn't
+    need and straightens skewed pages; None runs every step of the profile.
+    """
+    def __init__(self, profile, debug_dir=None):
+        self.profile = profile
+        self.debug_dir = debug_dir
+        self.gamma_lut = build_gamma_lut(profile.gamma) if profile.gamma else None
+
+    def run(self, gray, adjustments=None):
+        profile = self.profile
+        timings = {}
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings[stage] = round((now - start) * 1000, 3)
+            start = now
+
+        if adjustments is not None and adjustments.deskew:
+            h, w = gray.shape
+            rotation = cv2.getRotationMatrix2D((w / 2, h / 2), adjustments.deskew, 1.0)
+            gray = cv2.warpAffine(gray, rotation, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            lap("deskew")
+
+        # Resize (Upscale if too small, downscale oversized scans)
+        h, w = gray.shape
+        if w < profile.min_width and (adjustments is None or adjustments.upscale):
+            scale = profile.min_width / w
+            gray = cv2.resize(gray, (profile.min_width, int(h * scale)))
+        elif profile.max_width and w > profile.max_width:
+            scale = profile.max_width / w
+            gray = cv2.resize(gray, (profile.max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        lap("resize")
+
+        denoise = profile.denoise
+        if denoise is None or (adjustments is not None and not adjustments.denoise):
+            denoised = gray
+        elif denoise[0] == "nlmeans":
+            denoised = cv2.fastNlMeansDenoising(gray, None, denoise[1], denoise[2], denoise[3])
+        elif denoise[0] == "bilateral":
+            denoised = cv2.bilateralFilter(gray, denoise[1], denoise[2], denoise[3])
+        elif denoise[0] == "median":
+            denoised = cv2.medianBlur(gray, denoise[1])
+        else:
+            raise ValueError(f"Unknown denoise method: {denoise[0]}")
+        lap("denoise")
+
+        # Gamma Correction (Darken faint text)
+        if self.gamma_lut is not None and (adjustments is None or adjustments.gamma):
+            corrected = cv2.LUT(denoised, self.gamma_lut)
+        else:
+            corrected = denoised.copy()
+        lap("gamma")
+
+        # Unsharp Masking (Better sharpening)
+        if profile.unsharp and (adjustments is None or adjustments.sharpen):
+            gaussian = cv2.GaussianBlur(corrected, (0, 0), 3.0)
+            result = cv2.addWeighted(corrected, 1.5, gaussian, -0.5, 0, corrected)
+        else:
+            result = corrected
+        lap("sharpen")
+
+        if self.debug_dir:
+            # Save debug to see what the AI sees; unique name so concurrent requests don't clash
+            os.makedirs(self.debug_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(self.debug_dir, f"{profile.name}-{uuid.uuid4().hex}.png"), result)
+            lap("debug_dump")
+
+        return result, timings
@@ -0,0 +1,39 @@
+import os
+import time
+import uuid
+
+
+def run_profiled(directory, fn, *args):
+    """
+    Runs fn(*args) under pyinstrument if it is installed, otherwise cProfile.
+    Returns (result, report_path). pyinstrument writes an HTML report,
+    cProfile a .prof file for snakeviz / pstats.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.stop()
+            path = name + ".html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        return result, path
+
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args)
+    finally:
+        path = name + ".prof"
+        profiler.dump_stats(path)
+    return result, path
@@ -0,0 +1,223 @@
+"""
+Fast image quality analysis, run on every page before OCR.
+
+The page is analysed at ANALYSIS_WIDTH, which takes a few tens of
+milliseconds. A local (adaptive) threshold finds the ink, so shaded card
+backgrounds and header bars don't count as text, and the metrics are
+measured where they mean something:
+
+- blur:     variance of the Laplacian around the text only, so large blank
+            margins don't make a sharp page look blurry
+- contrast: spread between dark and light pixels around the text, 0-1
+- noise:    Immerkaer's noise sigma over the paper, away from the text,
+            at the image's own resolution
+- skew:     median orientation of the text lines, in degrees
+- text height: median character height in px, at the image's own
+            resolution
+
+The report is used three ways. Hopeless pages (blank, far too blurry,
+no contrast, tiny) are rejected before any OCR time is spent. Clean pages
+skip the denoise and upscale steps. The heavy filters run only where the
+metrics call for them (see Adjustments).
+"""
+import math
+
+import cv2
+import numpy as np
+
+# Width the metrics are computed at; narrower images are analysed as they are
+ANALYSIS_WIDTH = 1000
+
+# Rejected: nothing here is worth an OCR pass
+MIN_INK_FRACTION = 0.001
+REJECT_BLUR = 5.0
+REJECT_CONTRAST = 0.04
+REJECT_TEXT_HEIGHT = 5
+
+# Reported in quality_status and used to pick the preprocessing
+BLURRY = 150.0
+LOW_CONTRAST = 0.35
+# Noise sigma (gray levels) below which denoising is skipped
+CLEAN_NOISE = 2.5
+NOISY = 8.0
+# Characters taller than this (px) are large enough for the recognizer without upscaling
+READABLE_TEXT_HEIGHT = 16
+# Skew (degrees) worth straightening, and the most we trust the estimate
+MIN_DESKEW = 1.0
+MAX_DESKEW = 15.0
+
+# Local threshold: a pixel is ink if this much darker than its neighbourhood
+INK_BLOCK = 31
+INK_OFFSET = 8
+# Line blobs must be this elongated to count for skew
+MIN_LINE_ASPECT = 4.0
+
+
+class QualityReport:
+    """Metrics of one page; `rejected` is the reason OCR was skipped, or None."""
+    def __init__(self, blur, contrast, noise, skew, text_height, width, height, ink):
+        self.blur = blur
+        self.contrast = contrast
+        self.noise = noise
+        self.skew = skew
+        self.text_height = text_height
+        self.width = width
+        self.height = height
+        self.ink = ink
+        self.rejected = self._rejection()
+
+    def _rejection(self):
+        if self.ink < MIN_INK_FRACTION:
+            return "No text found on the page"
+        if self.contrast < REJECT_CONTRAST:
+            return "Contrast too low to read"
+        if self.blur < REJECT_BLUR:
+            return "Too blurry to read"
+        if self.text_height is not None and self.text_height < REJECT_TEXT_HEIGHT:
+            return "Resolution too low to read"
+        return None
+
+    def issues(self):
+        issues = []
+        if self.blur < BLURRY:
+            issues.append("Blurry")
+        if self.contrast < LOW_CONTRAST:
+            issues.append("Low contrast")
+        if self.noise > NOISY:
+            issues.append("Noisy")
+        if abs(self.skew) >= MIN_DESKEW:
+            issues.append("Skewed")
+        if self.text_height is not None and self.text_height < READABLE_TEXT_HEIGHT:
+            issues.append("Low resolution")
+        return issues
+
+    @property
+    def status(self):
+        """"Rejected", "Good", or the worst issue first ("Blurry", "Low contrast", ...)."""
+        if self.rejected:
+            return "Rejected"
+        issues = self.issues()
+        return issues[0] if issues else "Good"
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "issues": self.issues(),
+            "rejected": self.rejected,
+            "blur": round(self.blur, 1),
+            "contrast": round(self.contrast, 3),
+            "noise": round(self.noise, 2),
+            "skew": round(self.skew, 2),
+            "text_height": round(self.text_height, 1) if self.text_height is not None else None,
+            "width": self.width,
+            "height": self.height,
+        }
+
+
+class Adjustments:
+    """Which of a profile's preprocessing steps a page needs."""
+    def __init__(self, upscale=True, denoise=True, gamma=True, sharpen=True, deskew=0.0):
+        self.upscale = upscale
+        self.denoise = denoise
+        self.gamma = gamma
+        self.sharpen = sharpen
+        # Rotation in degrees that straightens the text; 0 leaves the page as is
+        self.deskew = deskew
+
+    @classmethod
+    def for_report(cls, report):
+        skew = report.skew if MIN_DESKEW <= abs(report.skew) <= MAX_DESKEW else 0.0
+        return cls(
+            upscale=report.text_height is None or report.text_height < READABLE_TEXT_HEIGHT,
+            denoise=report.noise >= CLEAN_NOISE,
+            gamma=report.contrast < LOW_CONTRAST,
+            sharpen=report.blur < BLURRY,
+            deskew=skew,
+        )
+
+    def skipped(self):
+        return [name for name in ("upscale", "denoise", "gamma", "sharpen") if not getattr(self, name)]
+
+
+def _noise_sigma(gray, paper):
+    # Immerkaer (1996): the kernel cancels smooth image structure, leaving noise
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], np.float32)
+    response = np.abs(cv2.filter2D(gray.astype(np.float32), -1, kernel))[1:-1, 1:-1]
+    paper = paper[1:-1, 1:-1]
+    if not paper.any():
+        return 0.0
+    return float(math.sqrt(math.pi / 2) * response[paper].mean() / 6)
+
+
+def _line_angles(ink):
+    """(angle in degrees, length in px) of each line-shaped ink blob."""
+    # Join the letters of a line into one blob, but not neighbouring lines
+    joined = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1)))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    lines = []
+    for label in range(1, count):
+        x, y, w, h, area = stats[label]
+        if w < 20 or area < 30:
+            continue
+        ys, xs = np.nonzero(labels[y:y + h, x:x + w] == label)
+        xs = xs - xs.mean()
+        ys = ys - ys.mean()
+        mu20, mu02, mu11 = (xs * xs).mean(), (ys * ys).mean(), (xs * ys).mean()
+        # Principal axes of the blob: its orientation, and how elongated it is
+        spread = math.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+        major, minor = (mu20 + mu02) / 2 + spread, max((mu20 + mu02) / 2 - spread, 1e-6)
+        if major < MIN_LINE_ASPECT ** 2 * minor:
+            continue
+        lines.append((math.degrees(0.5 * math.atan2(2 * mu11, mu20 - mu02)), math.sqrt(12 * major)))
+    return lines
+
+
+def _character_height(ink):
+    """Median height of character-sized ink components, weighted by area so noise specks barely count."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    characters = [
+        (h, area) for _, _, w, h, area in stats[1:]
+        # Not rules, underlines or box outlines
+        if h >= 2 and w <= 3 * h and area >= 0.15 * w * h and h <= ink.shape[0] // 4
+    ]
+    return _weighted_median(*zip(*characters)) if characters else None
+
+
+def _weighted_median(values, weights):
+    order = np.argsort(values)
+    cumulative = np.cumsum(np.asarray(weights)[order])
+    return float(np.asarray(values)[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def analyze(gray):
+    """QualityReport for a grayscale page."""
+    height, width = gray.shape[:2]
+    scale = min(1.0, ANALYSIS_WIDTH / width)
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (ANALYSIS_WIDTH, max(1, int(height * scale))), interpolation=cv2.INTER_AREA
+    )
+
+    # The median filter keeps noise specks from counting as ink
+    ink = cv2.adaptiveThreshold(
+        cv2.medianBlur(small, 3), 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, INK_BLOCK, INK_OFFSET
+    )
+    ink_fraction = float(ink.mean())
+
+    # Text regions: the ink and a few pixels around it, where focus and contrast show
+    near_text = cv2.dilate(ink, np.ones((7, 7), np.uint8)).astype(bool)
+    if near_text.any():
+        dark, light = np.percentile(small[near_text], (5, 95))
+        contrast = float(light - dark) / 255
+        blur = float(cv2.Laplacian(small, cv2.CV_64F)[near_text].var())
+    else:
+        contrast, blur = 0.0, 0.0
+    # Downscaling averages noise away; report it at the image's own resolution
+    noise = _noise_sigma(small, ~cv2.dilate(ink, np.ones((9, 9), np.uint8)).astype(bool)) / scale
+
+    lines = _line_angles(ink)
+    skew = _weighted_median(*zip(*lines)) if lines else 0.0
+    text_height = _character_height(ink)
+    if text_height is not None:
+        text_height /= scale
+
+    return QualityReport(blur, contrast, noise, skew, text_height, width, height, ink_fraction)
@@ -0,0 +1,375 @@
+"""
+Extraction results indexed by field value, for verifying submitted records in bulk.
+
+Every stored document is indexed under keys derived from its fields:
+
+- phone, email, id_number: the normalized value itself (exact keys)
+- name: a phonetic code (Soundex) per word, so "Jon Smyth" meets "John Smith"
+- address: PIN codes and the first four letters of each distinctive word
+
+A submitted record is only compared with the documents it shares a key
+with. Names and addresses are scored with one rapidfuzz cdist call per
+block (the records and documents sharing a key), and every remaining
+field of each candidate pair with one cpdist call per field, so a CSV of
+thousands of records never costs records x documents comparisons.
+
+    python record_store.py import results.jsonl
+    python record_store.py verify applicants.csv --out matches.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+import config
+from field_matcher import ADDRESS_KEYWORDS, FIELD_MAPPINGS
+
+EXACT_FIELDS = ("phone", "email", "id_number")
+BLOCKED_FIELDS = ("name", "address")
+# How much each field counts towards a record's overall score
+FIELD_WEIGHTS = {"id_number": 3.0, "phone": 2.0, "email": 2.0, "name": 2.0, "address": 1.0, "age": 0.5, "gender": 0.5}
+FIELD_SCORERS = {"name": fuzz.token_sort_ratio, "address": fuzz.token_set_ratio}
+# Shortest normalized values worth an exact key
+MIN_EXACT_LENGTH = {"phone": 7, "email": 5, "id_number": 4}
+# Keys shared by more documents than this (a common surname, a city) select nothing
+MAX_BLOCK_SIZE = 500
+# Blocked documents scoring below this on the blocking field are dropped
+MIN_BLOCK_SCORE = 60
+# Candidates per record scored on every field, best index scores first
+MAX_CANDIDATES = 50
+# Candidates reported per record
+TOP_CANDIDATES = 3
+# SQLite limits the number of parameters in one query
+QUERY_CHUNK = 500
+
+ADDRESS_STOP_WORDS = {k.lower().rstrip(".") for k in ADDRESS_KEYWORDS} | {"near", "opp", "house", "road", "city"}
+NON_WORD_RE = re.compile(r"[\W_]+")
+NON_DIGIT_RE = re.compile(r"\D")
+NON_ALNUM_RE = re.compile(r"[^0-9A-Za-z]")
+PIN_RE = re.compile(r"\b\d{6}\b")
+SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(("aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in letters}
+
+
+def normalize(field, value):
+    if value is None:
+        return ""
+    value = str(value)
+    if field == "phone":
+        # Country codes and separators vary; the last ten digits don't
+        return NON_DIGIT_RE.sub("", value)[-10:]
+    if field == "email":
+        return value.strip().lower().replace(" ", "")
+    if field == "id_number":
+        return NON_ALNUM_RE.sub("", value).upper()
+    return NON_WORD_RE.sub(" ", value.lower()).strip()
+
+
+def soundex(word):
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0])
+    for c in word[1:]:
+        digit = SOUNDEX_CODES.get(c)
+        if digit and digit != "0" and digit != previous:
+            code += digit
+        # h and w don't separate letters with the same code
+        if c not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def index_keys(field, value):
+    """Keys a normalized field value is indexed and looked up under."""
+    if not value:
+        return set()
+    if field in EXACT_FIELDS:
+        return {value} if len(value) >= MIN_EXACT_LENGTH[field] else set()
+    words = value.split()
+    if field == "name":
+        # Soundex for Latin script; other scripts block on their first letters
+        return {soundex(w) if w.isascii() and w.isalpha() else w[:3] for w in words if len(w) >= 2}
+    if field == "address":
+        keys = set(PIN_RE.findall(value))
+        keys.update(w[:4] for w in words if len(w) >= 4 and w.isalpha() and w not in ADDRESS_STOP_WORDS)
+        return keys
+    return set()
+
+
+def csv_records(text):
+    """Rows of a CSV as {field: value}; columns are matched to fields by name or label."""
+    labels = {key: key for key in FIELD_MAPPINGS}
+    for key, keywords in FIELD_MAPPINGS.items():
+        for keyword in keywords:
+            labels.setdefault(keyword.lower(), key)
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError("The CSV has no header row")
+    columns = {}
+    for column in reader.fieldnames:
+        name = (column or "").strip().lower().replace("_", " ")
+        if name == "record id":
+            columns[column] = "record_id"
+        elif name.replace(" ", "_") in labels:
+            columns[column] = labels[name.replace(" ", "_")]
+        elif name in labels:
+            columns[column] = labels[name]
+    if not any(field in FIELD_WEIGHTS for field in columns.values()):
+        raise ValueError(f"No CSV column matches a field ({', '.join(FIELD_WEIGHTS)})")
+    return [{columns[c]: v for c, v in row.items() if c in columns and v} for row in reader]
+
+
+class RecordStore:
+    """
+    Extraction results in SQLite with a (field, key) -> document index.
+    Safe to share between threads.
+    """
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, fields TEXT NOT NULL, raw_text TEXT NOT NULL, created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS field_keys ("
+            "field TEXT NOT NULL, key TEXT NOT NULL, document_id TEXT NOT NULL,"
+            "PRIMARY KEY (field, key, document_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_field_keys_document ON field_keys(document_id);"
+        )
+        self._db.commit()
+
+    def add(self, document_id, result):
+        self.add_many([(document_id, result)])
+
+    def add_many(self, items):
+        """Stores (document_id, extraction result) pairs, replacing earlier versions."""
+        with self._lock:
+            for document_id, result in items:
+                fields = result.get("fields") or {}
+                self._db.execute("DELETE FROM field_keys WHERE document_id = ?", (document_id,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents (document_id, fields, raw_text, created) VALUES (?, ?, ?, ?)",
+                    (document_id, json.dumps(fields, ensure_ascii=False), result.get("raw_text") or "", time.time()),
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO field_keys (field, key, document_id) VALUES (?, ?, ?)",
+                    [
+                        (field, key, document_id)
+                        for field in EXACT_FIELDS + BLOCKED_FIELDS
+                        for key in index_keys(field, normalize(field, fields.get(field)))
+                    ],
+                )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+                "keys": self._db.execute("SELECT COUNT(*) FROM field_keys").fetchone()[0],
+            }
+
+    def _lookup(self, field, keys, max_size=None):
+        """{key: [document_id]} for the keys that exist, leaving out keys shared by more than max_size documents."""
+        found = defaultdict(list)
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), QUERY_CHUNK):
+                chunk = keys[start:start + QUERY_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT key, document_id FROM field_keys WHERE field = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [field, *chunk],
+                )
+                for key, document_id in rows:
+                    found[key].append(document_id)
+        if max_size:
+            found = {key: docs for key, docs in found.items() if len(docs) <= max_size}
+        return found
+
+    def _documents(self, document_ids):
+        """{document_id: ({field: normalized value}, normalized raw text)}."""
+        documents = {}
+        document_ids = list(document_ids)
+        with self._lock:
+            for start in range(0, len(document_ids), QUERY_CHUNK):
+                chunk = document_ids[start:start + QUERY_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT document_id, fields, raw_text FROM documents WHERE document_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for document_id, fields, raw_text in rows:
+                    fields = json.loads(fields)
+                    documents[document_id] = (
+                        {field: normalize(field, fields.get(field)) for field in FIELD_WEIGHTS},
+                        normalize("text", raw_text),
+                    )
+        return documents
+
+    def verify(self, records):
+        """
+        Best matching stored document for each record ({field: value}, plus
+        an optional record_id). Scores are 0-100 per field, and overall a
+        weighted mean over the record's fields.
+        """
+        queries = [
+            {field: normalize(field, record.get(field)) for field in FIELD_WEIGHTS if normalize(field, record.get(field))}
+            for record in records
+        ]
+        # candidates[i][document_id] -> {field: score}
+        candidates = [defaultdict(dict) for _ in records]
+
+        for field in EXACT_FIELDS:
+            wanted = defaultdict(list)
+            for i, query in enumerate(queries):
+                for key in index_keys(field, query.get(field)):
+                    wanted[key].append(i)
+            for key, document_ids in self._lookup(field, wanted).items():
+                for i in wanted[key]:
+                    for document_id in document_ids:
+                        candidates[i][document_id][field] = 100.0
+
+        for field in BLOCKED_FIELDS:
+            blocks = defaultdict(list)
+            for i, query in enumerate(queries):
+                for key in index_keys(field, query.get(field)):
+                    blocks[key].append(i)
+            found = self._lookup(field, blocks, MAX_BLOCK_SIZE)
+            documents = self._documents({d for docs in found.values() for d in docs})
+            for key, document_ids in found.items():
+                rows = blocks[key]
+                scores = process.cdist(
+                    [queries[i][field] for i in rows],
+                    [documents[d][0][field] for d in document_ids],
+                    scorer=FIELD_SCORERS[field], dtype=np.float32, score_cutoff=MIN_BLOCK_SCORE, workers=-1,
+                )
+                for row, col in zip(*np.nonzero(scores)):
+                    scored = candidates[rows[row]][document_ids[col]]
+                    scored[field] = max(scored.get(field, 0.0), float(scores[row, col]))
+
+        candidates = [self._shortlist(scored) for scored in candidates]
+        self._score_remaining(queries, candidates)
+        return [self._best(record, query, scored) for record, query, scored in zip(records, queries, candidates)]
+
+    @staticmethod
+    def _shortlist(scored):
+        if len(scored) <= MAX_CANDIDATES:
+            return scored
+        # Weighted sum, so an exact id or phone hit outranks a similar name
+        ranked = sorted(
+            scored, key=lambda d: sum(FIELD_WEIGHTS[f] * score for f, score in scored[d].items()), reverse=True
+        )
+        return {document_id: scored[document_id] for document_id in ranked[:MAX_CANDIDATES]}
+
+    def _score_remaining(self, queries, candidates):
+        """Fills in every field of every candidate pair that no index lookup scored."""
+        documents = self._documents({d for scored in candidates for d in scored})
+        # (field, compare against the raw text) -> [(record index, document_id)]
+        pending = defaultdict(list)
+        for i, (query, scored) in enumerate(zip(queries, candidates)):
+            for document_id, fields in scored.items():
+                for field in query:
+                    if field not in fields:
+                        has_value = bool(documents[document_id][0][field])
+                        pending[(field, not has_value)].append((i, document_id))
+
+        for (field, in_text), pairs in pending.items():
+            if in_text:
+                # The field wasn't extracted; look for the value anywhere in the text, as /verify does
+                scorer = fuzz.partial_ratio
+                targets = [documents[d][1] for _, d in pairs]
+            else:
+                scorer = FIELD_SCORERS.get(field, fuzz.ratio)
+                targets = [documents[d][0][field] for _, d in pairs]
+            scores = process.cpdist(
+                [queries[i][field] for i, _ in pairs], targets, scorer=scorer, dtype=np.float32, workers=-1
+            )
+            for (i, document_id), score in zip(pairs, scores):
+                candidates[i][document_id][field] = float(score)
+
+    @staticmethod
+    def _best(record, query, scored):
+        weight = sum(FIELD_WEIGHTS[field] for field in query)
+        ranked = sorted(
+            (
+                (sum(FIELD_WEIGHTS[field] * score for field, score in fields.items()) / weight, document_id)
+                for document_id, fields in scored.items()
+            ),
+            reverse=True,
+        )
+        result = {"record_id": record.get("record_id"), "document_id": None, "score": 0.0, "matches": {}}
+        if ranked:
+            score, document_id = ranked[0]
+            result.update(
+                document_id=document_id,
+                score=round(score, 1),
+                matches={field: round(scored[document_id][field], 1) for field in query},
+            )
+        result["candidates"] = [
+            {"document_id": document_id, "score": round(score, 1)} for score, document_id in ranked[:TOP_CANDIDATES]
+        ]
+        return result
+
+
+def import_results(store, path):
+    """
+    Loads a JSONL file of extraction results: batch_extract.py output (keyed
+    by path) or GET /jobs/{id}/results (keyed by document_id).
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            result = record.get("result", record)
+            if record.get("duplicate_of") or record.get("error") or not result:
+                continue
+            items.append((record.get("document_id") or record["path"], result))
+            if len(items) >= 1000:
+                store.add_many(items)
+                items = []
+    store.add_many(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index extraction results and verify records against them")
+    parser.add_argument("--db", default=config.RECORD_DB_PATH, help="Record store SQLite file (default: RECORD_DB_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("import", help="Index a JSONL file of extraction results")
+    load.add_argument("results")
+    check = commands.add_parser("verify", help="Match each row of a CSV with its best stored document")
+    check.add_argument("csv")
+    check.add_argument("--out", help="Write one JSON line per record here instead of stdout")
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("--db or RECORD_DB_PATH is required")
+
+    store = RecordStore(args.db)
+    if args.command == "import":
+        import_results(store, args.results)
+        print(store.stats())
+        return
+
+    with open(args.csv, encoding="utf-8-sig", newline="") as f:
+        records = csv_records(f.read())
+    started = time.perf_counter()
+    results = store.verify(records)
+    elapsed = time.perf_counter() - started
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    matched = sum(1 for r in results if r["document_id"])
+    print(f"{len(records)} records, {matched} with a candidate, in {elapsed:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+import threading
+
+import batch_extract
+from batch_extract import load_checkpoint
+from ocr_workers import WorkersUnavailable
+
+
+def _write(path, records, tail=""):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + tail, encoding="utf-8")
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_retry_failed_removes_failed_records(tmp_path):
+    out = tmp_path / "results.jsonl"
+    _write(out, [
+        {"path": "a.png", "sha256": "1", "raw_text": "A"},
+        {"path": "b.png", "sha256": "2", "raw_text": "", "error": "Could not decode image"},
+        {"path": "c.png", "sha256": "1", "duplicate_of": "a.png"},
+    ], tail='{"path": "d.png", "sha')
+
+    done, hashes = load_checkpoint(str(out), retry_failed=True)
+
+    assert done == {"a.png": "1", "c.png": "1"}
+    assert hashes == {"1": "a.png"}
+    assert [r["path"] for r in _records(out)] == ["a.png", "c.png"]
+
+
+def test_resume_keeps_failed_records(tmp_path):
+    out = tmp_path / "results.jsonl"
+    _write(out, [{"path": "b.png", "sha256": "2", "raw_text": "", "error": "Could not decode image"}])
+
+    done, _ = load_checkpoint(str(out))
+
+    assert done == {"b.png": "2"}
+    assert len(_records(out)) == 1
+
+
+class _RestartingWorkers:
+    """Worker processes whose first extraction finds a worker dead."""
+    def __init__(self):
+        self.ready = True
+        self.load_error = None
+        self.crashed = False
+        self.lock = threading.Lock()
+
+    def extract_text(self, source, *args):
+        with self.lock:
+            if not self.crashed:
+                self.crashed = True
+                self.ready = False
+                threading.Timer(0.1, setattr, (self, "ready", True)).start()
+                raise WorkersUnavailable("An OCR worker process died; restarting the workers")
+        return {"raw_text": os.path.basename(source), "fields": {}}
+
+    def shutdown(self):
+        pass
+
+
+def test_documents_are_read_again_after_the_workers_restart(tmp_path, monkeypatch):
+    scans = tmp_path / "scans"
+    scans.mkdir()
+    for name in ("a.png", "b.png", "c.png"):
+        (scans / name).write_bytes(name.encode())
+    out = tmp_path / "results.jsonl"
+    workers = _RestartingWorkers()
+    monkeypatch.setattr(batch_extract, "start_extractor", lambda processes, threads: (workers, 2))
+    monkeypatch.setattr(batch_extract, "WORKER_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(sys, "argv", ["batch_extract.py", str(scans), "--out", str(out)])
+
+    batch_extract.main()
+
+    records = _records(out)
+    assert sorted(r["path"] for r in records) == ["a.png", "b.png", "c.png"]
+    assert not any(r.get("error") for r in records)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("easyocr")
+
+from easyocr.config import imgH  # noqa: E402
+from easyocr.model.vgg_model import Model  # noqa: E402
+from easyocr.utils import CTCLabelConverter  # noqa: E402
+
+from batcher import RecognitionBatcher, _PendingCrops  # noqa: E402
+
+CHARACTERS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class _Reader:
+    """Just what the batcher uses of an easyocr.Reader, with a seeded untrained recognizer."""
+    def __init__(self):
+        torch.manual_seed(0)
+        self.character = CHARACTERS
+        self.lang_char = CHARACTERS
+        self.converter = CTCLabelConverter(CHARACTERS)
+        self.recognizer = Model(1, 256, 256, len(CHARACTERS) + 1).eval()
+        # Untrained outputs are nearly uniform; sharpen them so padding shows in the confidences
+        with torch.no_grad():
+            self.recognizer.Prediction.weight.mul_(1000)
+        self.device = "cpu"
+
+
+def _crops(widths, seed):
+    rng = np.random.default_rng(seed)
+    return [
+        ([[0, 0], [w, 0], [w, imgH], [0, imgH]], rng.integers(0, 256, (imgH, w), dtype=np.uint8))
+        for w in widths
+    ]
+
+
+def _recognize(batcher, *image_lists):
+    requests = [_PendingCrops(image_list) for image_list in image_lists]
+    batcher._run(requests)
+    return [request.result for request in requests]
+
+
+def test_results_do_not_depend_on_other_requests():
+    batcher = RecognitionBatcher(_Reader(), max_batch_size=32)
+    page = _crops([70, 150, 260], seed=1)
+    wide = _crops([900], seed=2)
+
+    (alone,) = _recognize(batcher, page)
+    batched, _ = _recognize(batcher, page, wide)
+
+    assert [text for _, text, _ in batched] == [text for _, text, _ in alone]
+    for (_, _, a), (_, _, b) in zip(alone, batched):
+        assert a == pytest.approx(b, abs=1e-4)
+
+
+def test_results_keep_request_order():
+    batcher = RecognitionBatcher(_Reader(), max_batch_size=32)
+    page = _crops([300, 64, 200, 64], seed=3)
+
+    (results,) = _recognize(batcher, page)
+
+    assert [box for box, _, _ in results] == [box for box, _ in page]
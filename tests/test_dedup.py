@@ -0,0 +1,91 @@
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import FontSet, _render_form, _render_id_card, random_fields
+from dedup import FINGERPRINT_WIDTH, NearDuplicateIndex, fingerprint
+from ocr_engine import ocr_engine
+
+FONTS = FontSet()
+SCOPE = "auto|test"
+
+
+def _render(kind, width, seed, change=None):
+    """A synthetic card or form `width` px wide, with `change(fields)` applied first."""
+    rng = random.Random(seed)
+    fields = random_fields(rng, "en")
+    if change:
+        change(fields)
+    page = (_render_id_card if kind == "id_card" else _render_form)(fields, "en", FONTS, rng)
+    gray = np.asarray(page)
+    h, w = gray.shape
+    if width != w:
+        interpolation = cv2.INTER_AREA if width < w else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, (width, round(h * width / w)), interpolation=interpolation)
+    return gray
+
+
+def _change_digit(key):
+    def change(fields):
+        value = fields[key]
+        n = max(i for i, c in enumerate(value) if c.isdigit())
+        fields[key] = value[:n] + str((int(value[n]) + 3) % 10) + value[n + 1:]
+    return change
+
+
+def _fingerprint(gray, ext=".png", params=()):
+    # Decoded the way main.cached_extraction does it
+    data = cv2.imencode(ext, gray, list(params))[1].tobytes()
+    return fingerprint(ocr_engine.decode_image(data, max_width=FINGERPRINT_WIDTH))
+
+
+def _index_with(gray):
+    index = NearDuplicateIndex(max_items=10, max_distance=6)
+    index.add(_fingerprint(gray), SCOPE, "original", 2.0)
+    return index
+
+
+@pytest.mark.parametrize("kind", ["id_card", "form"])
+@pytest.mark.parametrize("width", [1000, 2480])
+@pytest.mark.parametrize("key", ["phone", "id_number"])
+def test_one_changed_digit_is_not_a_duplicate(kind, width, key):
+    index = _index_with(_render(kind, width, seed=7))
+    changed = _fingerprint(_render(kind, width, seed=7, change=_change_digit(key)))
+    assert index.find(changed, SCOPE) is None
+    # Found by its pHash, turned down by the ink comparison
+    assert index.stats()["rejected"] == 1
+
+
+@pytest.mark.parametrize("kind", ["id_card", "form"])
+@pytest.mark.parametrize("quality", [70, 35])
+def test_jpeg_reencoded_copy_is_a_duplicate(kind, quality):
+    gray = _render(kind, 2480, seed=3)
+    index = _index_with(gray)
+    copy = _fingerprint(gray, ".jpg", (cv2.IMWRITE_JPEG_QUALITY, quality))
+    entry = index.find(copy, SCOPE)
+    assert entry is not None and entry.document_id == "original"
+
+
+def test_resized_copy_is_a_duplicate():
+    gray = _render("form", 2480, seed=5)
+    index = _index_with(gray)
+    smaller = cv2.resize(gray, (1488, round(gray.shape[0] * 1488 / 2480)), interpolation=cv2.INTER_AREA)
+    copy = _fingerprint(smaller, ".jpg", (cv2.IMWRITE_JPEG_QUALITY, 70))
+    assert index.find(copy, SCOPE) is not None
+
+
+def test_other_document_from_the_same_template_is_not_a_duplicate():
+    index = _index_with(_render("id_card", 1000, seed=1))
+    assert index.find(_fingerprint(_render("id_card", 1000, seed=2)), SCOPE) is None
+
+
+def test_scopes_and_evicted_entries_are_not_matched():
+    gray = _render("id_card", 1000, seed=4)
+    index = NearDuplicateIndex(max_items=1, max_distance=6)
+    index.add(_fingerprint(gray), SCOPE, "original", 2.0)
+    assert index.find(_fingerprint(gray), "id_card|test") is None
+
+    index.add(_fingerprint(_render("form", 1000, seed=4)), SCOPE, "newer", 2.0)
+    assert index.find(_fingerprint(gray), SCOPE) is None
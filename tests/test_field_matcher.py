@@ -0,0 +1,20 @@
+import json
+import os
+
+import pytest
+
+from ocr_engine import ocr_engine
+
+# (text, fields) pairs recorded from the extract_fields() the app started
+# with, so the precompiled FieldMatcher keeps its exact output in text mode
+GOLDEN = os.path.join(os.path.dirname(__file__), "fixtures", "fields_golden.jsonl")
+
+
+def _golden():
+    with open(GOLDEN, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("case", _golden(), ids=lambda case: case["text"].split("\n")[0][:40] or "empty")
+def test_text_mode_matches_golden(case):
+    assert ocr_engine.extract_fields(case["text"]) == case["fields"]
@@ -0,0 +1,48 @@
+import os
+
+import cv2
+import numpy as np
+
+import form_templates
+from form_templates import TemplateRegistry
+
+
+def _page(seed):
+    rng = np.random.default_rng(seed)
+    page = np.full((400, 300), 255, np.uint8)
+    for _ in range(30):
+        x, y = (int(v) for v in rng.integers(10, 280, size=2))
+        cv2.rectangle(page, (x, y), (x + 15, y + 15), 0, -1)
+    return page
+
+
+def _settle(directory):
+    # As if the last change was long ago
+    os.utime(directory, ns=(0, 0))
+
+
+def test_templates_registered_by_another_process_are_picked_up(tmp_path):
+    workers = TemplateRegistry(str(tmp_path))
+    api = TemplateRegistry(str(tmp_path))
+    assert workers.for_doc_type("admission") == []
+
+    api.register("form", _page(0), {"name": [0.1, 0.1, 0.9, 0.2]}, ["admission"])
+    assert [t.name for t in workers.for_doc_type("admission")] == ["form"]
+
+    _settle(tmp_path)
+    workers.for_doc_type("admission")
+    updated = api.register("form", _page(1), {"name": [0.1, 0.3, 0.9, 0.4]}, ["admission"])
+    assert [t.version for t in workers.for_doc_type("admission")] == [updated.version]
+
+
+def test_unchanged_directory_is_not_listed_again(tmp_path, monkeypatch):
+    TemplateRegistry(str(tmp_path)).register("form", _page(0), {"name": [0.1, 0.1, 0.9, 0.2]}, ["admission"])
+    _settle(tmp_path)
+    registry = TemplateRegistry(str(tmp_path))
+
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(form_templates.os, "listdir", lambda path: listed.append(path) or listdir(path))
+    for _ in range(3):
+        assert [t.name for t in registry.for_doc_type("admission")] == ["form"]
+    assert listed == []
@@ -0,0 +1,50 @@
+import asyncio
+import zipfile
+
+import pytest
+
+from jobs import JobRunner, JobStore, unpack_zip
+from ocr_pool import OCRPool
+
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, size in members:
+            archive.writestr(name, b"\0" * size)
+    return str(path)
+
+
+def test_unpack_zip_limits_the_total_across_archives(tmp_path):
+    first = _zip(tmp_path / "first.zip", [("a.png", 1000), ("b.png", 1000)])
+    second = _zip(tmp_path / "second.zip", [("c.png", 1000), ("d.png", 1000)])
+
+    documents, unpacked = unpack_zip(first, str(tmp_path), 0, 10, 1500, max_total_bytes=3000)
+    assert len(documents) == 2 and unpacked == 2000
+    # Every member is within the per-file limit; together they aren't
+    with pytest.raises(ValueError, match="unpack to at most"):
+        unpack_zip(second, str(tmp_path), 2, 10, 1500, max_total_bytes=3000, unpacked=unpacked)
+
+
+def test_jobs_fail_when_the_models_failed_to_load(tmp_path):
+    store = JobStore(str(tmp_path / "jobs"))
+    job_id, job_dir = store.new_job_dir()
+    store.create(job_id, "auto", None, None, [("a.png", str(tmp_path / "a.png"), False)])
+
+    async def scenario():
+        pool = OCRPool(1, 0)
+        runner = JobRunner(store, pool, lambda job, document: None,
+                           ready=lambda: False, load_error=lambda: "model files missing")
+        await runner.start()
+        for _ in range(100):
+            progress = await asyncio.to_thread(store.progress, job_id)
+            if progress["status"] == "done":
+                break
+            await asyncio.sleep(0.02)
+        await runner.stop()
+        pool.shutdown()
+        return progress
+
+    progress = asyncio.run(scenario())
+    assert progress["status"] == "done" and progress["failed"] == 1
+    results = list(store.iter_results(job_id))
+    assert "model files missing" in results[0]["error"]
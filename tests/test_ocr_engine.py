@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+easyocr = pytest.importorskip("easyocr")
+
+from ocr_engine import OCREngine  # noqa: E402
+
+
+class _Reader:
+    """Stands in for easyocr.Reader, whose models can't be downloaded here."""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def detect(self, image):
+        return [[]], [[]]
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(easyocr, "Reader", _Reader)
+    monkeypatch.setattr(OCREngine, "_add_recognizer",
+                        lambda self, key, reader=None: self.recognizers.setdefault(key, (reader, None)))
+    return OCREngine()
+
+
+def test_lazy_load_is_ready_once_loaded(engine):
+    # OCR_PRELOAD=0: the first request's load() is the only one
+    assert not engine.ready
+    engine.load()
+    assert engine.ready
+
+
+def test_background_warmup_is_ready_only_after_warming_up(engine, monkeypatch):
+    warming = threading.Event()
+    finish = threading.Event()
+    original_warmup = OCREngine.warmup
+
+    def warmup(self):
+        self.load()
+        warming.set()
+        finish.wait(5)
+        original_warmup(self)
+
+    monkeypatch.setattr(OCREngine, "warmup", warmup)
+    monkeypatch.setattr(OCREngine, "recognize_crops", lambda self, key, images: [])
+    thread = engine.start_background_load(warmup=True)
+    assert warming.wait(5)
+    # A request loading the models meanwhile doesn't make it ready either
+    engine.load()
+    assert not engine.ready
+
+    finish.set()
+    thread.join(5)
+    assert engine.load_error is None
+    assert engine.ready
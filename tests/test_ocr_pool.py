@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from ocr_pool import OCRPool
+
+
+def test_wait_for_idle_returns_when_a_worker_frees():
+    async def scenario():
+        pool = OCRPool(1, 0)
+        release = threading.Event()
+        busy = pool.try_submit(release.wait)
+        assert pool.try_submit(lambda: None) is None
+
+        waiter = asyncio.create_task(pool.wait_for_idle())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        release.set()
+        await asyncio.wait_for(waiter, 1)
+        await busy
+        assert await pool.try_submit(lambda: "ran") == "ran"
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_idle_returns_at_once_with_an_idle_worker():
+    async def scenario():
+        pool = OCRPool(2, 0)
+        await asyncio.wait_for(pool.wait_for_idle(), 1)
+        pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,32 @@
+import queue
+
+import pytest
+
+import ocr_workers
+from ocr_workers import OCRWorkerProcesses, WorkersUnavailable, _init_worker
+
+
+def test_init_worker_reports_a_failed_load(monkeypatch):
+    def load():
+        raise RuntimeError("model files missing")
+
+    monkeypatch.setattr(ocr_workers, "configure_torch_threads", lambda threads: None)
+    monkeypatch.setattr(ocr_workers.ocr_engine, "load", load)
+    status = queue.Queue()
+    with pytest.raises(RuntimeError):
+        _init_worker(1, False, status)
+    # Only the error: nothing that would count this worker as started
+    assert status.get_nowait() == "RuntimeError: model files missing"
+    assert status.empty()
+
+
+def test_failed_workers_are_not_restarted():
+    workers = OCRWorkerProcesses(ocr_workers.ocr_engine, 2)
+    broken = object()
+    workers.executor = broken
+    workers._failed("RuntimeError: model files missing")
+
+    workers._rebuild(broken)
+    assert not workers.rebuilding and not workers.ready
+    with pytest.raises(WorkersUnavailable, match="model files missing"):
+        workers.extract_text(b"")
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from uploads import FORM_ALLOWANCE, RequestSizeLimit, UploadTooLarge, spool_upload
+
+LIMIT = 64 * 1024
+
+
+def _app(tmp_path):
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimit, limit_for=lambda path: LIMIT)
+    app.add_exception_handler(UploadTooLarge, lambda request, exc: JSONResponse(status_code=413, content={"detail": str(exc)}))
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        spooled = await spool_upload(file, LIMIT, str(tmp_path))
+        try:
+            return {"size": spooled.size, "sha256": spooled.content_hash.hexdigest(), "bytes": len(spooled.read_bytes())}
+        finally:
+            spooled.close()
+
+    return TestClient(app)
+
+
+def test_upload_within_limit_is_spooled(tmp_path):
+    response = _app(tmp_path).post("/upload", files={"file": ("a.png", b"x" * 1000)})
+
+    assert response.status_code == 200
+    assert response.json()["size"] == response.json()["bytes"] == 1000
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_content_length_over_limit_is_rejected_before_reading(tmp_path):
+    response = _app(tmp_path).post(
+        "/upload", content=b"", headers={"Content-Length": str(LIMIT + FORM_ALLOWANCE + 1), "Content-Type": "multipart/form-data; boundary=x"}
+    )
+
+    assert response.status_code == 413
+
+
+def test_streamed_body_over_limit_is_rejected(tmp_path):
+    def body():
+        yield b"--x\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n"
+        for _ in range((LIMIT + FORM_ALLOWANCE) // 4096 + 2):
+            yield b"x" * 4096
+
+    # A generator body is sent chunked, without Content-Length
+    response = _app(tmp_path).post("/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=x"})
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("size", [LIMIT + 1, LIMIT + FORM_ALLOWANCE // 2])
+def test_file_over_limit_within_allowance_is_rejected(tmp_path, size):
+    response = _app(tmp_path).post("/upload", files={"file": ("a.png", b"x" * size)})
+
+    assert response.status_code == 413
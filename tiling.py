@@ -0,0 +1,169 @@
+"""
+Tiled text detection for pages too large for EasyOCR's detector.
+
+The detector shrinks anything bigger than its canvas (2560 px) before it
+looks for text, so small print on a 600-dpi scan disappears. Instead the
+page is cut into overlapping tiles that are detected separately, at full
+resolution and in parallel. The boxes are then mapped back to page
+coordinates and merged across the seams:
+
+- a box that sits entirely inside a box from a neighbouring tile is a
+  duplicate from the overlap band and is dropped;
+- a line that runs across a seam is found as two fragments, each cut at
+  its tile's edge, and the fragments are joined into one box.
+
+Recognition then runs once on the merged boxes against the full page, so a
+line crossing a seam is read whole instead of being stitched from text.
+"""
+
+# EasyOCR's default detector canvas; pages larger than this lose resolution
+DETECTOR_CANVAS = 2560
+
+# How close (px) a box must come to a tile edge to count as cut by it
+EDGE_MARGIN = 4
+# A box this much inside another tile's box is the same text seen twice
+CONTAINED = 0.8
+# Fragments on one line overlap vertically by at least this much
+SAME_LINE = 0.5
+
+
+def plan_tiles(height, width, tile_size, overlap):
+    """Overlapping (x0, y0, x1, y1) tiles covering the page, row by row."""
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        points = list(range(0, length - tile_size, step))
+        # Last tile flush with the page edge
+        return points + [length - tile_size]
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+class TileBox:
+    """A detected box in page coordinates, with the tile edges it touches."""
+    __slots__ = ("x0", "x1", "y0", "y1", "tile", "cut")
+
+    def __init__(self, x0, x1, y0, y1, tile, cut):
+        self.x0, self.x1, self.y0, self.y1 = x0, x1, y0, y1
+        self.tile = tile
+        self.cut = cut
+
+    @property
+    def area(self):
+        return max(0, self.x1 - self.x0) * max(0, self.y1 - self.y0)
+
+    def intersection(self, other):
+        w = min(self.x1, other.x1) - max(self.x0, other.x0)
+        h = min(self.y1, other.y1) - max(self.y0, other.y0)
+        return w * h if w > 0 and h > 0 else 0
+
+    def vertical_overlap(self, other):
+        h = min(self.y1, other.y1) - max(self.y0, other.y0)
+        return max(0, h) / max(1, min(self.y1 - self.y0, other.y1 - other.y0))
+
+    def as_horizontal(self):
+        return [self.x0, self.x1, self.y0, self.y1]
+
+
+def offset_boxes(horizontal_list, free_list, tile_index, rect, page_width, page_height):
+    """Maps one tile's detections to page coordinates."""
+    x0, y0, x1, y1 = rect
+    boxes = []
+    for bx0, bx1, by0, by1 in horizontal_list:
+        bx0, bx1, by0, by1 = bx0 + x0, bx1 + x0, by0 + y0, by1 + y0
+        # Only inner edges cut text; the page border is a real boundary
+        cut = (
+            (x0 > 0 and bx0 <= x0 + EDGE_MARGIN)
+            or (x1 < page_width and bx1 >= x1 - EDGE_MARGIN)
+            or (y0 > 0 and by0 <= y0 + EDGE_MARGIN)
+            or (y1 < page_height and by1 >= y1 - EDGE_MARGIN)
+        )
+        boxes.append(TileBox(bx0, bx1, by0, by1, tile_index, cut))
+    free = [(tile_index, [[px + x0, py + y0] for px, py in points]) for points in free_list]
+    return boxes, free
+
+
+def _drop_duplicates(boxes):
+    # Whole boxes first, larger first, so a copy cut by a seam loses to the full one
+    kept = []
+    for box in sorted(boxes, key=lambda b: (b.cut, -b.area)):
+        area = box.area
+        if area and any(
+            other.tile != box.tile and other.intersection(box) >= CONTAINED * area
+            for other in kept
+        ):
+            continue
+        kept.append(box)
+    return kept
+
+
+def _join_fragments(boxes):
+    """Unions boxes from different tiles that are pieces of one line cut by a seam."""
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    cut = [i for i, box in enumerate(boxes) if box.cut]
+    for n, i in enumerate(cut):
+        for j in cut[n + 1:]:
+            a, b = boxes[i], boxes[j]
+            if a.tile != b.tile and a.intersection(b) and a.vertical_overlap(b) >= SAME_LINE:
+                parent[find(i)] = find(j)
+
+    groups = {}
+    for i, box in enumerate(boxes):
+        groups.setdefault(find(i), []).append(box)
+    merged = []
+    for group in groups.values():
+        merged.append(TileBox(
+            min(b.x0 for b in group), max(b.x1 for b in group),
+            min(b.y0 for b in group), max(b.y1 for b in group),
+            group[0].tile, False,
+        ))
+    return merged
+
+
+def reading_order(boxes):
+    """Sorts boxes into rows top to bottom, each row left to right."""
+    rows = []
+    for box in sorted(boxes, key=lambda b: (b.y0 + b.y1) / 2):
+        if rows and rows[-1][-1].vertical_overlap(box) >= SAME_LINE:
+            rows[-1].append(box)
+        else:
+            rows.append([box])
+    return [box for row in rows for box in sorted(row, key=lambda b: b.x0)]
+
+
+def merge_free_boxes(free):
+    """Rotated boxes are only de-duplicated: drop any inside another tile's box."""
+    def bounds(points):
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return TileBox(min(xs), max(xs), min(ys), max(ys), None, False)
+
+    rects = [(tile, points, bounds(points)) for tile, points in free]
+    kept = []
+    for tile, points, rect in sorted(rects, key=lambda r: -r[2].area):
+        if any(t != tile and other.intersection(rect) >= CONTAINED * rect.area for t, _, other in kept):
+            continue
+        kept.append((tile, points, rect))
+    return [points for _, points, _ in kept]
+
+
+def merge_tile_boxes(boxes, free):
+    """
+    Merged detections for the whole page as EasyOCR (horizontal_list,
+    free_list), horizontal boxes in reading order.
+    """
+    horizontal = reading_order(_join_fragments(_drop_duplicates(boxes)))
+    return [box.as_horizontal() for box in horizontal], merge_free_boxes(free)
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# Read uploads in 1 MB chunks so a large scan never sits in memory whole
+CHUNK_SIZE = 1024 * 1024
+# Room for form fields and multipart framing on top of the file size limit
+FORM_ALLOWANCE = 1024 * 1024
+
+
+def hash_file(path):
+    """SHA-256 object of a file's bytes, read in chunks."""
+    content_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            content_hash.update(chunk)
+    return content_hash
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit):
+        super().__init__(f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+        self.limit = limit
+
+
+class SpooledUpload:
+    """
+    An upload copied to a temporary file. The OCR code decodes it from a
+    memory map via `path`; `content_hash` is the SHA-256 of the bytes,
+    computed while copying. Call close() to delete the file.
+    """
+    def __init__(self, path, size, content_hash):
+        self.path = path
+        self.size = size
+        self.content_hash = content_hash
+
+    def read_bytes(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _copy_to_temp(source, max_bytes, directory):
+    content_hash = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=directory or None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                content_hash.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(path, size, content_hash)
+
+
+async def spool_upload(upload, max_bytes, directory=None):
+    """Copies an UploadFile to a temp file, raising UploadTooLarge past `max_bytes` (0 = no limit)."""
+    if max_bytes and upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    # Starlette has already spooled the body to upload.file; the copy and
+    # hash run in a worker thread so file I/O never blocks the event loop
+    await upload.seek(0)
+    return await asyncio.to_thread(_copy_to_temp, upload.file, max_bytes, directory)
+
+
+class RequestSizeLimit:
+    """
+    ASGI middleware that turns away oversized request bodies with 413
+    before they are parsed: at once when Content-Length is over the limit,
+    otherwise as soon as the streamed body passes it. `limit_for(path)` is
+    the upload limit in bytes for a request path (0 = no limit); the body
+    may be FORM_ALLOWANCE larger for the other form fields.
+    """
+    def __init__(self, app, limit_for):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limit_for(scope["path"]) if scope["type"] == "http" else 0
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        detail = str(UploadTooLarge(limit))
+        limit += FORM_ALLOWANCE
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside body parsing; FastAPI passes HTTPExceptions through as responses
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)